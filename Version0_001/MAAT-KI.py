@@ -3,6 +3,8 @@
 
 import threading
 import os
+import sys
+import json
 import queue
 import time
 from colorama import Fore, Style, init
@@ -14,6 +16,7 @@ from core.persona_engine import PersonaEngine
 from system.help_text import HELP_TEXT
 from system.gameinfo import show_game_info
 from core.auto_profile_speed import AutoProfileSpeedTrainer
+from core.telemetry import LatencyTelemetry
 from core.long_term_memory import LongTermMemory
 from core.semantic_memory import SemanticMemory
 from core.episodic_memory import EpisodicMemory
@@ -21,12 +24,14 @@ from core.brain_memory import BrainMemory
 from core.memory_narrative import MemoryNarrative
 from core.memory_fusion import MemoryFusion
 from core.context_anchor import ContextAnchor
-from core.memory_backup import MemoryBackup
+from core.memory_backup import BackupStopped, MemoryBackup
 from system.guide_text import GUIDE_TEXT
 from core.quest_engine import QuestEngine
-from core.llm_loader import load_llm
+from core.model_manager import ModelManager
 from core.emotion_maat_mapper import EmotionMaatMapper
 from core.memory_sqlite import SQLiteMemory
+from core.db_pool import get_manager, close_all as close_all_databases
+from core.write_buffer import flush_all as flush_memory_writes
 from core.mie import MaatIntuitionEngine
 from core.reflexion import MaatReflexion
 from core.emo_mode_switch import select_emo_mode
@@ -35,18 +40,29 @@ from core.self_evolution import SelfEvolutionEngine
 from core.streaming import stream_completion_gui
 from core.emo_systemprompt import EMO_SYSTEMPROMPT 
 from core.maat_dreaming import MaatDreaming
-from core.modes import (
-    detect_mode,
-    mode_instructions,
-    build_time_context,
-    build_runtime_context,
-)
+from core.modes import build_runtime_context
 from core.systemprompt import MAAT_SYSTEMPROMPT as MAAT_SYSTEMPROMPT_BASE
 from core.emotion_engine import EmotionEngine
 from core.alignment_kernel import MaatAlignmentKernelV2
 from core.memory_tools import handle_memory_commands
 from core.identity_kernel import IdentityKernel
 from core.thinkloop import ThinkLoop
+from core.post_turn import PostTurnAnalytics
+from core.maintenance import (
+    DAY,
+    HOUR,
+    MaintenanceScheduler,
+    Preempted,
+    analyze_databases,
+    optimize_databases,
+    rebuild_fts,
+    vacuum_databases,
+)
+from core.pipeline import ChatPipeline
+from core.prompt_assembly import PrefixStateCache
+from core.session import MemoryNamespace, Session, SessionManager
+from core.scheduler import BatchScheduler, FairScheduler, ScheduledLLM, ScheduledModel
+from core.prompt_cache import PromptStateDiskCache
 
 # ----------------------------------------
 # PROFILE LOADER
@@ -62,14 +78,12 @@ from plugins.plugin_loader import PluginManager
 # INIT
 # ----------------------------------------
 init(autoreset=True)
-speed_trainer = AutoProfileSpeedTrainer()
 ROOT = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(ROOT, "models")
 LOG_DIR = os.path.join(ROOT, "logs")
 DATA_DIR = os.path.join(ROOT, "data")
-AUTOR_MODE = False
-autor_used_this_turn = False
-autor_escape = False
+AUTOR_MAX_TOKENS = 160      # max. 3 Sätze Fortsetzung
+AUTOR_MIN_TOKENS = 32       # weniger Platz im Kontext → Fortsetzung auslassen
 
 
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -77,37 +91,90 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 DB_PATH = os.path.join(DATA_DIR, "memory.db")
 
+# ----------------------------------------
+# DATENBANKEN (ein Connection-Manager pro Datei, WAL)
+# ----------------------------------------
+memory_db = get_manager(DB_PATH)
+episodic_db = get_manager(os.path.join(DATA_DIR, "episodic_memory.db"))
+semantic_db = get_manager(os.path.join(DATA_DIR, "semantic_memory.db"))
+
+# Latenz-Telemetrie (pro Modell + n_ctx) → Tier + Fortschrittsbalken
+telemetry = LatencyTelemetry(get_manager(os.path.join(DATA_DIR, "telemetry.db")))
+speed_trainer = AutoProfileSpeedTrainer(telemetry)
+
 # ----------------------------------------
 # GLOBAL ENGINES / STATE
 # ----------------------------------------
 persona = PersonaEngine()
-memory = SQLiteMemory(DB_PATH)
+memory = SQLiteMemory(memory_db)
 reflex = MaatReflexion()
 emotion_engine = EmotionEngine()
 alignment_kernel = MaatAlignmentKernelV2(emo_mode=EMO_MODE)
 identity_kernel  = IdentityKernel(emo_mode=EMO_MODE)
 quest_engine = QuestEngine()
-episodic = EpisodicMemory(os.path.join(DATA_DIR, "episodic_memory.db"))
+episodic = EpisodicMemory(episodic_db)
 
 # 👇 WICHTIG: konsistenter Name sem_mem
-sem_mem = SemanticMemory(os.path.join(DATA_DIR, "semantic_memory.db"))
+sem_mem = SemanticMemory(semantic_db)
 
 brain = BrainMemory(episodic, sem_mem)
 mie = MaatIntuitionEngine()
 emm = EmotionMaatMapper()
-ltm = LongTermMemory(DB_PATH)
-thinkloop = ThinkLoop()
+ltm = LongTermMemory(memory_db)
+thinkloop = ThinkLoop(candidates=3, max_tokens=192)
+prefix_cache = PrefixStateCache(
+    disk=PromptStateDiskCache(os.path.join(DATA_DIR, "prompt_cache"))
+)
+models = ModelManager(prefix_cache)
 self_evo = SelfEvolutionEngine(memory, alignment_kernel, identity_kernel)
+ANALYTICS_LOCK = threading.Lock()      # Persona/Evo: nie parallel, auch über Sessions
+analytics = PostTurnAnalytics(
+    alignment_kernel, identity_kernel, emotion_engine, emm,
+    persona, reflex, mie, self_evo, memory, lock=ANALYTICS_LOCK,
+)
+
+ANALYTICS_COLORS = {
+    "maat_score": Fore.GREEN,
+    "reflexion": Fore.CYAN,
+    "emotion": Fore.LIGHTBLUE_EX,
+    "b_ki": Fore.MAGENTA,
+    "drift": Fore.YELLOW,
+    "mie": Fore.MAGENTA,
+    "error": Fore.RED,
+}
+
+
+def render_analytics(event):
+    """Terminal-Ausgabe der Post-Turn-Events (die GUI liest dieselben Zeilen)."""
+    if event["type"] == "self_evo":
+        patch = event["data"]["patch"]
+        if patch.get("status") == "blocked":
+            print(Fore.YELLOW + f"⚠️ Selbst-Evolution blockiert (Limit erreicht): {patch['reason']}")
+        else:
+            self_evo.print_patch(patch)
+        return
+
+    color = ANALYTICS_COLORS.get(event["type"], "")
+    for line in event["lines"]:
+        print(color + line + Style.RESET_ALL, flush=True)
+
+
+analytics.subscribe(render_analytics)
+
+pipeline = ChatPipeline(
+    brain, identity_kernel, alignment_kernel, analytics, prefix_cache, thinkloop,
+    speed_trainer=speed_trainer,
+)
 
 # Gehirn-Schlaf / Nachtkonsolidierung
 dreaming = MaatDreaming(
-    db_path_ltm=DB_PATH,
-    db_path_semantic=os.path.join(DATA_DIR, "semantic_memory.db"),
+    db_ltm=memory_db,
+    semantic=sem_mem,
 )
 
 # Optional AGI memory helpers – defensiv initialisieren
 try:
-    narrative = MemoryNarrative(memory)
+    narrative = MemoryNarrative(memory_db)
 except Exception:
     narrative = None
 
@@ -118,17 +185,132 @@ except Exception:
     fusion = None
 
 try:
-    anchors = ContextAnchor(memory)
+    anchors = ContextAnchor(memory_db)
 except Exception:
     anchors = None
 
+# ----------------------------------------
+# SESSION-NAMESPACES (Server: data/sessions/<id>/) für Wartung + Backup
+# ----------------------------------------
+SESSIONS_DIR = os.path.join(DATA_DIR, "sessions")
+SESSION_DB_NAMES = ("memory.db", "episodic_memory.db", "semantic_memory.db")
+ALL_DBS = [memory_db, episodic_db, semantic_db]
+server_sessions = None      # SessionManager, sobald serve() läuft
+
+
+def session_dirs():
+    try:
+        names = sorted(os.listdir(SESSIONS_DIR))
+    except OSError:
+        return []
+    dirs = [os.path.join(SESSIONS_DIR, n) for n in names]
+    return [d for d in dirs if os.path.exists(os.path.join(d, "memory.db"))]
+
+
+def maintenance_dbs():
+    """Standard-Datenbanken (Manager) + Session-Datenbanken (Pfade)."""
+    return ALL_DBS + [
+        os.path.join(d, n)
+        for d in session_dirs()
+        for n in SESSION_DB_NAMES
+        if os.path.exists(os.path.join(d, n))
+    ]
+
+
+def session_namespaces():
+    """
+    Namespaces aller Sessions für Dream/Forget. Im Server werden Sessions
+    über den SessionManager ausgeliehen (zählt als laufende Runde → wird
+    währenddessen nicht geschlossen), sonst kurz geöffnet und freigegeben.
+    """
+    for d in session_dirs():
+        sid = os.path.basename(d)
+        if server_sessions is not None:
+            session = server_sessions.get(sid, begin=True)
+            try:
+                yield session.namespace
+            finally:
+                session.end()
+        else:
+            namespace = MemoryNamespace.open(sid, d)
+            try:
+                yield namespace
+            finally:
+                namespace.close()
+
+
 try:
-    backup = MemoryBackup(DB_PATH)
-except Exception:
+    # memory/episodic/semantic (+ Sessions) + Self-Evo- und Persona-Zustand → data/backups/
+    backup = MemoryBackup(
+        DATA_DIR,
+        dbs=maintenance_dbs,
+        files=[self_evo.state_path, self_evo.log_path, persona.path],
+    )
+except Exception as e:
+    print("[BACKUP INIT ERROR]", e)
     backup = None
 
 START_TIME = time.time()
-LAST_REPLY_TIME = time.time()
+
+# ----------------------------------------
+# LEERLAUF-WARTUNG (eigener Thread, bricht bei jeder neuen Runde ab)
+# ----------------------------------------
+MAINTENANCE_IDLE = 300      # Sekunden ohne Runde, bevor Wartung startet
+
+
+def _dream(ctx, engine, ltm_db, sem_db):
+    # Verbindungen registrieren → auch einzelne Anweisungen abbrechbar
+    ctx.connection(ltm_db)
+    ctx.connection(sem_db)
+    report = engine.run_night_cycle(
+        hours_back=24,
+        max_episodes=300,
+        delete_threshold=0.02,
+        should_stop=ctx.should_stop,
+    )
+    ctx.check()
+    return report
+
+
+def _dream_job(ctx):
+    report = _dream(ctx, dreaming, memory_db, semantic_db)
+    n = 0
+    for ns in session_namespaces():
+        ctx.check()
+        engine = MaatDreaming(db_ltm=ns.ltm.db, semantic=ns.brain.semantic)
+        _dream(ctx, engine, ns.ltm.db, ns.brain.semantic.db)
+        n += 1
+    return report.splitlines()[0] + (f" (+ {n} Sessions)" if n else "")
+
+
+def _backup_job(ctx):
+    try:
+        return backup.daily_backup(should_stop=ctx.should_stop)
+    except BackupStopped:
+        raise Preempted()
+
+
+def _forget_job(ctx):
+    ctx.connection(episodic_db)
+    removed = episodic.forget()
+    for ns in session_namespaces():
+        ctx.check()
+        ctx.connection(ns.brain.episodic.db)
+        removed += ns.brain.episodic.forget()
+    return f"{removed} verblasste Episoden gelöscht"
+
+
+maintenance = MaintenanceScheduler(
+    os.path.join(DATA_DIR, "maintenance.json"), idle_after=MAINTENANCE_IDLE
+)
+maintenance.add("dream", _dream_job, 6 * HOUR)
+maintenance.add("forget", _forget_job, DAY)
+maintenance.add("optimize", optimize_databases(maintenance_dbs), HOUR)
+maintenance.add("analyze", analyze_databases(maintenance_dbs), DAY)
+maintenance.add("fts", rebuild_fts(maintenance_dbs), 7 * DAY)
+maintenance.add("vacuum", vacuum_databases(maintenance_dbs), 7 * DAY)
+if backup is not None:
+    maintenance.add("backup", _backup_job, DAY)
 
 # ----------------------------------------
 # PROFILE SYSTEM
@@ -143,10 +325,83 @@ def set_emo_mode(on: bool):
 
 
 
+# ======================================================================
+# PROMPT-BAUSTEINE (Prefix)
+# ======================================================================
+def build_combined_prompt(profile_name, profile_prompt):
+    return (
+        MAAT_SYSTEMPROMPT_BASE
+        + "\n\n"
+        + f"### PROFIL: {profile_name.upper()} ###\n"
+        + profile_prompt
+    )
+
+
+def build_persona_block():
+    style = persona.get_style_bias()
+    traits = persona.get_trait_snapshot()
+
+    return (
+        f"[PERSONA]\n"
+        f"Traits: {traits}\n"
+        f"Style Bias: {style}\n"
+        "Nutze diese Persona-Parameter für Ton, Tiefe und Wärme der Antwort."
+    )
+
+
+# ======================================================================
+# SESSIONS (eigener Kernel-Zustand + Gedächtnis-Namespace je Nutzer)
+# ======================================================================
+def make_session(session_id, namespace, prefix, n_ctx):
+    """Neue Session; Modelle und zustandslose Engines werden geteilt."""
+    id_kernel = IdentityKernel(emo_mode=EMO_MODE)
+    session_mie = MaatIntuitionEngine()
+    session_analytics = PostTurnAnalytics(
+        alignment_kernel, id_kernel, emotion_engine, emm,
+        persona, reflex, session_mie, self_evo, namespace.memory, lock=ANALYTICS_LOCK,
+    )
+    session_pipeline = ChatPipeline(
+        namespace.brain, id_kernel, alignment_kernel, session_analytics,
+        prefix_cache, ThinkLoop(candidates=3, max_tokens=192),
+        speed_trainer=speed_trainer,
+    )
+    return Session(
+        session_id, namespace, id_kernel, session_mie,
+        session_analytics, session_pipeline, prefix, n_ctx,
+    )
+
+
 # ======================================================================
 # MODEL CHOICE
 # ======================================================================
-def choose_model():
+MODEL_CHOICE_PATH = os.path.join(DATA_DIR, "model_choice.json")
+
+
+def load_model_choice():
+    try:
+        with open(MODEL_CHOICE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_model_choice(model_path, perf):
+    try:
+        with open(MODEL_CHOICE_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "model": os.path.basename(model_path),
+                    "perf": perf.get("tier"),
+                    "draft": perf.get("draft"),
+                },
+                f,
+                indent=2,
+            )
+    except Exception as e:
+        print("[MODEL CHOICE ERROR]", e)
+
+
+def choose_model(default=None):
     print("──────────────────────────────────────────────")
     print("🌿 MAAT-KI — Modell auswählen")
     print("──────────────────────────────────────────────")
@@ -159,9 +414,17 @@ def choose_model():
     for i, m in enumerate(models, 1):
         print(f"[{i}] {m}")
 
+    if default not in models:
+        default = None
+    if default:
+        print(f"[Enter] zuletzt benutzt: {default}")
+
     while True:
         try:
-            c = int(input("\n🔢 Auswahl: "))
+            raw = input("\n🔢 Auswahl: ").strip()
+            if not raw and default:
+                return os.path.join(MODEL_DIR, default)
+            c = int(raw)
             if 1 <= c <= len(models):
                 return os.path.join(MODEL_DIR, models[c - 1])
         except ValueError:
@@ -169,6 +432,41 @@ def choose_model():
         print(Fore.RED + "Bitte eine gültige Zahl eingeben.")
 
 
+# ======================================================================
+# DRAFT CHOICE (Speculative Decoding)
+# ======================================================================
+def choose_draft(model_path, default=None):
+    """
+    Kleines Draft-Modell (gleiche Modellfamilie / gleiches Vokabular) oder
+    Prompt-Lookup. Gibt None, "lookup" oder den Pfad zum Draft-GGUF zurück.
+    """
+    size = os.path.getsize(model_path)
+    drafts = [
+        m for m in sorted(os.listdir(MODEL_DIR))
+        if m.endswith(".gguf")
+        and os.path.join(MODEL_DIR, m) != model_path
+        and os.path.getsize(os.path.join(MODEL_DIR, m)) < size / 3
+    ]
+
+    print("\n──────────────────────────────────────────────")
+    print("⚡ Speculative Decoding")
+    print("──────────────────────────────────────────────")
+    print("[0] aus")
+    print("[1] Prompt-Lookup (ohne Extra-Modell)")
+    for i, m in enumerate(drafts, 2):
+        print(f"[{i}] Draft-Modell: {m}")
+
+    options = {"0": None, "1": "lookup"}
+    for i, m in enumerate(drafts, 2):
+        options[str(i)] = os.path.join(MODEL_DIR, m)
+
+    default_key = next((k for k, v in options.items() if v == default), "0")
+    print(f"[Enter] zuletzt benutzt: {default_key}")
+
+    choice = input("\n🔢 Auswahl: ").strip() or default_key
+    return options.get(choice)
+
+
 # ======================================================================
 # PROFILE CHOICE
 # ======================================================================
@@ -195,7 +493,15 @@ def choose_profile():
 # ======================================================================
 # PERFORMANCE CHOICE
 # ======================================================================
-def choose_performance():
+PERF_PROFILES = {
+    "1": dict(tier="1", n_ctx=16000, temperature=0.7, top_p=0.9),
+    "2": dict(tier="2", n_ctx=8000, temperature=0.8, top_p=0.92),
+    "3": dict(tier="3", n_ctx=4096, temperature=0.9, top_p=0.95),
+    "4": dict(tier="4", n_ctx=2048, temperature=1.0, top_p=0.98),
+}
+
+
+def choose_performance(default=None):
     print("\n──────────────────────────────────────────────")
     print("⚙️ Performance-Modus")
     print("──────────────────────────────────────────────")
@@ -204,15 +510,11 @@ def choose_performance():
     print("[3] LOW (4k)")
     print("[4] ULTRA LOW (2k)")
 
-    profiles = {
-        "1": dict(n_ctx=16000, temperature=0.7, top_p=0.9),
-        "2": dict(n_ctx=8000, temperature=0.8, top_p=0.92),
-        "3": dict(n_ctx=4096, temperature=0.9, top_p=0.95),
-        "4": dict(n_ctx=2048, temperature=1.0, top_p=0.98),
-    }
+    if default in PERF_PROFILES:
+        print(f"[Enter] zuletzt benutzt: {default}")
 
-    choice = input("\n🔢 Auswahl: ").strip()
-    return profiles.get(choice, profiles["1"])
+    choice = input("\n🔢 Auswahl: ").strip() or default
+    return dict(PERF_PROFILES.get(choice, PERF_PROFILES["1"]))
 
 
 # ======================================================================
@@ -279,33 +581,31 @@ def choose_tts():
 # CHAT LOOP
 # ======================================================================
 def chat():
-    global LAST_REPLY_TIME, AUTOR_MODE, autor_used_this_turn, autor_escape
 
     print(Fore.GREEN + "\n🌿 Starte MAAT-KI …\n")
+
+    # LLM zuerst wählen und im Hintergrund laden (mmap / GPU-Init),
+    # während Profil, Plugins, TTS und Prompt-Aufbau laufen
+    last_choice = load_model_choice()
+    model_path = choose_model(last_choice.get("model"))
+    perf = choose_performance(last_choice.get("perf"))
+    perf["draft"] = choose_draft(model_path, last_choice.get("draft"))
+    save_model_choice(model_path, perf)
+    llm_ready = models.load_async(model_path, perf)
+    llm = None
+
     # PROFILE
     profile = choose_profile()
     profile_prompt = profile["systemprompt"]
 
-    # TIME CONTEXT
-    time_context = build_time_context()
-    LAST_REPLY_TIME = time.time()
-    runtime_context = build_runtime_context(LAST_REPLY_TIME)
+    # TIME CONTEXT (pro Runde, siehe PromptAssembler → nicht im Prefix)
     if EMO_MODE:
         base_prompt = EMO_SYSTEMPROMPT
     else:
         base_prompt = MAAT_SYSTEMPROMPT_BASE
         
-    # SYSTEMPROMPT BUILDING
-    combined_prompt = (
-        MAAT_SYSTEMPROMPT_BASE
-        + "\n\n"
-        + f"### PROFIL: {profile['name'].upper()} ###\n"
-        + profile_prompt
-        + "\n\n"
-        + time_context
-        + "\n"
-        + runtime_context
-    )
+    # SYSTEMPROMPT BUILDING (stabil → KV-Cache-Prefix)
+    combined_prompt = build_combined_prompt(profile["name"], profile_prompt)
 
     print(Fore.GREEN + f"Aktives Profil: {profile['name']}\n")
 
@@ -331,33 +631,63 @@ def chat():
     ).start()
 
     # --------------------------------------------------
-    # CONVERSATION BASIS
+    # PERSONA-BLOCK
     # --------------------------------------------------
-    conversation = [
-        {"role": "system", "content": combined_prompt},
-        {"role": "system", "content": memory.last_context()},
-    ]
+    persona_block = build_persona_block()
 
     # --------------------------------------------------
-    # PERSONA-BLOCK
+    # CONVERSATION BASIS
+    #   Prefix (Systemprompt + Persona + letzter Kontext) bleibt stabil,
+    #   Pro-Runde-Blöcke kommen ans Ende → KV-Cache wird wiederverwendet
     # --------------------------------------------------
-    style = persona.get_style_bias()
-    traits = persona.get_trait_snapshot()
+    last_context = memory.last_context()
+
+    def build_prefix():
+        return [
+            {"role": "system", "content": combined_prompt},
+            {"role": "system", "content": persona_block},
+            {"role": "system", "content": last_context},
+        ]
+
+    # Terminal = eine Session auf den globalen Engines (Standard-Namespace data/)
+    # Token-Budget je Performance-Stufe, alte Runden → LongTermMemory
+    # (Tokenizer wird nachgereicht, sobald das Modell geladen ist)
+    session = Session(
+        "terminal",
+        MemoryNamespace("default", DATA_DIR, memory, brain, ltm),
+        identity_kernel, mie, analytics, pipeline,
+        build_prefix(), perf["n_ctx"],
+    )
+    conversation = session.conversation
+    context_window = session.context_window
 
-    conversation.append({
-        "role": "system",
-        "content": (
-            f"[PERSONA]\n"
-            f"Traits: {traits}\n"
-            f"Style Bias: {style}\n"
-            "Nutze diese Persona-Parameter für Ton, Tiefe und Wärme der Antwort."
-        )
-    })
+    # Wartung nur, wenn der Nutzer länger nichts geschrieben hat
+    maintenance.idle_since = lambda: session.last_reply_time
+    maintenance.start()
 
-    # LLM
-    model_path = choose_model()
-    perf = choose_performance()
-    llm = load_llm(model_path, perf)
+    # Prefix auswerten, sobald das Modell da ist – während der Nutzer tippt
+    llm_ready.add_done_callback(
+        lambda f: f.exception() is None and prefix_cache.warm_async(f.result(), conversation)
+    )
+
+    def ready_llm():
+        # Readiness-Future: erst vor der ersten Generation wird gewartet;
+        # danach übernimmt es fertige Hot-Swaps aus dem ModelManager
+        nonlocal llm
+        if llm is None and not llm_ready.done():
+            print(Fore.CYAN + "⏳ Modell lädt noch …")
+        current = models.current()
+        if current.llm is not llm:
+            switched = llm is not None
+            llm = current.llm
+            context_window.set_llm(llm, current.perf["n_ctx"])
+            if switched:
+                conversation.add_volatile(
+                    f"[MODEL SWITCH] LLM wurde gewechselt zu: {current.name}"
+                )
+            else:
+                print(Fore.GREEN + f"🌿 Modell bereit: {current.name}\n")
+        return llm
 
     print(Fore.CYAN + "📘 Nutze /hilfe für Befehle.\n")
     print(Fore.GREEN + "Du kannst jetzt der KI schreiben. Erste Antwort dauert etwas.\n")
@@ -369,7 +699,10 @@ def chat():
     # ================================================================
     while True:
         try:
+            # zurück am Prompt → Leerlauf beginnt; Eingabe → Wartung sofort stoppen
+            maintenance.activity("terminal", False)
             user_input = input(Fore.YELLOW + "> " + Style.RESET_ALL).strip()
+            maintenance.activity("terminal", True)
             if not user_input:
                 continue
 
@@ -386,17 +719,8 @@ def chat():
                 p = user_input.split(" ", 1)[1].strip()
                 try:
                     profile = profile_loader.load_profile(p)
-                    combined_prompt = (
-                        MAAT_SYSTEMPROMPT_BASE
-                        + "\n\n"
-                        + f"### PROFIL: {p.upper()} ###\n"
-                        + profile["systemprompt"]
-                        + "\n\n"
-                        + build_time_context()
-                        + "\n"
-                        + build_runtime_context(LAST_REPLY_TIME)
-                    )
-                    conversation[0]["content"] = combined_prompt
+                    combined_prompt = build_combined_prompt(p, profile["systemprompt"])
+                    conversation.set_prefix(build_prefix())
                     print(Fore.GREEN + f"🌿 Profil gewechselt: {p}")
                 except Exception:
                     print(Fore.RED + "⚠ Fehler beim Profilwechsel")
@@ -429,33 +753,51 @@ def chat():
                     print(Fore.RED + "⚠ Anchor-Modul nicht aktiv.")
                 continue
 
-            if user_input == "/backup":
-                if backup is not None:
-                    print(backup.daily_backup())
-                else:
+            if user_input == "/backup" or user_input.startswith("/backup "):
+                if backup is None:
                     print(Fore.RED + "⚠ Backup-Modul nicht aktiv.")
+                    continue
+                parts = user_input.split()
+                sub = parts[1] if len(parts) > 1 else ""
+                arg = parts[2] if len(parts) > 2 else None
+                try:
+                    if sub == "list":
+                        print(Fore.CYAN + backup.pretty_list() + "\n")
+                    elif sub == "verify":
+                        print(backup.verify(arg))
+                    elif sub == "restore":
+                        print(Fore.YELLOW + backup.restore(arg))
+                        print(Fore.YELLOW + "🔁 Bitte MAAT-KI neu starten, damit alle Engines den Stand neu laden.")
+                    else:
+                        print(backup.backup())
+                except Exception as e:
+                    print("[BACKUP ERROR]", e)
                 continue
 
             # -------------------------------------------------
             # Modellwechsel
             # -------------------------------------------------
+            if user_input.strip() == "/model status":
+                print(Fore.CYAN + models.status_text() + "\n")
+                continue
+
             if user_input.strip() == "/model":
                 print(Fore.CYAN + "\n🔄 Modellwechsel gestartet…\n")
                 try:
+                    ready_llm()
                     new_model_path = choose_model()
                     new_perf = choose_performance()
-                    print(Fore.YELLOW + "\n📦 Lade neues Modell…\n")
-                    llm = load_llm(new_model_path, new_perf)
+                    new_perf["draft"] = choose_draft(new_model_path)
                     print(
-                        Fore.GREEN
-                        + f"\n🌿 Modell erfolgreich gewechselt → {os.path.basename(new_model_path)}\n"
-                    )
-                    conversation.append(
-                        {
-                            "role": "system",
-                            "content": f"[MODEL SWITCH] LLM wurde gewechselt zu: {os.path.basename(new_model_path)}",
-                        }
+                        Fore.YELLOW
+                        + "\n📦 Lade neues Modell im Hintergrund – du kannst weiterschreiben.\n"
                     )
+
+                    def on_switch(ok, msg):
+                        print((Fore.GREEN + "\n🌿 " if ok else Fore.RED + "\n❌ ") + msg + "\n")
+
+                    # altes Modell antwortet weiter; Tausch erst, wenn das neue warm ist
+                    models.switch_async(new_model_path, new_perf, conversation, on_done=on_switch)
                 except Exception as e:
                     print(Fore.RED + f"❌ Fehler beim Modellwechsel: {e}\n")
                 continue
@@ -580,8 +922,8 @@ def chat():
             # AUTOR-MODUS
             # -------------------------------------------------
             if user_input.lower() == "autor on":
-                AUTOR_MODE = True
-                autor_escape = False
+                session.autor_mode = True
+                session.autor_escape = False
                 print(Fore.GREEN + "🟢 Autor-Modus aktiviert (sicher).")
                 print(
                     Fore.YELLOW
@@ -590,13 +932,13 @@ def chat():
                 continue
 
             if user_input.lower() in ["autor off", "autor aus"]:
-                AUTOR_MODE = False
-                autor_escape = False
+                session.autor_mode = False
+                session.autor_escape = False
                 print(Fore.YELLOW + "⛔ Autor-Modus deaktiviert.\n")
                 continue
 
             if user_input.lower() in ["stop", "abbruch", "halt"]:
-                autor_escape = True
+                session.autor_escape = True
                 print(Fore.YELLOW + "⛔ Autor-Fortsetzung für diese Antwort gestoppt.\n")
                 continue
 
@@ -608,7 +950,6 @@ def chat():
                     report = dreaming.run_night_cycle(
                         hours_back=24,
                         max_episodes=300,
-                        decay_factor=0.997,
                         delete_threshold=0.02,
                     )
                     print(Fore.MAGENTA + "\n" + report + "\n")
@@ -660,16 +1001,13 @@ def chat():
                 # /sem latest → letzte 10 Einträge
                 if len(parts) >= 2 and parts[1] == "latest":
                     try:
-                        sem_mem.cur.execute(
-                            "SELECT ts, text FROM semantic_memory ORDER BY id DESC LIMIT 10"
-                        )
-                        rows = sem_mem.cur.fetchall()
+                        rows = sem_mem.latest(10)
                         if not rows:
                             print(Fore.YELLOW + "\n📭 Noch keine semantischen Erinnerungen gespeichert.\n")
                         else:
                             print(Fore.CYAN + "\n🧠 Letzte 10 semantische Erinnerungen:\n")
-                            for ts, text in rows:
-                                print(Fore.CYAN + f"- [{ts}] {text}")
+                            for r in rows:
+                                print(Fore.CYAN + f"- [{r['ts']}] {r['text']}")
                     except Exception as e:
                         print(Fore.RED + f"[SEM LATEST ERROR] {e}")
                     continue
@@ -686,6 +1024,13 @@ def chat():
                 print(Fore.CYAN + speed_trainer.pretty_info() + "\n")
                 continue
 
+            # -------------------------------------------------
+            # /wartung – Leerlauf-Wartung (Status)
+            # -------------------------------------------------
+            if user_input.strip() in ("/wartung", "/maintenance"):
+                print(Fore.CYAN + maintenance.status_text() + "\n")
+                continue
+
             # -------------------------------------------------
             # /evo – Self-Evolution Commands
             # -------------------------------------------------
@@ -736,107 +1081,72 @@ def chat():
             # /zeit – Zeitgefühl anzeigen (früh raus)
             # ---------------------------------------------
             if user_input.strip() == "/zeit":
-                print(Fore.BLUE + build_runtime_context(LAST_REPLY_TIME) + "\n")
+                print(Fore.BLUE + build_runtime_context(session.last_reply_time) + "\n")
                 continue
 
             # ---------------------------------------------
-            # 1. USER MESSAGE IN GEHIRN-SPEICHER (episodic + semantic)
-            #    → Slash-Befehle NICHT abspeichern
-            # ---------------------------------------------
-            if not user_input.startswith("/"):
-                try:
-                    brain.store("user", user_input)
-                except Exception as e:
-                    print(Fore.RED + f"[BRAIN STORE USER ERROR] {e}")
-
-            conversation.append({"role": "user", "content": user_input})
-            identity_kernel.inject_identity(conversation, user_input)
-
-            # ---------------------------------------------
-            # LANGZEIT-ERINNERUNGEN (Gehirn-Auto-Recall)
-            # → kombiniert episodisch + semantisch
+            # RUNDE VORBEREITEN (core/pipeline.py)
+            #   Gehirn-Speicher, Zeit, Identität, [MIE],
+            #   Langzeit-Erinnerungen (episodisch + semantisch), Modus
             # ---------------------------------------------
-            mem_hits = []
-            try:
-                mem_hits = brain.recall(user_input, limit=5)
-            except Exception as e:
-                print(Fore.RED + f"[BRAIN RECALL ERROR] {e}")
+            turn = pipeline.prepare(conversation, user_input, session.last_reply_time)
 
-            if mem_hits:
+            if turn["memories"]:
                 print(Fore.BLUE + "\n📜 Langzeit-Erinnerungen (inkl. Semantik):")
-                mem_lines = []
-                seen = set()
-
-                for r in mem_hits:
-                    full_text = (r.get("text") or "").replace("\n", " ")
-                    if not full_text or full_text in seen:
-                        continue
-                    seen.add(full_text)
-
-                    ts = str(r.get("ts") or "?")
-                    role = r.get("role", "memory")
-                    cat = r.get("category", "allgemein")
-
+                for ts, role, cat, full_text in turn["memories"]:
                     snippet = full_text if len(full_text) <= 160 else full_text[:157] + "..."
-
-                    # Terminal-Ausgabe
                     print(Fore.BLUE + f"  - [{ts}] ({role}) <{cat}> {snippet}")
-
-                    # Volltext für Prompt-Block
-                    mem_lines.append(f"[{ts}] ({role}) <{cat}> {full_text}")
-
                 print(Style.RESET_ALL)
 
-                mem_block = (
-                    "Die folgenden Einträge stammen aus deinem Gehirn-Speicher "
-                    "(episodisch + semantisch). Nutze sie als Erinnerungs-Kontext.\n"
-                    "[LONG_TERM_MEMORY]\n"
-                    + "\n".join(mem_lines)
-                )
-
-                conversation.append({"role": "system", "content": mem_block})
-            # ---------------------------------------------
-            # MODE
-            # ---------------------------------------------
-            mode = detect_mode(user_input)
-            conversation.append(
-                {
-                    "role": "system",
-                    "content": f"[MODE: {mode}] {mode_instructions(mode)}",
-                }
-            )
+            ready_llm()
 
             print(Fore.YELLOW + "\n🤖 KI denkt…" + Style.RESET_ALL)
             print(Fore.GREEN + "→ ", end="", flush=True)
 
             speak_fn = tts.speak_chunk if tts else None
 
+            # gecachten Prefix-State sicherstellen, Prompt ins Token-Budget
+            pipeline.ready(llm, conversation, context_window)
+
             # -------------------------------------------------
             # THINKING MODE – falls der User es verlangt
             # -------------------------------------------------
             if thinkloop.needs_think(user_input):
                 print(Fore.MAGENTA + "🧠 Denkmodus aktiviert…" + Style.RESET_ALL)
-                internal_thoughts = thinkloop.run_thinkloop(llm, conversation)
-                conversation.append(
-                    {"role": "system", "content": f"[THOUGHTS]\n{internal_thoughts}"}
+                pipeline.think(
+                    llm,
+                    conversation,
+                    user_input,
+                    stream_fn=lambda t: print(Fore.MAGENTA + t + Style.RESET_ALL, end="", flush=True),
+                    context_window=context_window,
                 )
+                print()
+                if thinkloop.last_scores:
+                    scores = ", ".join(f"{s:.2f}" for s in thinkloop.last_scores)
+                    chosen = "" if thinkloop.last_choice == 0 else f" → Kette {thinkloop.last_choice + 1} gewählt"
+                    print(Fore.MAGENTA + f"🧠 {len(thinkloop.last_scores)} Gedankenketten · Maat-Scores: {scores}{chosen}" + Style.RESET_ALL)
 
             # -------------------------------------------------
             # LLM ANTWORT
             # -------------------------------------------------
+            model_name = models.current().name
             reply_text = stream_completion_gui(
                 llm,
-                conversation,
+                conversation.messages(),
                 gui_queue=output_queue,
                 speak_fn=speak_fn,
                 show_progress=first_reply,
+                consumers=pipeline.telemetry(model_name, conversation, context_window),
+                expected_first_token=speed_trainer.expected_first_token(
+                    model_name, context_window.n_ctx
+                ),
             )
 
             # -------------------------------------------------
             # AUTOR-MODUS (sicher, einmal pro Runde)
             # -------------------------------------------------
-            if AUTOR_MODE and not autor_used_this_turn and not autor_escape:
-                autor_used_this_turn = True
+            if session.autor_mode and not session.autor_used_this_turn and not session.autor_escape:
+                session.autor_used_this_turn = True
 
                 continuation_prompt = (
                     "Fahre die vorherige Antwort in maximal 3 klaren Sätzen fort. "
@@ -844,183 +1154,172 @@ def chat():
                     "Nur eine natürliche Ergänzung."
                 )
 
-                conversation.append({
-                    "role": "system",
-                    "content": "[AUTOR] " + continuation_prompt
-                })
-
-                # zweite, kurze Fortsetzungs-Generation
-                continuation = stream_completion_gui(
-                    llm,
-                    conversation,
-                    gui_queue=output_queue,
-                    speak_fn=speak_fn,
-                    show_progress=False,
+                # Fortsetzung derselben Generation: Antwort + Anweisung hinten
+                # anhängen, KV-Cache bleibt → nur die neuen Tokens kosten Zeit
+                continuation_msgs = conversation.continuation(
+                    reply_text, "[AUTOR] " + continuation_prompt
                 )
+                # Prompt + Antwort + Anweisung müssen samt Fortsetzung in n_ctx passen
+                room = context_window.room(continuation_msgs)
+                if room < AUTOR_MIN_TOKENS:
+                    print(Fore.YELLOW + "✍️ Kein Platz mehr im Kontext für eine Autor-Fortsetzung.\n")
+                else:
+                    continuation = stream_completion_gui(
+                        llm,
+                        continuation_msgs,
+                        gui_queue=output_queue,
+                        speak_fn=speak_fn,
+                        show_progress=False,
+                        max_tokens=min(AUTOR_MAX_TOKENS, room),
+                        # Fortsetzung mit warmem KV-Cache → nicht in die Latenz-Statistik
+                        expected_first_token=speed_trainer.expected_first_token(
+                            model_name, context_window.n_ctx
+                        ),
+                    )
 
-                print(Fore.CYAN + "\n✍️ Autor-Fortsetzung:\n" + continuation + "\n")
+                    print(Fore.CYAN + "\n✍️ Autor-Fortsetzung:\n" + continuation + "\n")
 
-                # Abschluss merken
-                conversation.append({"role": "assistant", "content": continuation})
+                    # Abschluss merken
+                    reply_text = reply_text + "\n\n" + continuation
             else:
-                autor_used_this_turn = False
-                autor_escape = False
+                session.autor_used_this_turn = False
+                session.autor_escape = False
 
-            # Identity-Korrektur
-            reply_text = identity_kernel.sanitize(reply_text)
-
-            # Alignment-Anpassung
-            aligned_text, align_meta = alignment_kernel.align(reply_text)
-            reply_text = aligned_text
-
-            maat_score = align_meta.get("maat_score", 0.0)
-            print(Fore.GREEN + f"🌿 Maat-Score: {maat_score:.2f}")
+            # Identity-Korrektur, Runde in die History, danach POST-TURN
+            # ANALYTICS (Alignment, Reflexion, Emotion/EMM, Persona, B_KI,
+            # Drift, MIE, Self-Evo, Speichern) → Worker-Thread, Events
+            pipeline.finish(conversation, user_input, reply_text)
             first_reply = False
             print("\n")
 
-            # ---------------------------------------------
-            # ALIGNMENT EVAL
-            # ---------------------------------------------
-            try:
-                aligned_reply = alignment_kernel.evaluate(reply_text)
-            except Exception:
-                aligned_reply = reply_text
-
-            # ---------------------------------------------
-            # REFLEXION
-            # ---------------------------------------------
-            thought = reflex.generate_reflexion_question(user_input, aligned_reply)
-            print(Fore.CYAN + f"\n💭 Gedanke: {thought}\n")
-
             # ---------------------------------------------
             # RUNTIME FEELING
             # ---------------------------------------------
-            print(Fore.BLUE + build_runtime_context(LAST_REPLY_TIME) + "\n")
-            LAST_REPLY_TIME = time.time()
-
-
-            # ---------------------------------------------
-            # EMOTION + EMM
-            # ---------------------------------------------
-            try:
-                # Emotion Engine
-                e_raw = emotion_engine.detect_raw(user_input)
-                E_KI = emotion_engine.compute_emotion(
-                    e_raw, H=0.8, V=0.85, deltaD=0.1, R=1.0
-                )
-                emo_txt = emotion_engine.transform(e_raw)
-                safe_info = emotion_engine.safe(e_raw, E_KI)
-
-                # EMM: Emotion → Maat-Vektor
-                mie_weights = emm.map(emo_txt, intensity=abs(E_KI))
-
-                print(Fore.LIGHTCYAN_EX + f"🌀 EMM-Maat-Vektor: {mie_weights}\n")
-                print(Fore.LIGHTBLUE_EX + f"💙 Emotion: {emo_txt} ({E_KI:.2f})")
-                print(Fore.LIGHTBLUE_EX + f"💬 Sicherheit: {safe_info}\n")
-
-            except Exception as e:
-                print(Fore.RED + f"[EMOTION/EMM ERROR] {e}")
-
-            # ---------------------------------------------
-            # Emotion → Persona-Anpassung
-            # ---------------------------------------------
-            try:
-                e_raw = emotion_engine.detect_raw(user_input)
-                E_KI = emotion_engine.compute_emotion(
-                    e_raw, H=0.8, V=0.85, deltaD=0.1, R=1.0
-                )
-                emo_txt = emotion_engine.transform(e_raw)
-
-                # Persona lernt aus Emotion
-                persona.update_from_emotion(e_raw, abs(E_KI))
-
-            except Exception as e:
-                print(Fore.RED + f"[PERSONA EMOTION ERROR] {e}")
-
-            # ---------------------------------------------
-            # B_KI + Emotion
-            # ---------------------------------------------
-            try:
-                base_bki = reflex.compute_b_ki(aligned_reply, user_input, conversation)
-                mod_bki = base_bki * (1 + 0.25 * E_KI)
-                print(Fore.MAGENTA + f"🜂 B_KI: {mod_bki:.2f}\n")
-            except Exception as e:
-                print(Fore.RED + f"[B_KI ERROR] {e}")
-
-            # ---------------------------------------------
-            # Identity-Drift
-            # ---------------------------------------------
-            try:
-                id_drift = identity_kernel.measure_drift(aligned_reply)
-                print(Fore.YELLOW + f"🔶 Identity-Drift: {id_drift:.2f}\n")
-            except Exception as e:
-                id_drift = 0.0
-                print(Fore.RED + f"[IDENTITY DRIFT ERROR] {e}")
-
-            # ---------------------------------------------
-            # Maat-Intuition Engine
-            # ---------------------------------------------
-            try:
-                mie_info = mie.evaluate(
-                    user_input,
-                    maat_vec={"H":0.8,"B":0.85,"S":0.9,"V":0.88,"R":0.92},
-                    emotion=E_KI,
-                    drift=id_drift
-                )
-
-                print(Fore.MAGENTA + f"🔮 Intuition: {mie_info['intuition']:.2f}")
-                print(Fore.MAGENTA + f"✨ Intent: {mie_info['intent']}")
-                print(Fore.MAGENTA + f"🌿 Resonanz: {mie_info['resonance']:.2f}\n")
-
-                # Die Intuition beeinflusst die Antwort
-                conversation.append({
-                    "role": "system",
-                    "content": f"[MIE] intuition={mie_info['intuition']:.2f} intent={mie_info['intent']}"
-                })
-
-            except Exception as e:
-                print(Fore.RED + f"[MIE ERROR] {e}")
-
-            # ---------------------------------------------
-            # Self-Evolution Engine
-            # ---------------------------------------------
-            try:
-                meta_data = {
-                    "maat_score": maat_score,
-                    "emotion": E_KI,
-                    "identity_drift": id_drift,
-                }
-
-                patch = self_evo.evaluate_and_evolve(aligned_reply, meta_data)
-
-                if patch:
-                    if patch.get("status") == "blocked":
-                        print(
-                            Fore.YELLOW
-                            + f"⚠️ Selbst-Evolution blockiert (Limit erreicht): {patch['reason']}\n"
-                        )
-                    else:
-                        self_evo.print_patch(patch)
-            except Exception as e:
-                print(Fore.RED + f"[SELF-EVO ERROR] {e}")
-
-            # ---------------------------------------------
-            # 5. ASSISTANT-ANTWORT SPEICHERN (Gehirn + Kurzzeitgedächtnis)
-            # ---------------------------------------------
-            try:
-                memory.add("assistant", reply_text)
-            except Exception as e:
-                print(Fore.RED + f"[SPEICHERN ERROR] {e}")
+            print(Fore.BLUE + build_runtime_context(session.last_reply_time) + "\n")
+            session.last_reply_time = time.time()
 
         except KeyboardInterrupt:
             print(Fore.YELLOW + "\n\n🌿 MAAT-KI beendet sich sanft. Auf Wiedersehen!\n")
+            maintenance.stop()
+            analytics.join()
+            flush_memory_writes()
+            close_all_databases()
             break
 
         except Exception as e:
             print(Fore.RED + f"\nUnerwarteter Fehler im Chat-Loop: {e}")
             continue
+# ======================================================================
+# SERVER-MODUS (headless, OpenAI-kompatibel)
+# ======================================================================
+def _arg(name, default=None):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
+
+def serve():
+    """
+    Ohne Rückfragen: letztes Modell / letzte Performance-Stufe aus
+    model_choice.json (sonst erstes Modell, HIGH), Profil per --profile.
+    """
+    from core.server import ChatServer, DEFAULT_HOST, DEFAULT_PORT
+
+    last_choice = load_model_choice()
+    available = sorted(m for m in os.listdir(MODEL_DIR) if m.endswith(".gguf"))
+    model_name = _arg("--model", last_choice.get("model"))
+    if model_name not in available:
+        if not available:
+            print(Fore.RED + "❗ Keine Modelle gefunden!")
+            raise SystemExit(1)
+        model_name = available[0]
+
+    perf = dict(PERF_PROFILES.get(last_choice.get("perf"), PERF_PROFILES["1"]))
+    perf["draft"] = last_choice.get("draft")
+    models.load_async(os.path.join(MODEL_DIR, model_name), perf)
+
+    profile_name = _arg("--profile", "harmonic")
+    profile = profile_loader.load_profile(profile_name)
+    combined_prompt = build_combined_prompt(profile["name"], profile["systemprompt"])
+
+    def new_session(session_id):
+        namespace = MemoryNamespace.open(session_id, os.path.join(SESSIONS_DIR, session_id))
+        prefix = [
+            {"role": "system", "content": combined_prompt},
+            {"role": "system", "content": build_persona_block()},
+            {"role": "system", "content": namespace.memory.last_context()},
+        ]
+        return make_session(session_id, namespace, prefix, perf["n_ctx"])
+
+    # --parallel N: N Sessions gleichzeitig, gemeinsam in EINEM Batch dekodiert
+    parallel = int(_arg("--parallel", 1))
+    batch = None
+    if parallel > 1:
+        resident = models.current()
+        # ein Slot (= KV-Sequenz) je Session → jede Session bekommt n_ctx // parallel
+        batch = BatchScheduler(resident.llm, n_slots=parallel)
+        shared = ScheduledModel(ScheduledLLM(batch), resident.perf, resident.name)
+        sources = [lambda: shared] * parallel
+    else:
+        sources = [models.current]
+
+    global server_sessions
+    sessions = server_sessions = SessionManager(new_session)
+    maintenance.idle_since = lambda: max(
+        (s.last_reply_time for s in sessions.all()), default=START_TIME
+    )
+
+    server = ChatServer(
+        sessions,
+        FairScheduler(sources),
+        models,
+        host=_arg("--host", DEFAULT_HOST),
+        port=int(_arg("--port", DEFAULT_PORT)),
+        maintenance=maintenance,
+    )
+    print(Fore.GREEN + f"🌿 MAAT-KI Server: {server.address}/v1  (Modell {model_name}, Profil {profile['name']})")
+
+    maintenance.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(Fore.YELLOW + "\n🌿 Server wird beendet …")
+    finally:
+        maintenance.stop()
+        server.shutdown()
+        analytics.join()
+        if batch is not None:
+            batch.close()
+        flush_memory_writes()
+        close_all_databases()
+
+
 # ======================================================================
 # START DES PROGRAMMS
 # ======================================================================
 if __name__ == "__main__":
-    chat()
\ No newline at end of file
+    if "--autotune" in sys.argv:
+        # python MAAT-KI.py --autotune → Lade-Parameter für ein Modell einmessen
+        from core.autotune import autotune
+        autotune(choose_model(), trainer=speed_trainer)
+    elif "--bench" in sys.argv:
+        # python MAAT-KI.py --bench [--model x.gguf] [--turns N] [--json out.json]
+        # → Zeit pro Stufe einer Runde (Stub-LLM, wenn kein Modell angegeben)
+        from core.bench import main as bench
+        model_arg = _arg("--model", None)
+        if model_arg and not os.path.isabs(model_arg) and not os.path.exists(model_arg):
+            model_arg = os.path.join(MODEL_DIR, model_arg)
+        turns_arg = _arg("--turns", None)
+        bench(
+            model_path=model_arg,
+            turns=int(turns_arg) if turns_arg else None,
+            n_ctx=int(_arg("--ctx", 4096)),
+            json_path=_arg("--json", None),
+        )
+    elif "--serve" in sys.argv:
+        # python MAAT-KI.py --serve → /v1/chat/completions (SSE) ohne Terminal
+        serve()
+    else:
+        chat()
\ No newline at end of file
@@ -4,12 +4,26 @@ import time
 import json
 import os
 
-PROFILE_PATH = "data/performance_profile.json"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_PATH = os.path.join(ROOT, "data", "performance_profile.json")
+DEFAULT_FIRST_TOKEN = 5.0
+
+
+def tier_for(seconds):
+    if seconds < 0.4:
+        return "ULTRA"
+    if seconds < 0.8:
+        return "HIGH"
+    if seconds < 1.6:
+        return "MEDIUM"
+    return "LOW"
 
 
 class AutoProfileSpeedTrainer:
 
-    def __init__(self):
+    def __init__(self, telemetry=None):
+        # telemetry = core.telemetry.LatencyTelemetry (Messwerte pro Modell + n_ctx)
+        self.telemetry = telemetry
         self.profile = self._load_profile()
 
     # ----------------------------------------------------
@@ -25,40 +39,54 @@ class AutoProfileSpeedTrainer:
         return {}
 
     def _save(self):
-        with open(PROFILE_PATH, "w") as f:
-            json.dump(self.profile, f, indent=2)
+        try:
+            os.makedirs(os.path.dirname(PROFILE_PATH), exist_ok=True)
+            with open(PROFILE_PATH, "w") as f:
+                json.dump(self.profile, f, indent=2)
+        except Exception as e:
+            print("[SPEED PROFILE SAVE ERROR]", e)
 
     # ----------------------------------------------------
-    # UPDATE after each first-token measurement
+    # Telemetrie: Tier + Erwartung aus echten Messungen
     # ----------------------------------------------------
-    def update_first_token_speed(self, seconds):
+    def consumer(self, model, n_ctx, prompt_tokens=0):
         """
-        seconds = gemessene Zeit zwischen Prompt und erstem Token
+        Stream-Consumer: Messung asynchron in die Telemetrie, danach Tier
+        aus dem Median neu bestimmen. Die JSON-Datei wird nur bei einem
+        Tier-Wechsel geschrieben – nicht bei jedem ersten Token.
         """
-
-        history = self.profile.get("first_token_history", [])
-        history.append(seconds)
-
-        # Maximal 20 Werte → genug für gleitenden Mittelwert
-        history = history[-20:]
-
-        avg = sum(history) / len(history)
-
-        self.profile["first_token_history"] = history
-        self.profile["avg_first_token"] = avg
-
-        # Dynamischer Lern-Faktor
-        if avg < 0.4:
-            self.profile["performance_tier"] = "ULTRA"
-        elif avg < 0.8:
-            self.profile["performance_tier"] = "HIGH"
-        elif avg < 1.6:
-            self.profile["performance_tier"] = "MEDIUM"
-        else:
-            self.profile["performance_tier"] = "LOW"
-
-        self._save()
-        return avg
+        if self.telemetry is None:
+            return lambda event: None
+        record = self.telemetry.consumer(model, n_ctx, prompt_tokens)
+
+        def consume(event):
+            record(event)
+            if event["type"] == "done":
+                self.refresh_tier(model, n_ctx)
+        return consume
+
+    def refresh_tier(self, model, n_ctx):
+        if self.telemetry is None:
+            return None
+        p50 = self.telemetry.expected_first_token(model, n_ctx)
+        if p50 is None:
+            return None
+
+        tier = tier_for(p50)
+        changed = tier != self.profile.get("performance_tier")
+        self.profile["avg_first_token"] = p50
+        self.profile["performance_tier"] = tier
+        if changed:
+            self._save()
+        return tier
+
+    def expected_first_token(self, model, n_ctx):
+        """Schätzung für den Fortschrittsbalken (Median, sonst altes Profil)."""
+        if self.telemetry is not None:
+            p50 = self.telemetry.expected_first_token(model, n_ctx)
+            if p50 is not None:
+                return p50
+        return self.profile.get("avg_first_token") or DEFAULT_FIRST_TOKEN
 
     # ----------------------------------------------------
     # Auto-Batch Optimizer
@@ -88,16 +116,49 @@ class AutoProfileSpeedTrainer:
             return max(1, cpu_cores - 3)
         return max(1, cpu_cores - 4)
 
+    # ----------------------------------------------------
+    # Autotune-Ergebnisse pro Modell (core/autotune.py)
+    # ----------------------------------------------------
+    @staticmethod
+    def model_key(model_path):
+        try:
+            size = os.path.getsize(model_path)
+        except OSError:
+            size = 0
+        return f"{os.path.basename(model_path)}:{size}"
+
+    def tuned_params(self, model_path):
+        entry = self.profile.get("tuned", {}).get(self.model_key(model_path))
+        if not entry:
+            return {}
+        return dict(entry.get("params", {}))
+
+    def save_tuned(self, model_path, params, stats):
+        tuned = self.profile.setdefault("tuned", {})
+        tuned[self.model_key(model_path)] = {
+            "params": params,
+            "stats": stats,
+            "ts": time.time(),
+        }
+        self._save()
+
     # ----------------------------------------------------
     # Debug output
     # ----------------------------------------------------
     def pretty_info(self):
+        latency = self.telemetry.pretty_info() + "\n" if self.telemetry is not None else ""
         if not self.profile:
-            return "Keine Performance-Daten gespeichert."
+            return latency + "Keine Performance-Daten gespeichert."
+
+        avg = self.profile.get("avg_first_token")
+        avg_txt = f"{avg:.3f}" if avg is not None else "?"
 
-        return (
+        return latency + (
             "📊 MAAT-KI Performance-Profil\n"
-            f"- Durchschnitt erster Token: {self.profile.get('avg_first_token', '?'):.3f} Sekunden\n"
+            f"- Durchschnitt erster Token: {avg_txt} Sekunden\n"
             f"- Tier: {self.profile.get('performance_tier', 'MEDIUM')}\n"
-            f"- Letzte 20 Messungen: {self.profile.get('first_token_history')}\n"
+            + "".join(
+                f"- Autotune {key}: {entry.get('params')}\n"
+                for key, entry in self.profile.get("tuned", {}).items()
+            )
         )
@@ -0,0 +1,136 @@
+# core/autotune.py
+# MAAT-KI — Hardware-Autotuner v1.0 (n_threads / n_threads_batch / n_batch / n_gpu_layers)
+
+import gc
+import os
+import sys
+import time
+
+from llama_cpp import Llama
+
+from core.auto_profile_speed import AutoProfileSpeedTrainer
+from core.llm_loader import (
+    default_params,
+    detect_gpu_backend,
+    detect_logical_cores,
+    detect_physical_cores,
+)
+
+BENCH_TEXT = (
+    "Maat steht für Harmonie, Balance, Schöpfungskraft, Verbundenheit und Respekt. "
+    "The quick brown fox jumps over the lazy dog while the model reads this prompt. "
+)
+
+# typische Runde: langer Prompt, mittellange Antwort → Gewichtung der Kosten
+TURN_PROMPT_TOKENS = 512
+TURN_REPLY_TOKENS = 128
+
+
+def _candidates(trainer, backend):
+    physical = detect_physical_cores()
+    logical = detect_logical_cores()
+
+    threads = sorted({
+        physical,
+        max(1, physical - 1),
+        max(1, physical // 2),
+        trainer.suggest_threads(physical),
+        logical,
+    })
+    threads_batch = sorted({physical, logical})
+    batches = sorted({256, 512, trainer.suggest_batch_size()})
+    gpu_layers = [0] if backend == "CPU" else [-1, 0]
+
+    # Reihenfolge = Einfluss auf die Geschwindigkeit (größter zuerst)
+    return [
+        ("n_gpu_layers", gpu_layers),
+        ("n_threads", threads),
+        ("n_threads_batch", threads_batch),
+        ("n_batch", batches),
+    ]
+
+
+# ------------------------------------------------
+# Ein Messlauf: Prompt-Eval + Generierung
+# ------------------------------------------------
+def bench_once(model_path, params, n_ctx=1024, prompt_tokens=256, gen_tokens=32):
+    llm = Llama(
+        model_path=model_path,
+        n_ctx=n_ctx,
+        use_mlock=False,
+        use_mmap=True,
+        verbose=False,
+        **params
+    )
+    try:
+        base = llm.tokenize(BENCH_TEXT.encode("utf-8"), add_bos=False)
+        tokens = [llm.token_bos()] + (base * (prompt_tokens // len(base) + 1))[: prompt_tokens - 1]
+
+        t0 = time.perf_counter()
+        llm.eval(tokens)
+        t_prompt = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(gen_tokens):
+            tok = llm.sample(temp=0.0)
+            llm.eval([tok])
+        t_gen = time.perf_counter() - t0
+    finally:
+        del llm
+        gc.collect()
+
+    pp = len(tokens) / max(t_prompt, 1e-6)
+    tg = gen_tokens / max(t_gen, 1e-6)
+    cost = TURN_PROMPT_TOKENS / pp + TURN_REPLY_TOKENS / tg
+    return {"prompt_tps": round(pp, 1), "gen_tps": round(tg, 1), "turn_seconds": round(cost, 3)}
+
+
+# ------------------------------------------------
+# Koordinatensuche: ein Parameter nach dem anderen
+# ------------------------------------------------
+def autotune(model_path, trainer=None, n_ctx=1024, report=print):
+    """
+    Misst mehrere Einstellungen, behält pro Parameter den schnellsten Wert
+    (Kosten = Sekunden für eine typische Runde) und speichert den Gewinner
+    im Performance-Profil. load_llm übernimmt ihn danach automatisch.
+    """
+    trainer = trainer or AutoProfileSpeedTrainer()
+    backend, best, _ = default_params(model_path)
+    best = {k: best[k] for k in ("n_threads", "n_threads_batch", "n_batch", "n_gpu_layers")}
+
+    report(f"🔧 Autotune: {os.path.basename(model_path)} (Backend {backend})")
+    results = {}
+
+    def measure(params):
+        key = tuple(sorted(params.items()))
+        if key not in results:
+            try:
+                results[key] = bench_once(model_path, params, n_ctx=n_ctx)
+                report(f"  {params} → {results[key]}")
+            except Exception as e:
+                report(f"  {params} → Fehler: {e}")
+                results[key] = None
+        return results[key]
+
+    best_stats = measure(best)
+    for name, values in _candidates(trainer, detect_gpu_backend()):
+        for v in values:
+            trial = dict(best, **{name: v})
+            stats = measure(trial)
+            if stats and (best_stats is None or stats["turn_seconds"] < best_stats["turn_seconds"]):
+                best, best_stats = trial, stats
+
+    if best_stats is None:
+        report("❌ Autotune: keine Einstellung lief erfolgreich.")
+        return None
+
+    trainer.save_tuned(model_path, best, best_stats)
+    report(f"🌿 Gewinner: {best} → {best_stats}")
+    return best
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Aufruf: python -m core.autotune <modell.gguf>")
+        raise SystemExit(1)
+    autotune(sys.argv[1])
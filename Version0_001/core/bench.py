@@ -0,0 +1,355 @@
+# core/bench.py
+# MAAT-KI — Pipeline-Benchmark v1.0 (Zeit pro Stufe einer Runde, JSON für Regressionen)
+
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import core.pipeline as pipeline_module
+from core.alignment_kernel import MaatAlignmentKernelV2
+from core.emotion_engine import EmotionEngine
+from core.db_pool import get_manager
+from core.emotion_maat_mapper import EmotionMaatMapper
+from core.identity_kernel import IdentityKernel
+from core.mie import MaatIntuitionEngine
+from core.persona_engine import PersonaEngine
+from core.pipeline import ChatPipeline
+from core.post_turn import PostTurnAnalytics
+from core.prompt_assembly import PrefixStateCache
+from core.reflexion import MaatReflexion
+from core.self_evolution import SelfEvolutionEngine
+from core.session import MemoryNamespace, Session
+from core.stream_engine import StreamEngine
+from core.systemprompt import MAAT_SYSTEMPROMPT
+from core.telemetry import percentile
+from core.thinkloop import ThinkLoop
+from core.write_buffer import flush_all
+
+# ---------------------------------------------------------
+# Skript-Korpus: typische Runden, Deutsch + Englisch gemischt
+# ---------------------------------------------------------
+BENCH_CORPUS = [
+    "Hallo MAAT, wie geht es dir heute?",
+    "Ich heiße Lena und wohne in Leipzig.",
+    "Mein Lieblingsessen ist Pasta mit Pesto.",
+    "Can you explain what the five Maat principles are?",
+    "Ich bin heute etwas traurig, die Arbeit war anstrengend.",
+    "Denke bitte darüber nach, wie ich besser schlafen kann.",
+    "What did I tell you about my favourite food?",
+    "Schreib mir ein kurzes Gedicht über den Herbst.",
+    "I'm really happy, I finally finished my project!",
+    "Wie berechnet man den Maat-Wert einer Idee?",
+    "Erinnerst du dich, wo ich wohne?",
+    "Analyse: Is remote work good for team harmony?",
+    "Danke dir, das war hilfreich.",
+    "Prüfe bitte, ob mein Plan für morgen ausgewogen ist.",
+    "Tell me something about respect in conversations.",
+    "Gute Nacht, bis morgen!",
+]
+
+STUB_WORDS = (
+    "Harmonie Balance Schöpfungskraft Verbundenheit Respekt "
+    "the idea feels balanced and kind . ich verstehe dich gut . "
+    "let us look at it step by step . das ist eine schöne Frage ."
+).split()
+
+STAGES = (
+    "brain_store", "brain_recall", "identity", "mode", "prefix", "fit",
+    "think", "first_token", "llm", "finish", "alignment", "reflexion",
+    "emotion", "b_ki", "drift", "mie", "self_evo", "memory_write", "flush",
+    "turn",
+)
+
+
+# ---------------------------------------------------------
+# Stub-LLM: llama.cpp-kompatible API, deterministisch, ohne Modell
+# ---------------------------------------------------------
+class StubLLM:
+    """
+    Liefert feste Pseudo-Antworten im llama.cpp-Format. first_token und
+    tokens_per_s simulieren ein Modell (0 = so schnell wie möglich →
+    misst nur die Pipeline selbst).
+    """
+
+    def __init__(self, n_ctx=4096, reply_tokens=48, first_token=0.0, tokens_per_s=0.0, seed=0):
+        self._n_ctx = n_ctx
+        self.reply_tokens = reply_tokens
+        self.first_token = first_token
+        self.tokens_per_s = tokens_per_s
+        self._rng = random.Random(seed)
+
+    def n_ctx(self):
+        return self._n_ctx
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return list(range(len(text) // 4 + int(add_bos)))
+
+    def _words(self, max_tokens):
+        n = min(self.reply_tokens, max_tokens or self.reply_tokens)
+        return [self._rng.choice(STUB_WORDS) for _ in range(n)]
+
+    def _stream(self, words):
+        if self.first_token:
+            time.sleep(self.first_token)
+        for i, w in enumerate(words):
+            if i and self.tokens_per_s:
+                time.sleep(1.0 / self.tokens_per_s)
+            yield {"choices": [{"index": 0, "delta": {"content": " " + w}}]}
+
+    def create_chat_completion(self, messages=None, stream=False, max_tokens=None, **kwargs):
+        words = self._words(max_tokens)
+        if stream:
+            return self._stream(words)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}}]}
+
+
+# ---------------------------------------------------------
+# Zeitmessung pro Stufe
+# ---------------------------------------------------------
+class StageTimer:
+    """Summiert Sekunden pro Stufe für die laufende Runde (thread-sicher)."""
+
+    def __init__(self):
+        self.samples = {s: [] for s in STAGES}
+        self._turn = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._turn[stage] = self._turn.get(stage, 0.0) + seconds
+
+    def wrap(self, obj, name, stage):
+        """Ersetzt obj.name (nur auf dieser Instanz) durch eine gemessene Version."""
+        fn = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - t0)
+
+        setattr(obj, name, timed)
+        return fn
+
+    def end_turn(self):
+        with self._lock:
+            turn, self._turn = self._turn, {}
+        for stage, seconds in turn.items():
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def report(self):
+        out = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            out[stage] = {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+        return out
+
+
+def rss_mb():
+    """Aktueller RSS (Linux: /proc), sonst Spitzenwert über resource."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1e6, 1)
+    except Exception:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS: Bytes, Linux: KiB
+        return round(peak / 1e6 if platform.system() == "Darwin" else peak * 1024 / 1e6, 1)
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------
+# Aufbau: eigene Engines + Gedächtnis in einem Wegwerf-Verzeichnis
+# ---------------------------------------------------------
+def build_session(data_dir, n_ctx, timer):
+    namespace = MemoryNamespace.open("bench", data_dir)
+    alignment = MaatAlignmentKernelV2()
+    identity = IdentityKernel()
+    emotion = EmotionEngine()
+    emm = EmotionMaatMapper()
+    persona = PersonaEngine(base_dir=os.path.join(data_dir, "persona"))
+    reflex = MaatReflexion()
+    mie = MaatIntuitionEngine()
+    self_evo = SelfEvolutionEngine(
+        namespace.memory, alignment, identity, base_dir=os.path.join(data_dir, "evo")
+    )
+
+    analytics = PostTurnAnalytics(
+        alignment, identity, emotion, emm, persona, reflex, mie, self_evo, namespace.memory,
+    )
+    analytics.subscribe(lambda e: e["type"] == "error" and print("[BENCH ANALYTICS]", e["lines"]))
+    pipeline = ChatPipeline(
+        namespace.brain, identity, alignment, analytics,
+        PrefixStateCache(), ThinkLoop(candidates=3, max_tokens=64),
+    )
+    session = Session(
+        "bench", namespace, identity, mie, analytics, pipeline,
+        [{"role": "system", "content": MAAT_SYSTEMPROMPT}], n_ctx,
+    )
+
+    # Stufen messen, ohne die Pipeline zu verändern
+    timer.wrap(namespace.brain, "store", "brain_store")
+    timer.wrap(namespace.brain, "recall", "brain_recall")
+    timer.wrap(identity, "inject_identity", "identity")
+    timer.wrap(pipeline.prefix_cache, "ensure", "prefix")
+    timer.wrap(session.context_window, "fit", "fit")
+    timer.wrap(alignment, "align", "alignment")
+    timer.wrap(reflex, "generate_reflexion_question", "reflexion")
+    timer.wrap(reflex, "compute_b_ki", "b_ki")
+    for name in ("detect_raw", "compute_emotion", "transform", "safe"):
+        timer.wrap(emotion, name, "emotion")
+    timer.wrap(emm, "map", "emotion")
+    timer.wrap(persona, "update_from_emotion", "emotion")
+    timer.wrap(identity, "measure_drift", "drift")
+    timer.wrap(mie, "evaluate", "mie")
+    timer.wrap(self_evo, "evaluate_and_evolve", "self_evo")
+    timer.wrap(namespace.memory, "add", "memory_write")
+    return session
+
+
+# ---------------------------------------------------------
+# Lauf
+# ---------------------------------------------------------
+def run_bench(llm, turns=len(BENCH_CORPUS) * 2, n_ctx=4096, model="stub", data_dir=None,
+              max_tokens=None, report=print):
+    """
+    Spielt turns Runden aus BENCH_CORPUS durch dieselben Stufen wie chat():
+    prepare → ready → think → Streaming → finish → Post-Turn-Analytics
+    → Schreibpuffer leeren. Gibt das Ergebnis als dict zurück.
+    """
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix="maat_bench_")
+    timer = StageTimer()
+    rss_start = rss_mb()
+    session = build_session(data_dir, n_ctx, timer)
+    session.use_llm(llm, n_ctx)
+    pipeline = session.pipeline
+    conv = session.conversation
+
+    # detect_mode ist eine Modulfunktion → für den Lauf gemessen einhängen
+    detect_mode = pipeline_module.detect_mode
+    timer.wrap(pipeline_module, "detect_mode", "mode")
+
+    gen_tokens = 0
+    t_start = time.perf_counter()
+    try:
+        for i in range(turns):
+            user_input = BENCH_CORPUS[i % len(BENCH_CORPUS)]
+            t0 = time.perf_counter()
+
+            pipeline.prepare(conv, user_input, session.last_reply_time)
+            pipeline.ready(llm, conv, session.context_window)
+
+            t = time.perf_counter()
+            pipeline.think(llm, conv, user_input, context_window=session.context_window)
+            if pipeline.thinkloop.needs_think(user_input):
+                timer.add("think", time.perf_counter() - t)
+
+            stats = {}
+
+            def measure(event):
+                if event["type"] in ("done", "aborted"):
+                    stats.update(event["data"])
+
+            t = time.perf_counter()
+            reply = StreamEngine(llm, consumers=[measure]).run(conv.messages(), max_tokens=max_tokens)
+            timer.add("llm", time.perf_counter() - t)
+            if stats.get("first_token") is not None:
+                timer.add("first_token", stats["first_token"])
+            gen_tokens += stats.get("tokens", 0)
+
+            t = time.perf_counter()
+            pipeline.finish(conv, user_input, reply)
+            session.analytics.join()
+            timer.add("finish", time.perf_counter() - t)
+
+            t = time.perf_counter()
+            flush_all()
+            timer.add("flush", time.perf_counter() - t)
+
+            session.last_reply_time = time.time()
+            timer.add("turn", time.perf_counter() - t0)
+            timer.end_turn()
+    finally:
+        pipeline_module.detect_mode = detect_mode
+        session.close()
+        flush_all()
+        for name in ("memory.db", "episodic_memory.db", "semantic_memory.db"):
+            get_manager(os.path.join(data_dir, name)).close_all()
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    wall = time.perf_counter() - t_start
+    result = {
+        "model": model,
+        "n_ctx": n_ctx,
+        "turns": turns,
+        "wall_s": round(wall, 3),
+        "turns_per_s": round(turns / max(wall, 1e-9), 2),
+        "gen_tokens_per_s": round(gen_tokens / max(wall, 1e-9), 1),
+        "rss_mb": {"start": rss_start, "end": rss_mb(), "peak": peak_rss_mb()},
+        "stages": timer.report(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "ts": time.time(),
+    }
+    report(pretty_report(result))
+    return result
+
+
+def pretty_report(result):
+    lines = [
+        f"⏱ MAAT-KI Bench: {result['model']} (n_ctx={result['n_ctx']}, {result['turns']} Runden)",
+        f"- {result['turns_per_s']} Runden/s · {result['gen_tokens_per_s']} tok/s · "
+        f"RSS {result['rss_mb']['start']} → {result['rss_mb']['end']} MB (Spitze {result['rss_mb']['peak']})",
+        f"  {'Stufe':<14}{'p50 ms':>10}{'p95 ms':>10}{'n':>6}",
+    ]
+    for stage in STAGES:
+        s = result["stages"].get(stage)
+        if s:
+            lines.append(f"  {stage:<14}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['n']:>6}")
+    return "\n".join(lines)
+
+
+def main(model_path=None, turns=None, n_ctx=4096, json_path=None, max_tokens=None):
+    """python MAAT-KI.py --bench [--model pfad.gguf] [--turns N] [--json out.json]"""
+    if model_path:
+        from core.llm_loader import load_llm
+        llm = load_llm(model_path, {"n_ctx": n_ctx}, announce=False)
+        model = os.path.basename(model_path)
+    else:
+        llm = StubLLM(n_ctx=n_ctx)
+        model = "stub"
+
+    result = run_bench(
+        llm,
+        turns=turns or len(BENCH_CORPUS) * 2,
+        n_ctx=n_ctx,
+        model=model,
+        max_tokens=max_tokens,
+    )
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"📄 JSON: {json_path}")
+    return result
@@ -88,17 +88,21 @@ def run_chat_loop(
         ),
     }
 
-    # Gespräch starten
-    conversation = [
+    # Gespräch starten (stabiler Prefix, Pro-Runde-Blöcke am Ende)
+    from core.prompt_assembly import PromptAssembler
+    from core.context_window import ContextWindow
+
+    conversation = PromptAssembler([
         {"role": "system", "content": combined_prompt},
         persona_meta,
         {"role": "system", "content": memory.last_context()},
-    ]
+    ])
 
     # Modellwahl
     model_path = choose_model()
     perf = choose_performance()
     llm = load_llm(model_path, perf)
+    context_window = ContextWindow(llm, perf["n_ctx"])
 
     print(Fore.CYAN + "📘 Nutze /hilfe für Befehle.\n")
     print(Fore.GREEN + "Du kannst jetzt der KI schreiben. Erste Antwort dauert etwas.\n")
@@ -133,7 +137,7 @@ def run_chat_loop(
                         + "\n"
                         + build_runtime_context(LAST_REPLY_TIME)
                     )
-                    conversation[0]["content"] = combined_prompt
+                    conversation.prefix[0]["content"] = combined_prompt
                     print(Fore.GREEN + f"🌿 Profil gewechselt → {new}")
                 except:
                     print(Fore.RED + "⚠ Fehler beim Profilwechsel")
@@ -182,7 +186,7 @@ def run_chat_loop(
             if user_input in ["/dream", "/sleep"]:
                 try:
                     report = dreaming.run_night_cycle(
-                        hours_back=24, max_episodes=250, decay_factor=0.997
+                        hours_back=24, max_episodes=250
                     )
                     print(Fore.MAGENTA + report + "\n")
                 except Exception as e:
@@ -198,10 +202,10 @@ def run_chat_loop(
                 except Exception as e:
                     print(Fore.RED + f"[BRAIN STORE ERROR] {e}")
 
-            conversation.append({"role": "user", "content": user_input})
+            conversation.begin_turn(user_input)
 
             # Identity Kernel
-            identity_kernel.inject_identity(conversation, user_input)
+            identity_kernel.inject_identity(conversation.volatile, user_input)
 
             # -----------------------------
             # AUTO RECALL (episodic+semantic)
@@ -222,36 +226,33 @@ def run_chat_loop(
                     print(Fore.BLUE + f"  - {txt[:120]}…")
                     block.append(txt)
 
-                conversation.append(
-                    {"role": "system", "content": "\n".join(block)}
-                )
+                conversation.add_volatile("\n".join(block))
 
             # -----------------------------
             # MODE
             # -----------------------------
             from core.modes import detect_mode, mode_instructions
             mode = detect_mode(user_input)
-            conversation.append({
-                "role": "system",
-                "content": f"[MODE: {mode}] {mode_instructions(mode)}",
-            })
+            conversation.add_volatile(f"[MODE: {mode}] {mode_instructions(mode)}")
 
             print(Fore.YELLOW + "\n🤖 KI denkt…" + Style.RESET_ALL)
             print(Fore.GREEN + "→ ", end="", flush=True)
 
             speak_fn = tts.speak_chunk if tts else None
 
+            context_window.fit(conversation)
+
             # THINKLOOP
             if thinkloop.needs_think(user_input):
-                internal = thinkloop.run_thinkloop(llm, conversation)
-                conversation.append({"role": "system", "content": f"[THOUGHTS]\n{internal}"})
+                internal = thinkloop.run_thinkloop(llm, conversation.messages())
+                conversation.add_volatile(f"[THOUGHTS]\n{internal}")
 
             # -----------------------------
             # LLM ANTWORT
             # -----------------------------
             reply = stream_completion_gui(
                 llm,
-                conversation,
+                conversation.messages(),
                 gui_queue=output_queue,
                 speak_fn=speak_fn,
                 show_progress=first_reply,
@@ -265,6 +266,7 @@ def run_chat_loop(
             # Alignment
             aligned, meta = alignment_kernel.align(reply)
             reply = aligned
+            conversation.commit_turn(reply)
 
             print(Fore.GREEN + f"🌿 Maat-Score: {meta.get('maat_score',0):.2f}\n")
 
@@ -291,7 +293,7 @@ def run_chat_loop(
 
             # B_KI
             try:
-                bki_base = reflex.compute_b_ki(reply, user_input, conversation)
+                bki_base = reflex.compute_b_ki(reply, user_input, conversation.messages())
                 bki_mod = bki_base * (1 + 0.2 * E)
                 print(Fore.MAGENTA + f"🜂 B_KI: {bki_mod:.2f}")
             except:
@@ -305,10 +307,7 @@ def run_chat_loop(
                     emotion=E,
                 )
                 print(Fore.MAGENTA + f"🔮 Intuition: {mie_info['intuition']:.2f}")
-                conversation.append({
-                    "role": "system",
-                    "content": f"[MIE] intuition={mie_info['intuition']:.2f}"
-                })
+                conversation.add_volatile(f"[MIE] intuition={mie_info['intuition']:.2f}")
             except:
                 pass
 
@@ -1,39 +1,29 @@
 # context_anchor.py
 # MAAT-KI — Context Anchor Engine v1.0
 
-import sqlite3
+from core.db_pool import as_manager
+from core.decay import LTM_HALF_LIFE, get_decay
+from core.migrations import MEMORY_DB, run_migrations
 
 class ContextAnchor:
 
-    def __init__(self, db_path):
-        self.db_path = db_path
+    def __init__(self, db):
+        # db = ConnectionManager der memory.db (oder Pfad)
+        self.db = as_manager(db)
+        run_migrations(self.db, MEMORY_DB)
+        self.forgetting = get_decay(self.db, "ltm", LTM_HALF_LIFE)
 
     def reinforce(self, keyword, amount=1.1):
         """
-        Verstärkt Erinnerungen, die zum Keyword passen.
+        Verstärkt Erinnerungen, die zum Keyword passen (nur diese Zeilen).
         """
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-
-        cur.execute("""
-            UPDATE ltm
-            SET priority = priority * ?
-            WHERE keywords LIKE ?
-        """, (amount, f"%{keyword.lower()}%"))
-
-        conn.commit()
-        conn.close()
+        return self.forgetting.reinforce(
+            "keywords LIKE ?", (f"%{keyword.lower()}%",), amount=amount
+        )
 
     def weaken_all(self, factor=0.999):
         """
-        Globale Priorität senken – vergisst alte Erinnerungen langsam.
+        Globale Priorität senken – verschiebt nur den Decay-Offset,
+        keine Zeile wird neu geschrieben.
         """
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-
-        cur.execute("""
-            UPDATE ltm SET priority = priority * ?
-        """, (factor,))
-
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        self.forgetting.decay(factor)
\ No newline at end of file
@@ -0,0 +1,136 @@
+# core/context_window.py
+# MAAT-KI — Kontextfenster-Manager v1.0 (Token-Budget pro Performance-Stufe)
+
+from core.long_term_memory import compress_text
+
+# Platz für Antwort / ThinkLoop / AUTOR je n_ctx-Stufe aus choose_performance()
+REPLY_RESERVE = {
+    16000: 1024,
+    8000: 768,
+    4096: 512,
+    2048: 384,
+}
+
+# Chat-Template-Tokens pro Nachricht (Rollen-Header, Trenner)
+MESSAGE_OVERHEAD = 8
+
+# Pro-Runde-Blöcke, die bei Platzmangel geopfert werden (erster zuerst)
+DROP_ORDER = ("[LONG_TERM_MEMORY]", "[THOUGHTS]", "[MIE]", "[IDENTITY]")
+
+SUMMARY_HEADER = "[FRÜHERE UNTERHALTUNG] Kurzfassung älterer Runden:"
+
+
+class ContextWindow:
+    """
+    Hält den Prompt eines PromptAssembler unter dem Token-Budget:
+
+        budget = n_ctx − Reserve für die Antwort
+
+    Läuft die Unterhaltung über das Budget, werden die ältesten Runden
+    auf einmal bis zur Low-Water-Marke ausgelagert (→ LongTermMemory +
+    Kurzfassung). Danach wächst die History wieder einige Runden ungestört,
+    der KV-Cache bleibt so die meiste Zeit wiederverwendbar.
+    """
+
+    def __init__(self, llm, n_ctx, ltm=None, low_water=0.6, summary_share=0.1):
+        self.ltm = ltm
+        self.low_water = low_water
+        self.summary_share = summary_share
+        self.summary_lines = []
+        self._tokens = {}
+        self.set_llm(llm, n_ctx)
+
+    def set_llm(self, llm, n_ctx):
+        self.llm = llm
+        self.n_ctx = int(n_ctx)
+        reserve = REPLY_RESERVE.get(self.n_ctx, max(256, self.n_ctx // 8))
+        self.budget = self.n_ctx - reserve
+        self._tokens = {}
+
+    # --------------------------------------------------------------
+    # Token zählen (Tokenizer des geladenen Modells, mit Cache)
+    # --------------------------------------------------------------
+    def count_text(self, text):
+        text = text or ""
+        n = self._tokens.get(text)
+        if n is not None:
+            return n
+        try:
+            n = len(self.llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+        except Exception:
+            n = len(text) // 3 + 1
+        if len(self._tokens) > 4096:
+            self._tokens = {}
+        self._tokens[text] = n
+        return n
+
+    def count(self, messages):
+        return sum(self.count_text(m.get("content")) + MESSAGE_OVERHEAD for m in messages)
+
+    # --------------------------------------------------------------
+    # Haupt-API: vor jeder Generation aufrufen
+    # --------------------------------------------------------------
+    def fit(self, conv):
+        total = self.count(conv.messages())
+        if total <= self.budget:
+            return total
+
+        # 1. Älteste Runden auslagern (bis Low-Water-Marke)
+        self._evict_history(conv)
+
+        # 2. Reicht es immer noch nicht: Pro-Runde-Blöcke opfern
+        total = self.count(conv.messages())
+        for tag in DROP_ORDER:
+            if total <= self.budget:
+                break
+            conv.volatile = [m for m in conv.volatile if tag not in (m.get("content") or "")]
+            total = self.count(conv.messages())
+
+        if total > self.budget:
+            print(f"[CONTEXT] ⚠ Prompt ({total} Tokens) größer als Budget ({self.budget}).")
+        return total
+
+    def room(self, messages):
+        """Freie Tokens im Kontext nach diesen Nachrichten (z. B. für eine Fortsetzung)."""
+        return self.n_ctx - self.count(messages)
+
+    # --------------------------------------------------------------
+    def _evict_history(self, conv):
+        fixed = self.count(conv.prefix + conv.volatile)
+        if conv.pending_user is not None:
+            fixed += self.count([conv.pending_user])
+        summary_budget = int(self.budget * self.summary_share)
+        target = int((self.budget - fixed - summary_budget) * self.low_water)
+
+        history = conv.history
+        used = self.count(history)
+        cut = 0
+        while cut < len(history) and used > max(target, 0):
+            used -= self.count([history[cut]])
+            cut += 1
+        # Runden nicht zerreißen: History beginnt immer mit einer User-Nachricht
+        while cut < len(history) and history[cut]["role"] != "user":
+            used -= self.count([history[cut]])
+            cut += 1
+
+        if cut == 0:
+            return
+
+        evicted = history[:cut]
+        conv.history = history[cut:]
+
+        for m in evicted:
+            if self.ltm is not None:
+                try:
+                    self.ltm.add(m["role"], m["content"])
+                except Exception as e:
+                    print("[CONTEXT LTM ERROR]", e)
+            self.summary_lines.append(f"{m['role']}: {compress_text(m['content'])[:160]}")
+
+        # Kurzfassung auf ihren Anteil am Budget begrenzen (neueste behalten)
+        while self.summary_lines and self.count_text(self._summary_text()) > summary_budget:
+            self.summary_lines.pop(0)
+        conv.summary = self._summary_text() if self.summary_lines else None
+
+    def _summary_text(self):
+        return SUMMARY_HEADER + "\n" + "\n".join(self.summary_lines)
@@ -0,0 +1,148 @@
+# core/db_pool.py
+# MAAT-KI — zentraler SQLite Connection-Manager v1.0
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionManager:
+    """
+    Eine Instanz pro Datenbankdatei.
+    - jeder Thread bekommt seine eigene, warm gehaltene Verbindung
+    - WAL-Modus: GUI & Hintergrund-Worker lesen, während der Chat-Loop schreibt
+    - synchronous=NORMAL, mmap und Prepared-Statement-Cache pro Verbindung
+    """
+
+    def __init__(
+        self,
+        db_path,
+        mmap_size=256 * 1024 * 1024,
+        cached_statements=256,
+        busy_timeout_ms=5000,
+    ):
+        self.path = os.path.abspath(db_path)
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._local = threading.local()
+        self._pool = {}          # thread-ident → Verbindung
+        self._pool_lock = threading.Lock()
+
+    # --------------------------------------------------------------
+    # Verbindung aufbauen + PRAGMAs
+    # --------------------------------------------------------------
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)};")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)};")
+        return conn
+
+    def _prune_dead_threads(self):
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in list(self._pool):
+            if ident not in alive:
+                try:
+                    self._pool.pop(ident).close()
+                except Exception:
+                    pass
+
+    # --------------------------------------------------------------
+    # Öffentliche API
+    # --------------------------------------------------------------
+    def connection(self):
+        """Warme Verbindung des aktuellen Threads (wird bei Bedarf erzeugt)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._pool_lock:
+                self._prune_dead_threads()
+                # Thread-IDs werden wiederverwendet: Verbindung eines beendeten
+                # Threads mit gleicher ID schließen statt nur zu überschreiben
+                old = self._pool.pop(threading.get_ident(), None)
+                if old is not None:
+                    try:
+                        old.close()
+                    except Exception:
+                        pass
+                self._pool[threading.get_ident()] = conn
+        return conn
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    @contextmanager
+    def transaction(self):
+        """
+        with db.transaction() as cur:
+            cur.execute(...)
+        → COMMIT am Ende, ROLLBACK bei Exception.
+        """
+        conn = self.connection()
+        cur = conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def close_all(self):
+        with self._pool_lock:
+            for conn in self._pool.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._pool.clear()
+        self._local = threading.local()
+
+
+# ------------------------------------------------
+# Registry: genau ein Manager pro Datei
+# ------------------------------------------------
+_MANAGERS = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def get_manager(db_path):
+    path = os.path.abspath(db_path)
+    with _MANAGERS_LOCK:
+        if path not in _MANAGERS:
+            _MANAGERS[path] = ConnectionManager(path)
+        return _MANAGERS[path]
+
+
+def as_manager(db):
+    """Akzeptiert einen ConnectionManager oder (abwärtskompatibel) einen Pfad."""
+    if isinstance(db, ConnectionManager):
+        return db
+    return get_manager(db)
+
+
+def release_manager(db):
+    """Manager schließen und aus der Registry nehmen (z. B. abgelaufene Session)."""
+    path = as_manager(db).path
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.pop(path, None)
+    if manager is not None:
+        manager.close_all()
+
+
+def close_all():
+    with _MANAGERS_LOCK:
+        for manager in _MANAGERS.values():
+            manager.close_all()
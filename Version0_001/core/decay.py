@@ -0,0 +1,172 @@
+# core/decay.py
+# MAAT-KI — Lazy Decay v1.0 (Vergessen über Halbwertszeit statt UPDATE-Sweeps)
+
+import math
+import threading
+import time
+
+from core.db_pool import as_manager
+
+DAY = 24 * 3600
+
+# Halbwertszeiten ≈ bisherige Faktoren bei einem Zyklus pro Tag:
+# episodic 0.995 → 138 Tage, ltm 0.997 (/dream) → 231 Tage
+EPISODIC_HALF_LIFE = 138 * DAY
+LTM_HALF_LIFE = 231 * DAY
+
+MIN_PRIORITY = 1e-9
+
+
+class LazyDecay:
+    """
+    Priorität einer Zeile = base · exp(-λ·(jetzt − touched)).
+
+    Gespeichert wird pro Zeile priority (base), touched und
+        decay_key = touched + ln(base)/λ − shift
+    → effektive Priorität = exp(λ·(decay_key + shift − jetzt)).
+
+    Weil λ pro Tabelle fest ist, sortiert decay_key genau wie die effektive
+    Priorität (Index-Scan für Ranking und Garbage-Collection). Vergessen
+    kostet damit nichts; decay(factor) verschiebt nur den Tabellen-Offset
+    shift (eine Zeile in decay_state), reinforce() schreibt nur Treffer.
+    """
+
+    def __init__(self, db, table, half_life):
+        self.db = as_manager(db)
+        self.table = table
+        self._lock = threading.Lock()
+        self._ready = False
+
+        with self.db.transaction() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS decay_state (
+                    tbl TEXT PRIMARY KEY,
+                    shift REAL NOT NULL DEFAULT 0,
+                    half_life REAL NOT NULL
+                )
+            """)
+            cur.execute(
+                "INSERT OR IGNORE INTO decay_state (tbl, shift, half_life) VALUES (?, 0, ?)",
+                (table, half_life),
+            )
+            cur.execute("SELECT shift, half_life FROM decay_state WHERE tbl = ?", (table,))
+            # gespeicherte Halbwertszeit gewinnt → bestehende Keys bleiben gültig
+            self.shift, self.half_life = cur.fetchone()
+
+        self.lam = math.log(2) / self.half_life
+        self.ensure_columns()
+
+    # --------------------------------------------------------------
+    # Alte Zeilen einmalig nachrechnen (Spalten + Index: core/migrations.py)
+    # --------------------------------------------------------------
+    def ensure_columns(self):
+        if self._ready:
+            return True
+
+        with self._lock, self.db.transaction() as cur:
+            cur.execute(f"PRAGMA table_info({self.table})")
+            cols = [r[1] for r in cur.fetchall()]
+            if not {"priority", "touched", "decay_key"} <= set(cols):
+                return False        # Tabelle/Migration fehlt (noch)
+
+            cur.execute(
+                f"SELECT id, ts, priority FROM {self.table} WHERE decay_key IS NULL"
+            )
+            rows = cur.fetchall()
+            if rows:
+                now = time.time()
+                updates = []
+                for _id, ts, prio in rows:
+                    touched = ts if isinstance(ts, (int, float)) else now
+                    prio = 1.0 if prio is None else prio
+                    updates.append((prio, touched, self._key(prio, touched), _id))
+                cur.executemany(
+                    f"UPDATE {self.table} SET priority = ?, touched = ?, decay_key = ? WHERE id = ?",
+                    updates,
+                )
+                print(f"[DECAY] ✅ {len(updates)} Einträge in '{self.table}' umgestellt.")
+
+        self._ready = True
+        return True
+
+    # --------------------------------------------------------------
+    # Rechnen
+    # --------------------------------------------------------------
+    def _key(self, base, touched):
+        return touched + math.log(max(base, MIN_PRIORITY)) / self.lam - self.shift
+
+    def key(self, base=1.0, touched=None):
+        """decay_key für eine neue/berührte Zeile."""
+        with self._lock:
+            return self._key(base, time.time() if touched is None else touched)
+
+    def effective(self, decay_key, now=None):
+        if decay_key is None:
+            return None
+        now = time.time() if now is None else now
+        return math.exp(min(self.lam * (decay_key + self.shift - now), 700.0))
+
+    def cutoff_key(self, threshold, now=None):
+        """Zeilen mit decay_key < cutoff_key haben effektiv < threshold."""
+        now = time.time() if now is None else now
+        return now + math.log(max(threshold, MIN_PRIORITY)) / self.lam - self.shift
+
+    # --------------------------------------------------------------
+    # Globales Vergessen: O(1) statt UPDATE über die ganze Tabelle
+    # --------------------------------------------------------------
+    def decay(self, factor):
+        if factor <= 0 or factor == 1.0:
+            return
+        with self._lock, self.db.transaction() as cur:
+            self.shift += math.log(factor) / self.lam
+            cur.execute(
+                "UPDATE decay_state SET shift = ? WHERE tbl = ?", (self.shift, self.table)
+            )
+
+    # --------------------------------------------------------------
+    # Verstärken: nur die getroffenen Zeilen
+    # --------------------------------------------------------------
+    def reinforce(self, where, params=(), amount=1.1):
+        """
+        where = SQL-Bedingung auf self.table (z. B. "keywords LIKE ?").
+        Gibt die Anzahl verstärkter Zeilen zurück.
+        """
+        if not self.ensure_columns():
+            return 0
+        now = time.time()
+        with self._lock, self.db.transaction() as cur:
+            cur.execute(f"SELECT id, decay_key FROM {self.table} WHERE {where}", tuple(params))
+            rows = cur.fetchall()
+            updates = []
+            for _id, key in rows:
+                base = (self.effective(key, now) or 1.0) * amount
+                updates.append((base, now, self._key(base, now), _id))
+            cur.executemany(
+                f"UPDATE {self.table} SET priority = ?, touched = ?, decay_key = ? WHERE id = ?",
+                updates,
+            )
+        return len(updates)
+
+
+# ------------------------------------------------
+# Registry: eine Instanz pro (Datenbank, Tabelle) → gemeinsamer shift
+# ------------------------------------------------
+_DECAYS = {}
+_DECAYS_LOCK = threading.Lock()
+
+
+def get_decay(db, table, half_life):
+    db = as_manager(db)
+    with _DECAYS_LOCK:
+        decay = _DECAYS.get((db.path, table))
+        if decay is None:
+            decay = _DECAYS[(db.path, table)] = LazyDecay(db, table, half_life)
+    decay.ensure_columns()
+    return decay
+
+
+def release_decay(db):
+    path = as_manager(db).path
+    with _DECAYS_LOCK:
+        for key in [k for k in _DECAYS if k[0] == path]:
+            del _DECAYS[key]
@@ -1,64 +1,110 @@
-import sqlite3
 import time
 
-class EpisodicMemory:
+from core.db_pool import as_manager
+from core.decay import EPISODIC_HALF_LIFE, get_decay
+from core.migrations import EPISODIC_DB, run_migrations
+from core.fts_index import ensure_fts, build_match_query, match_score
+from core.write_buffer import get_buffer
 
-    def __init__(self, db_path="episodic_memory.db"):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.cur = self.conn.cursor()
-        self._create_table()
+class EpisodicMemory:
 
-    # -------------------------------------------------------------
-    def _create_table(self):
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS episodic (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ts REAL,
-                role TEXT,
-                text TEXT,
-                priority REAL DEFAULT 1.0
-            )
-        """)
-        self.conn.commit()
+    def __init__(self, db="episodic_memory.db"):
+        # db = ConnectionManager (oder Pfad, abwärtskompatibel)
+        self.db = as_manager(db)
+        self.db_path = self.db.path
+        self.writer = get_buffer(self.db)
+        # Schema kommt ausschließlich aus core/migrations.py
+        run_migrations(self.db, EPISODIC_DB)
+        # Vergessen über Halbwertszeit (decay_key, siehe core/decay.py)
+        self.forgetting = get_decay(self.db, "episodic", EPISODIC_HALF_LIFE)
+        with self.db.transaction() as cur:
+            self.fts = ensure_fts(cur, "episodic", "text")
 
     # -------------------------------------------------------------
     def add(self, role, text, priority=1.0):
         ts = time.time()
-        self.cur.execute(
-            "INSERT INTO episodic (ts, role, text, priority) VALUES (?, ?, ?, ?)",
-            (ts, role, text, priority)
+        key = self.forgetting.key(priority, ts)
+        self.writer.add(
+            "episodic",
+            "INSERT INTO episodic (ts, role, text, priority, touched, decay_key) VALUES (?, ?, ?, ?, ?, ?)",
+            (ts, role, text, priority, ts, key),
+            row={"ts": ts, "role": role, "text": text, "priority": priority},
         )
-        self.conn.commit()
 
     # -------------------------------------------------------------
     def recall(self, query, limit=5):
-        query = f"%{query.lower()}%"
-        self.cur.execute("""
-            SELECT ts, role, text, priority
-            FROM episodic
-            WHERE lower(text) LIKE ?
-            ORDER BY priority DESC, ts DESC
-            LIMIT ?
-        """, (query, limit))
-        rows = self.cur.fetchall()
+        # noch ungeschriebene Episoden (aktuellste zuerst) mit einbeziehen
+        fresh = [
+            p for p in self.writer.pending("episodic")[::-1]
+            if match_score(p["text"], query) > 0
+        ]
+        if len(fresh) >= limit:
+            return fresh[:limit]
 
-        return [
+        cur = self.db.cursor()
+        if self.fts:
+            match = build_match_query(query)
+            if not match:
+                return []
+            cur.execute("""
+                SELECT e.ts, e.role, e.text, e.decay_key
+                FROM episodic_fts
+                JOIN episodic e ON e.id = episodic_fts.rowid
+                WHERE episodic_fts MATCH ?
+                ORDER BY bm25(episodic_fts), e.decay_key DESC, e.ts DESC
+                LIMIT ?
+            """, (match, limit + len(fresh)))
+        else:
+            pattern = f"%{query.lower()}%"
+            cur.execute("""
+                SELECT ts, role, text, decay_key
+                FROM episodic
+                WHERE lower(text) LIKE ?
+                ORDER BY decay_key DESC, ts DESC
+                LIMIT ?
+            """, (pattern, limit + len(fresh)))
+        rows = cur.fetchall()
+
+        # Zeilen, die zwischen pending() und SELECT geflusht wurden, nicht doppelt
+        seen = {(p["ts"], p["role"], p["text"]) for p in fresh}
+        now = time.time()
+        return fresh + [
             {
                 "ts": ts,
                 "role": role,
                 "text": text,
-                "priority": prio
-            } for ts, role, text, prio in rows
-        ]
+                "priority": self.forgetting.effective(key, now)
+            } for ts, role, text, key in rows
+            if (ts, role, text) not in seen
+        ][: limit - len(fresh)]
 
     # -------------------------------------------------------------
     def decay(self, factor=0.995):
-        """Menschliches Vergessen"""
-        self.cur.execute("UPDATE episodic SET priority = priority * ?", (factor,))
-        self.conn.commit()
+        """
+        Menschliches Vergessen – passiert laufend über die Halbwertszeit.
+        Ein zusätzlicher Faktor verschiebt nur den Tabellen-Offset (O(1)).
+        """
+        self.forgetting.decay(factor)
+
+    # -------------------------------------------------------------
+    def forget(self, threshold=0.02, min_age=30 * 24 * 3600, limit=500):
+        """
+        Verblasste Episoden endgültig löschen (Range-Scan über decay_key,
+        höchstens limit Zeilen pro Aufruf). Gibt die Anzahl zurück.
+        """
+        now = time.time()
+        with self.db.transaction() as cur:
+            cur.execute("""
+                DELETE FROM episodic WHERE id IN (
+                    SELECT id FROM episodic
+                    WHERE decay_key < ? AND ts < ?
+                    LIMIT ?
+                )
+            """, (self.forgetting.cutoff_key(threshold, now), now - min_age, limit))
+            return cur.rowcount
 
     # -------------------------------------------------------------
     def clear(self):
-        self.cur.execute("DELETE FROM episodic")
-        self.conn.commit()
\ No newline at end of file
+        self.writer.discard("episodic")
+        with self.db.transaction() as cur:
+            cur.execute("DELETE FROM episodic")
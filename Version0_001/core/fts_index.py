@@ -0,0 +1,142 @@
+# core/fts_index.py
+# MAAT-KI — Volltext-Index v1.0 (SQLite FTS5 + BM25)
+
+import re
+import sqlite3
+import unicodedata
+
+# unicode61 + remove_diacritics 2:
+#   - Umlaute/ß zählen als Wortzeichen
+#   - "über" findet auch "uber", "Äpfel" auch "apfel"
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+TOKEN_RE = re.compile(r"[A-Za-zÄÖÜäöüß0-9]+")
+
+STOPWORDS = {
+    # deutsch
+    "ich", "du", "er", "sie", "es", "wir", "ihr", "mich", "dich", "mir", "dir",
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "einem",
+    "und", "oder", "aber", "mit", "für", "auf", "in", "im", "am", "an", "von",
+    "zu", "ist", "war", "sind", "sein", "habe", "hat", "haben", "dass", "ohne",
+    "nicht", "wie", "was", "wer", "wo", "noch", "auch", "so", "nur", "mal",
+    "kannst", "kann", "bitte", "mein", "meine", "dein", "deine",
+    # englisch
+    "the", "a", "an", "and", "or", "is", "are", "was", "to", "of", "i", "you",
+    "it", "in", "on", "for", "with", "what", "how",
+}
+
+MAX_TERMS = 8
+PREFIX_MIN_LEN = 4
+
+
+# ------------------------------------------------
+# Nutzersatz → FTS5 MATCH-Ausdruck
+# ------------------------------------------------
+def _query_terms(text):
+    terms = []
+    for tok in TOKEN_RE.findall((text or "").lower()):
+        if tok in STOPWORDS or len(tok) < 2 or tok in terms:
+            continue
+        terms.append(tok)
+
+    # die aussagekräftigsten (längsten) Begriffe zuerst
+    return sorted(terms, key=lambda t: -len(t))[:MAX_TERMS]
+
+
+def _fold(text):
+    """Wie remove_diacritics: "Äpfel" → "apfel" (ß bleibt ß)."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def build_match_query(text):
+    """
+    Zerlegt einen ganzen Satz in Suchbegriffe und verknüpft sie per OR.
+    Längere Begriffe werden als Präfix gesucht ("hund"* → Hunde, Hundes).
+    Gibt "" zurück, wenn kein brauchbarer Begriff übrig bleibt.
+    """
+    terms = _query_terms(text)
+
+    parts = []
+    for t in terms:
+        parts.append(f'"{t}"*' if len(t) >= PREFIX_MIN_LEN else f'"{t}"')
+    return " OR ".join(parts)
+
+
+# ------------------------------------------------
+# Gleiche Logik in Python (für noch ungeschriebene Zeilen)
+# ------------------------------------------------
+def match_score(text, query):
+    """
+    Anzahl der Suchbegriffe aus query, die in text vorkommen
+    (gleiche Präfix-/Umlaut-Regeln wie build_match_query). 0 = kein Treffer.
+    """
+    words = {_fold(w) for w in TOKEN_RE.findall(text or "")}
+    score = 0
+    for term in _query_terms(query):
+        t = _fold(term)
+        if len(term) >= PREFIX_MIN_LEN:
+            hit = any(w.startswith(t) for w in words)
+        else:
+            hit = t in words
+        if hit:
+            score += 1
+    return score
+
+
+# ------------------------------------------------
+# Schatten-Tabelle + Trigger anlegen, Backfill
+# ------------------------------------------------
+def ensure_fts(cur, table, column, fts_table=None):
+    """
+    Legt eine FTS5-Schattentabelle (external content) zu table.column an,
+    inkl. Trigger für INSERT/UPDATE/DELETE.
+    Existiert der Index noch nicht, wird er aus den Bestandsdaten befüllt.
+
+    Gibt True zurück, wenn FTS5 verfügbar ist, sonst False.
+    """
+    fts_table = fts_table or f"{table}_fts"
+
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (fts_table,),
+    )
+    existed = cur.fetchone() is not None
+
+    try:
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                {column},
+                content='{table}',
+                content_rowid='id',
+                tokenize='{FTS_TOKENIZE}'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"[FTS] ⚠ FTS5 nicht verfügbar ({e}) → LIKE-Fallback.")
+        return False
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column})
+            VALUES ('delete', old.id, old.{column});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column} ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {column})
+            VALUES ('delete', old.id, old.{column});
+            INSERT INTO {fts_table}(rowid, {column}) VALUES (new.id, new.{column});
+        END
+    """)
+
+    if not existed:
+        cur.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        print(f"[FTS] ✅ Volltext-Index '{fts_table}' aufgebaut.")
+
+    return True
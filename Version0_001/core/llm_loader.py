@@ -2,29 +2,101 @@
 # MAAT-KI macOS M-Series Optimized Loader
 
 import os
+import glob
 import platform
+import subprocess
 import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
 from llama_cpp import Llama
 
+from core.auto_profile_speed import AutoProfileSpeedTrainer
+from core.speculative import build_draft_model, describe_draft
+
+# ein Lade-Thread: Modell laden, während das Setup weiterläuft
+_LOADER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-loader")
+
+
+def detect_logical_cores():
+    """Logische Kerne, die dieser Prozess wirklich nutzen darf (cgroups/affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _sysctl_int(key):
+    try:
+        out = subprocess.run(
+            ["sysctl", "-n", key], capture_output=True, text=True, timeout=2
+        ).stdout.strip()
+        return int(out) if out else None
+    except Exception:
+        return None
+
+
+def detect_physical_cores():
+    """
+    Physische Kerne ohne Hyperthreads.
+    macOS:  Performance-Kerne (hw.perflevel0), sonst hw.physicalcpu
+    Linux:  eindeutige (physical id, core id)-Paare aus /proc/cpuinfo
+    """
+    logical = detect_logical_cores()
+    system = platform.system().lower()
+
+    if system == "darwin":
+        for key in ("hw.perflevel0.physicalcpu", "hw.physicalcpu"):
+            n = _sysctl_int(key)
+            if n:
+                return min(n, logical)
+
+    if system == "linux":
+        cores = set()
+        phys = core = None
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                for line in f:
+                    if line.startswith("physical id"):
+                        phys = line.split(":", 1)[1].strip()
+                    elif line.startswith("core id"):
+                        core = line.split(":", 1)[1].strip()
+                    elif not line.strip():
+                        if core is not None:
+                            cores.add((phys, core))
+                        phys = core = None
+            if core is not None:
+                cores.add((phys, core))
+        except OSError:
+            pass
+        if cores:
+            return max(1, min(len(cores), logical))
+
+    return logical
+
 
 def detect_threads():
     """
-    Nutzt logische CPU-Kerne, begrenzt aber auf sinnvolle Werte.
-    M1/M2/M3/M4: 6–10 Threads
-    Intel:       alle logischen Kerne
+    Threads für die Token-Generierung = physische Kerne.
+    Hyperthreads bremsen llama.cpp bei der Generierung eher aus.
+    M1/M2/M3/M4: Performance-Kerne
     """
-    cores = multiprocessing.cpu_count()
-    system = platform.processor().lower()
+    return detect_physical_cores()
+
 
-    if "apple" in system:   # M-Series
-        return min(cores, 8)
-    return cores
+def gpu_offload_supported():
+    """Wurde llama-cpp-python überhaupt mit GPU-Backend gebaut?"""
+    try:
+        import llama_cpp
+        return bool(llama_cpp.llama_supports_gpu_offload())
+    except Exception:
+        return False
 
 
 def detect_gpu_backend():
     """
     macOS: METAL
-    Linux: VULKAN optional, sonst CPU
+    Linux: CUDA (NVIDIA-Treiber) / VULKAN (DRM-Render-Node) – nur wenn
+           llama.cpp mit GPU-Offload gebaut ist, sonst CPU
     Windows: DirectML optional
     """
     system = platform.system().lower()
@@ -32,54 +104,117 @@ def detect_gpu_backend():
     if system == "darwin":
         return "METAL"
 
-    if system == "linux":
-        return "VULKAN"
+    if system == "linux" and gpu_offload_supported():
+        if os.path.exists("/proc/driver/nvidia/version"):
+            return "CUDA"
+        if glob.glob("/dev/dri/renderD*"):
+            return "VULKAN"
 
     return "CPU"
 
 
-def load_llm(model_path, perf):
+def default_params(model_path):
+    """
+    Lade-Parameter: getunte Werte aus dem Performance-Profil (core/autotune.py),
+    sonst Hardware-Erkennung + AutoProfileSpeedTrainer-Vorschläge.
+    """
+    trainer = AutoProfileSpeedTrainer()
+    backend = detect_gpu_backend()
+
+    params = dict(
+        n_threads=detect_threads(),
+        n_threads_batch=detect_logical_cores(),
+        n_batch=trainer.suggest_batch_size(),
+        n_gpu_layers=0 if backend == "CPU" else -1,
+    )
+    tuned = trainer.tuned_params(model_path)
+    params.update(tuned)
+    return backend, params, bool(tuned)
+
+
+# Draft-Modell + großer Kontext: ab hier lohnt eine Warnung
+LOGITS_WARN_BYTES = 1024 ** 3
+
+
+def logits_buffer_bytes(llm):
+    """
+    Mit logits_all (llama-cpp-python erzwingt es bei draft_model) hält Llama
+    scores als float32-Array n_ctx × n_vocab – jede Position eine volle Zeile.
+    """
+    try:
+        if not llm.context_params.logits_all:
+            return 0
+        return int(llm.n_ctx()) * int(llm.n_vocab()) * 4
+    except Exception:
+        return 0
+
+
+def load_llm(model_path, perf, announce=True):
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"❗ Modell nicht gefunden: {model_path}")
 
-    backend = detect_gpu_backend()
-    threads = detect_threads()
+    backend, params, tuned = default_params(model_path)
     n_ctx = perf.get("n_ctx", 8192)
-
-    print("────────────────────────────────────────────")
-    print("🔧 MAAT-KI macOS Optimized LLM Loader")
-    print("────────────────────────────────────────────")
-    print(f"📦 Modell       : {model_path}")
-    print(f"🧠 Backend      : {backend}")
-    print(f"🧵 Threads      : {threads}")
-    print(f"🧩 Kontext       : {n_ctx}")
-    print("────────────────────────────────────────────\n")
+    draft_spec = perf.get("draft")
+
+    if announce:
+        print("────────────────────────────────────────────")
+        print("🔧 MAAT-KI macOS Optimized LLM Loader")
+        print("────────────────────────────────────────────")
+        print(f"📦 Modell       : {model_path}")
+        print(f"🧠 Backend      : {backend} (GPU-Layer: {params['n_gpu_layers']})")
+        print(f"🧵 Threads      : {params['n_threads']} / Batch {params['n_threads_batch']}")
+        print(f"📐 n_batch      : {params['n_batch']}{' (autotuned)' if tuned else ''}")
+        print(f"🧩 Kontext       : {n_ctx}")
+        print(f"⚡ Draft        : {describe_draft(draft_spec)}")
+        print("────────────────────────────────────────────\n")
 
     # --------------------------------------------------------
     #   WICHTIG: KEIN rope_scaling_type, KEIN rope_freq_base!!!
     #   → löst alle Apple Silicon rope-Fehler!
     # --------------------------------------------------------
 
-    # GPU-Layer setzen
-    if backend == "METAL":
-        n_gpu_layers = -1
-    elif backend == "VULKAN":
-        n_gpu_layers = -1
-    else:
-        n_gpu_layers = 0
-
     # --------------------------------------------------------
     #   MODELL INSTANTIATION (stabil)
     # --------------------------------------------------------
+    # Speculative Decoding: Draft schlägt Tokens vor, das Hauptmodell
+    # prüft sie in einem Batch (llama.cpp, Llama.generate)
+    draft_model = build_draft_model(
+        draft_spec,
+        n_ctx,
+        n_threads=params["n_threads"],
+        n_gpu_layers=params["n_gpu_layers"],
+    )
+
     llm = Llama(
         model_path=model_path,
         n_ctx=n_ctx,
-        n_threads=threads,
-        n_gpu_layers=n_gpu_layers,
         use_mlock=False,
         use_mmap=True,
-        verbose=False
+        verbose=False,
+        draft_model=draft_model,
+        **params
     )
 
-    print("🌿 Modell erfolgreich geladen unter macOS.\n")
-    return llm
\ No newline at end of file
+    logits = logits_buffer_bytes(llm)
+    if draft_model is not None and logits >= LOGITS_WARN_BYTES:
+        print(
+            f"⚠ Draft-Modell bei {n_ctx} Kontext: logits_all belegt bis zu "
+            f"{logits / 1024 ** 3:.1f} GB RAM zusätzlich – kleineren Kontext "
+            "oder Performance-Stufe ohne Draft erwägen."
+        )
+
+    if announce:
+        print("🌿 Modell erfolgreich geladen unter macOS.\n")
+    return llm
+
+
+def load_llm_async(model_path, perf):
+    """
+    Startet load_llm im Hintergrund (ohne Banner, um die Menüs nicht zu stören).
+    Gibt ein Future zurück: .result() wartet auf das fertige Llama-Objekt
+    bzw. wirft den Ladefehler weiter.
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"❗ Modell nicht gefunden: {model_path}")
+    return _LOADER.submit(load_llm, model_path, perf, False)
@@ -1,10 +1,15 @@
 # long_term_memory.py
 # MAAT-KI — Long Term Memory v5.0 (clean, stable)
 
-import sqlite3
 import time
 import re
 
+from core.db_pool import as_manager
+from core.decay import LTM_HALF_LIFE, get_decay
+from core.migrations import MEMORY_DB, run_migrations
+from core.fts_index import ensure_fts, build_match_query, match_score
+from core.write_buffer import get_buffer
+
 # ------------------------------------------------
 # Keyword Extraktion
 # ------------------------------------------------
@@ -63,26 +68,17 @@ def compress_text(text):
 # ------------------------------------------------
 class LongTermMemory:
 
-    def __init__(self, db_path):
-        self.db_path = db_path
-        self._init_db()
-
-    def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS ltm (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts REAL,
-            role TEXT,
-            content TEXT,
-            compressed TEXT,
-            keywords TEXT,
-            category TEXT
-        )
-        """)
-        conn.commit()
-        conn.close()
+    def __init__(self, db):
+        # db = ConnectionManager (oder Pfad, abwärtskompatibel)
+        self.db = as_manager(db)
+        self.db_path = self.db.path
+        self.writer = get_buffer(self.db)
+        # Schema (inkl. priority/touched/decay_key) kommt aus core/migrations.py
+        run_migrations(self.db, MEMORY_DB)
+        # priority/touched/decay_key (MaatDreaming, ContextAnchor)
+        self.forgetting = get_decay(self.db, "ltm", LTM_HALF_LIFE)
+        with self.db.transaction() as cur:
+            self.fts = ensure_fts(cur, "ltm", "content")
 
     # ------------------------------------------------
     # Add
@@ -92,34 +88,64 @@ class LongTermMemory:
         kws = ",".join(extract_keywords(content))
         category = detect_category(content)
         comp = compress_text(content)
+        key = self.forgetting.key(1.0, ts)
 
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO ltm (ts, role, content, compressed, keywords, category)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (ts, role, content, comp, kws, category))
-        conn.commit()
-        conn.close()
+        self.writer.add(
+            "ltm",
+            """
+            INSERT INTO ltm (ts, role, content, compressed, keywords, category,
+                             priority, touched, decay_key)
+            VALUES (?, ?, ?, ?, ?, ?, 1.0, ?, ?)
+            """,
+            (ts, role, content, comp, kws, category, ts, key),
+            row={
+                "ts": ts,
+                "role": role,
+                "content": content,
+                "compressed": comp,
+                "category": category,
+            },
+        )
 
     # ------------------------------------------------
     # Keyword Suche
     # ------------------------------------------------
     def search_keyword(self, query, limit=5):
-        pattern = f"%{query.lower()}%"
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT ts, role, content, compressed, category
-            FROM ltm
-            WHERE LOWER(content) LIKE ?
-            ORDER BY ts DESC
-            LIMIT ?
-        """, (pattern, limit))
+        # noch ungeschriebene Einträge (neueste zuerst) mit einbeziehen
+        fresh = [
+            p for p in self.writer.pending("ltm")[::-1]
+            if match_score(p["content"], query) > 0
+        ]
+        if len(fresh) >= limit:
+            return fresh[:limit]
+
+        cur = self.db.cursor()
+        if self.fts:
+            match = build_match_query(query)
+            if not match:
+                return []
+            cur.execute("""
+                SELECT l.ts, l.role, l.content, l.compressed, l.category
+                FROM ltm_fts
+                JOIN ltm l ON l.id = ltm_fts.rowid
+                WHERE ltm_fts MATCH ?
+                ORDER BY bm25(ltm_fts), l.ts DESC
+                LIMIT ?
+            """, (match, limit + len(fresh)))
+        else:
+            pattern = f"%{query.lower()}%"
+            cur.execute("""
+                SELECT ts, role, content, compressed, category
+                FROM ltm
+                WHERE LOWER(content) LIKE ?
+                ORDER BY ts DESC
+                LIMIT ?
+            """, (pattern, limit + len(fresh)))
         rows = cur.fetchall()
-        conn.close()
 
-        return [
+        # Zeilen, die zwischen pending() und SELECT geflusht wurden, nicht doppelt
+        seen = {(p["ts"], p["role"], p["content"]) for p in fresh}
+        return fresh + [
             {
                 "ts": r[0],
                 "role": r[1],
@@ -128,7 +154,8 @@ class LongTermMemory:
                 "category": r[4],
             }
             for r in rows
-        ]
+            if (r[0], r[1], r[2]) not in seen
+        ][: limit - len(fresh)]
 
     # ------------------------------------------------
     # Hybrid Recall (Keyword + Semantik)
@@ -1,12 +1,15 @@
 # core/maat_dreaming.py
 # MAAT-KI – Nachtkonsolidierung („Maat-Dreaming“)
 
-import sqlite3
 import time
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from core.db_pool import as_manager
+from core.decay import LTM_HALF_LIFE, get_decay
+from core.migrations import MEMORY_DB, run_migrations
 from core.semantic_memory import SemanticMemory
+from core.write_buffer import get_buffer
 
 CATEGORY_KEYWORDS = {
     "beziehung": [
@@ -57,24 +60,143 @@ def compress_block(texts, max_len=300):
     return joined[: max_len - 2] + " …"
 
 
+def merge_summary(old, texts, max_len=400):
+    """
+    Laufende Zusammenfassung einer Kategorie fortschreiben:
+    neue Texte (neueste zuerst) vorne, Bekanntes nicht doppelt,
+    hart auf max_len Zeichen begrenzt.
+    """
+    old = (old or "").strip().rstrip("…").strip()
+    parts = []
+    seen = {old.lower()}
+    for t in list(texts)[::-1]:
+        t = (t or "").strip()
+        if not t or t.lower() in seen or t.lower() in old.lower():
+            continue
+        seen.add(t.lower())
+        parts.append(t)
+    if old:
+        parts.append(old)
+    return compress_block(parts, max_len=max_len)
+
+
 class MaatDreaming:
     """
-    Nachtkonsolidierung:
-      - nimmt Episoden aus ltm
-      - fasst pro Kategorie zusammen
-      - schreibt Summaries in semantic_memory
-      - lässt alte Erinnerungen langsam „ausblenden“
+    Nachtkonsolidierung (inkrementell):
+      - nimmt nur neue Episoden aus ltm (Wasserstand = letzte konsolidierte id)
+      - in begrenzten Blöcken, eine Transaktion pro Block → fortsetzbar
+      - schreibt pro Kategorie EINE fortlaufende Summary in semantic_memory
+      - lässt alte Erinnerungen langsam „ausblenden“ (core/decay.py)
     """
 
-    def __init__(self, db_path_ltm: str, db_path_semantic: str):
-        self.db_path_ltm = db_path_ltm
-        self.semantic = SemanticMemory(db_path_semantic)
+    def __init__(self, db_ltm, semantic):
+        # db_ltm   = ConnectionManager der memory.db (oder Pfad)
+        # semantic = laufende SemanticMemory-Instanz (teilt den Vektor-Index)
+        #            oder ConnectionManager/Pfad der semantic_memory.db
+        self.db_ltm = as_manager(db_ltm)
+        run_migrations(self.db_ltm, MEMORY_DB)
+        self.forgetting = get_decay(self.db_ltm, "ltm", LTM_HALF_LIFE)
+        if isinstance(semantic, SemanticMemory):
+            self.semantic = semantic
+        else:
+            self.semantic = SemanticMemory(semantic)
 
     # --------------------------------------------------------
     # Hilfsfunktionen für DB
     # --------------------------------------------------------
     def _connect_ltm(self):
-        return sqlite3.connect(self.db_path_ltm)
+        return self.db_ltm.connection()
+
+    def watermark(self):
+        cur = self.db_ltm.cursor()
+        cur.execute("SELECT value FROM dream_state WHERE key = 'last_id'")
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+
+    def backlog(self):
+        """Anzahl noch nicht konsolidierter Episoden."""
+        cur = self.db_ltm.cursor()
+        cur.execute("SELECT COUNT(*) FROM ltm WHERE id > ?", (self.watermark() or 0,))
+        return cur.fetchone()[0]
+
+    def _start_id(self, min_ts):
+        """Erster Lauf: nur das Zeitfenster, ältere Historie bleibt unberührt."""
+        cur = self.db_ltm.cursor()
+        cur.execute("SELECT MIN(id) FROM ltm WHERE ts >= ?", (min_ts,))
+        row = cur.fetchone()
+        if row and row[0] is not None:
+            return row[0] - 1
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM ltm")
+        return cur.fetchone()[0]
+
+    def _consolidate_chunk(self, after_id, chunk_size):
+        """
+        Ein Block neuer Episoden → Summaries + Wasserstand in EINER
+        Transaktion. Gibt (neuer Wasserstand, Anzahl, Kategorien) zurück.
+        """
+        with self.db_ltm.transaction() as cur:
+            cur.execute(
+                """
+                SELECT id, content
+                FROM ltm
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (after_id, chunk_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return after_id, 0, []
+
+            by_cat = defaultdict(list)
+            for _id, content in rows:
+                by_cat[detect_category(content or "")].append(content or "")
+            last_id = rows[-1][0]
+
+            for cat, texts in by_cat.items():
+                cur.execute(
+                    "SELECT summary, episodes FROM dream_summary WHERE category = ?", (cat,)
+                )
+                old = cur.fetchone()
+                summary = merge_summary(old[0] if old else "", texts)
+                cur.execute(
+                    """
+                    INSERT INTO dream_summary (category, summary, episodes, last_id, synced_id)
+                    VALUES (?, ?, ?, ?, 0)
+                    ON CONFLICT(category) DO UPDATE SET
+                        summary = excluded.summary,
+                        episodes = dream_summary.episodes + ?,
+                        last_id = excluded.last_id
+                    """,
+                    (cat, summary, len(texts), last_id, len(texts)),
+                )
+
+            cur.execute(
+                "INSERT OR REPLACE INTO dream_state (key, value) VALUES ('last_id', ?)",
+                (last_id,),
+            )
+        return last_id, len(rows), list(by_cat)
+
+    def _sync_semantic(self):
+        """
+        semantic_memory nachziehen: eine Summary pro Kategorie, in place
+        ersetzt. Nach einem Abbruch holt der nächste Lauf das hier nach.
+        """
+        cur = self.db_ltm.cursor()
+        cur.execute(
+            "SELECT category, summary, last_id FROM dream_summary WHERE synced_id < last_id"
+        )
+        synced = []
+        for cat, summary, last_id in cur.fetchall():
+            key = f"[Maat-Dream:{cat}]"
+            self.semantic.put(key, f"{key} {summary}")
+            with self.db_ltm.transaction() as wcur:
+                wcur.execute(
+                    "UPDATE dream_summary SET synced_id = ? WHERE category = ?", (last_id, cat)
+                )
+            synced.append((cat, f"{key} {summary}"))
+        return synced
 
     # --------------------------------------------------------
     # Haupt-API
@@ -83,93 +205,91 @@ class MaatDreaming:
         self,
         hours_back: int = 24,
         max_episodes: int = 300,
-        decay_factor: float = 0.997,
+        decay_factor: float = None,
         delete_threshold: float = 0.02,
+        chunk_size: int = 100,
+        should_stop=None,
     ):
         """
         Führt einen „Traumzyklus“ durch:
-          - Episoden der letzten X Stunden holen
-          - nach Kategorie bündeln
-          - Summaries in semantic_memory schreiben
-          - priority in ltm leicht decayern
+          - neue Episoden seit dem Wasserstand holen (erster Lauf:
+            die letzten hours_back Stunden), höchstens max_episodes
+          - blockweise nach Kategorie in die laufenden Summaries mischen
+          - Summaries in semantic_memory aktualisieren (keine Dubletten)
           - extrem schwache, alte Einträge optional löschen
+
+        should_stop() wird zwischen den Blöcken gefragt; ein Abbruch
+        verliert nichts, der nächste Lauf macht am Wasserstand weiter.
+
+        Das Verblassen läuft über die Halbwertszeit (core/decay.py);
+        decay_factor vergisst optional zusätzlich (nur Offset, O(1)).
         """
         now = time.time()
         min_ts = now - hours_back * 3600
 
-        conn = self._connect_ltm()
-        cur = conn.cursor()
+        # gepufferte LTM-Einträge zuerst schreiben, damit sie mitträumen
+        get_buffer(self.db_ltm).flush()
 
-        # 1. Relevante Episoden holen
-        cur.execute(
-            """
-            SELECT id, ts, role, content, priority
-            FROM ltm
-            WHERE ts >= ?
-            ORDER BY ts DESC
-            LIMIT ?
-            """,
-            (min_ts, max_episodes),
-        )
-        rows = cur.fetchall()
-
-        if not rows:
-            conn.close()
-            return "Keine Episoden für diesen Zeitraum gefunden."
-
-        # 2. Nach Kategorie gruppieren
-        by_cat = defaultdict(list)
-        for _id, ts, role, content, prio in rows:
-            cat = detect_category(content or "")
-            by_cat[cat].append(
-                {
-                    "id": _id,
-                    "ts": ts,
-                    "role": role,
-                    "content": content or "",
-                    "priority": prio,
-                }
-            )
+        # Reste eines abgebrochenen Laufs zuerst nach semantic_memory
+        self._sync_semantic()
 
-        # 3. Pro Kategorie eine Summary bauen & speichern
-        dream_summaries = []
-        for cat, items in by_cat.items():
-            texts = [it["content"] for it in items]
-            summary = compress_block(texts, max_len=400)
-            if not summary:
-                continue
+        # 1.–2. Neue Episoden blockweise konsolidieren
+        last_id = self.watermark()
+        if last_id is None:
+            last_id = self._start_id(min_ts)
 
-            dream_text = f"[Maat-Dream:{cat}] {summary}"
-            self.semantic.add(dream_text)  # geht in semantic_memory.db
-            dream_summaries.append((cat, dream_text))
+        done = 0
+        categories = set()
+        interrupted = False
+        while done < max_episodes:
+            if should_stop is not None and should_stop():
+                interrupted = True
+                break
+            last_id, n, cats = self._consolidate_chunk(
+                last_id, min(chunk_size, max_episodes - done)
+            )
+            if n == 0:
+                break
+            done += n
+            categories.update(cats)
 
-        # 4. Priority-Decay anwenden (alle Einträge leicht verblassen lassen)
-        cur.execute("UPDATE ltm SET priority = priority * ?", (decay_factor,))
+        # 3. Pro Kategorie eine Summary in semantic_memory (in place)
+        dream_summaries = self._sync_semantic()
 
-        # 5. Extrem schwache & alte Einträge löschen (Soft-Garbage-Collection)
-        cutoff_ts = now - 7 * 24 * 3600  # älter als 7 Tage
-        cur.execute(
-            """
-            DELETE FROM ltm
-            WHERE ts < ? AND priority < ?
-            """,
-            (cutoff_ts, delete_threshold),
-        )
+        if not done and not dream_summaries:
+            return "Keine neuen Episoden seit dem letzten Traum."
+
+        # 4. Priority-Decay: implizit über die Zeit, kein UPDATE-Sweep mehr
+        if decay_factor:
+            self.forgetting.decay(decay_factor)
 
-        conn.commit()
-        conn.close()
+        with self.db_ltm.transaction() as cur:
+            # 5. Extrem schwache & alte Einträge löschen (Soft-Garbage-Collection,
+            #    Range-Scan über den decay_key-Index; nur bereits Konsolidiertes)
+            cutoff_ts = now - 7 * 24 * 3600  # älter als 7 Tage
+            cur.execute(
+                """
+                DELETE FROM ltm
+                WHERE decay_key < ? AND ts < ? AND id <= ?
+                """,
+                (self.forgetting.cutoff_key(delete_threshold, now), cutoff_ts, last_id),
+            )
 
-        # 6. Meta-„Traumlog“ in semantic_memory
-        cats_str = ", ".join(cat for cat, _ in dream_summaries)
-        meta_summary = (
-            f"[Maat-Dream:meta] Nachtkonsolidierung abgeschlossen. "
-            f"Kategorien in den letzten {hours_back}h: {cats_str or '—'}."
+        # 6. Meta-„Traumlog“ in semantic_memory (ein Eintrag, aktualisiert)
+        cats_str = ", ".join(sorted(categories))
+        self.semantic.put(
+            "[Maat-Dream:zyklus]",
+            f"[Maat-Dream:zyklus] Letzte Nachtkonsolidierung: {done} neue Episoden, "
+            f"Kategorien: {cats_str or '—'}.",
         )
-        self.semantic.add(meta_summary)
 
         # Text für Terminal-Rückmeldung
-        report_lines = ["🌙 Maat-Dreaming abgeschlossen:"]
+        report_lines = [f"🌙 Maat-Dreaming abgeschlossen: {done} neue Episoden"]
         for cat, text in dream_summaries:
             report_lines.append(f"  • {cat}: {text[:80]}{'…' if len(text) > 80 else ''}")
+        rest = self.backlog()
+        if rest:
+            why = "unterbrochen" if interrupted else f"max. {max_episodes} pro Lauf"
+            report_lines.append(f"  … {rest} Episoden offen ({why}) – nächster /dream macht weiter.")
 
-        return "\n".join(report_lines)
\ No newline at end of file
+        return "\n".join(report_lines)
@@ -0,0 +1,351 @@
+# core/maintenance.py
+# MAAT-KI — Leerlauf-Wartung v1.0 (Dreaming, Vergessen, VACUUM/ANALYZE, Backups)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from core.db_pool import as_manager
+from core.write_buffer import flush_all
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class Preempted(Exception):
+    """Job hat wegen einer neuen Nutzer-Runde abgebrochen."""
+
+
+# ---------------------------------------------------------
+# Kontext eines laufenden Jobs
+# ---------------------------------------------------------
+class JobContext:
+    """
+    Jobs fragen should_stop() zwischen ihren Schritten und holen
+    Datenbank-Verbindungen über connection(db) – dann kann der Scheduler
+    auch eine einzelne lange Anweisung (VACUUM, FTS-Optimize) per
+    sqlite3.Connection.interrupt() sofort abbrechen.
+    """
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+
+    def should_stop(self):
+        return self._scheduler._preempt.is_set()
+
+    def check(self):
+        if self.should_stop():
+            raise Preempted()
+
+    def connection(self, db):
+        """
+        ConnectionManager → warme Verbindung dieses Threads; Pfad (z. B.
+        Session-Datenbank ohne offene Session) → eigene Verbindung, die am
+        Ende des Jobs geschlossen wird (kein Eintrag in der Manager-Registry).
+        """
+        if isinstance(db, str):
+            conn = sqlite3.connect(db, timeout=5)
+            self._scheduler._own(conn)
+        else:
+            conn = as_manager(db).connection()
+        self._scheduler._register(conn)
+        return conn
+
+
+# ---------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------
+class MaintenanceScheduler:
+    """
+    Startet Wartungs-Jobs auf einem eigenen Thread, sobald seit
+    idle_after Sekunden keine Runde lief. Jede neue Runde (activity(…, True))
+    unterbricht den laufenden Job sofort; er wird beim nächsten Leerlauf
+    erneut versucht. Letzte Laufzeiten liegen in state_path (JSON).
+
+    idle_since = callable → Zeitstempel der letzten Aktivität
+                 (z. B. max. last_reply_time aller Sessions)
+    """
+
+    def __init__(self, state_path, idle_since=None, idle_after=300, poll=5.0):
+        self.state_path = state_path
+        self.idle_since = idle_since
+        self.idle_after = idle_after
+        self.poll = poll
+
+        self._jobs = []                  # [(name, fn(ctx), interval)]
+        self._state = self._load()
+        self._busy = set()               # Sessions mitten in einer Runde
+        self._last_activity = time.time()
+        self._lock = threading.Lock()
+        self._preempt = threading.Event()
+        self._stop = threading.Event()
+        self._active_conns = []
+        self._owned_conns = []
+        self.running = None              # Name des laufenden Jobs
+        self._thread = None
+
+    # --------------------------------------------------------------
+    # Konfiguration
+    # --------------------------------------------------------------
+    def add(self, name, fn, interval):
+        self._jobs.append((name, fn, interval))
+        return self
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._interrupt()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # --------------------------------------------------------------
+    # Signale aus dem Chat / Server
+    # --------------------------------------------------------------
+    def activity(self, key, busy):
+        """
+        busy=True  → eine Runde beginnt: Wartung sofort unterbrechen
+        busy=False → Runde fertig, Leerlauf-Uhr läuft ab jetzt
+        """
+        with self._lock:
+            if busy:
+                self._busy.add(key)
+            else:
+                self._busy.discard(key)
+            self._last_activity = time.time()
+        if busy:
+            self._interrupt()
+
+    def is_idle(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._busy:
+                return False
+            since = self._last_activity
+        if self.idle_since is not None:
+            try:
+                since = max(since, self.idle_since() or 0)
+            except Exception as e:
+                print("[MAINTENANCE IDLE ERROR]", e)
+        return now - since >= self.idle_after
+
+    # --------------------------------------------------------------
+    # Preemption
+    # --------------------------------------------------------------
+    def _register(self, conn):
+        with self._lock:
+            if conn not in self._active_conns:
+                self._active_conns.append(conn)
+            preempted = bool(self._busy)
+        if preempted:
+            self._preempt.set()
+            raise Preempted()
+
+    def _own(self, conn):
+        with self._lock:
+            self._owned_conns.append(conn)
+
+    def _close_owned(self):
+        with self._lock:
+            conns, self._owned_conns = self._owned_conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _interrupt(self):
+        self._preempt.set()
+        with self._lock:
+            conns = list(self._active_conns)
+        for conn in conns:
+            try:
+                conn.interrupt()
+            except Exception:
+                pass
+
+    # --------------------------------------------------------------
+    # Zustand (letzte Läufe)
+    # --------------------------------------------------------------
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self):
+        try:
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2)
+            os.replace(tmp, self.state_path)
+        except Exception as e:
+            print("[MAINTENANCE SAVE ERROR]", e)
+
+    def due(self, now=None):
+        """
+        Fällige Jobs: am längsten nicht mehr versuchte zuerst (ein oft
+        unterbrochener Job blockiert die anderen nicht), dann am längsten überfällige.
+        """
+        now = time.time() if now is None else now
+        out = []
+        for name, fn, interval in self._jobs:
+            entry = self._state.get(name, {})
+            last = entry.get("last_run", 0)
+            if now - last >= interval:
+                out.append((entry.get("last_try", 0), -(now - last - interval), name, fn))
+        return [(name, fn) for _, _, name, fn in sorted(out, key=lambda x: x[:2])]
+
+    # --------------------------------------------------------------
+    # Worker
+    # --------------------------------------------------------------
+    def run_once(self):
+        """Einen fälligen Job ausführen (falls Leerlauf). Gibt den Namen zurück."""
+        if not self.is_idle():
+            return None
+        jobs = self.due()
+        if not jobs:
+            return None
+
+        name, fn = jobs[0]
+        self._preempt.clear()
+        # Runde zwischen is_idle() und clear() gestartet → nicht anfangen
+        if not self.is_idle():
+            return None
+
+        entry = self._state.setdefault(name, {})
+        self.running = name
+        t0 = time.time()
+        entry["last_try"] = t0
+        try:
+            result = fn(JobContext(self))
+            now = time.time()
+            entry.update(last_run=now, last_ok=now, seconds=round(now - t0, 2),
+                         result=str(result or "ok")[:200], error=None)
+        except Preempted:
+            entry.update(preempted=entry.get("preempted", 0) + 1)
+        except sqlite3.OperationalError as e:
+            if self._preempt.is_set() and "interrupt" in str(e).lower():
+                entry.update(preempted=entry.get("preempted", 0) + 1)
+            else:
+                entry.update(error=str(e)[:200], last_run=time.time())
+                print(f"[MAINTENANCE ERROR] {name}: {e}")
+        except Exception as e:
+            # Fehler nicht im Sekundentakt wiederholen → bis zum nächsten Intervall warten
+            entry.update(error=str(e)[:200], last_run=time.time())
+            print(f"[MAINTENANCE ERROR] {name}: {e}")
+        finally:
+            self.running = None
+            with self._lock:
+                self._active_conns = []
+            self._close_owned()
+            self._save()
+        return name
+
+    def _loop(self):
+        while not self._stop.is_set():
+            ran = None
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print("[MAINTENANCE LOOP ERROR]", e)
+            if not ran:
+                self._stop.wait(self.poll)
+
+    def status_text(self):
+        now = time.time()
+        lines = [f"🛠 Wartung (nach {int(self.idle_after)} s Leerlauf)"
+                 + (f" – läuft: {self.running}" if self.running else "")]
+        for name, _, interval in self._jobs:
+            entry = self._state.get(name, {})
+            last = entry.get("last_ok")
+            age = f"vor {int((now - last) / 60)} min" if last else "noch nie"
+            extra = f", {entry['preempted']}× unterbrochen" if entry.get("preempted") else ""
+            err = f", Fehler: {entry['error']}" if entry.get("error") else ""
+            lines.append(f"- {name}: {age} (alle {int(interval / 60)} min{extra}{err})")
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------
+# Bausteine für Jobs
+# dbs = Liste oder callable (wird bei jedem Lauf neu ausgewertet, z. B.
+#       Standard-Datenbanken + alle Session-Datenbanken)
+# ---------------------------------------------------------
+def _resolve(dbs):
+    return list(dbs() if callable(dbs) else dbs)
+
+
+def _label(db):
+    path = os.path.abspath(db) if isinstance(db, str) else as_manager(db).path
+    return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+
+def optimize_databases(dbs):
+    """PRAGMA optimize – billig, aktualisiert nur veraltete Statistiken."""
+    def job(ctx):
+        flush_all()
+        todo = _resolve(dbs)
+        for db in todo:
+            ctx.check()
+            ctx.connection(db).execute("PRAGMA optimize")
+        return f"{len(todo)} Datenbanken"
+    return job
+
+
+def analyze_databases(dbs):
+    def job(ctx):
+        flush_all()
+        todo = _resolve(dbs)
+        for db in todo:
+            ctx.check()
+            conn = ctx.connection(db)
+            conn.execute("ANALYZE")
+            conn.commit()
+        return f"{len(todo)} Datenbanken"
+    return job
+
+
+def vacuum_databases(dbs, min_free=0.2):
+    """VACUUM nur, wenn mindestens min_free der Seiten frei sind."""
+    def job(ctx):
+        flush_all()
+        done = []
+        for db in _resolve(dbs):
+            ctx.check()
+            conn = ctx.connection(db)
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = conn.execute("PRAGMA page_count").fetchone()[0] or 1
+            if free / pages < min_free:
+                continue
+            conn.commit()
+            conn.execute("VACUUM")
+            done.append(_label(db))
+        return ", ".join(done) or "nichts zu tun"
+    return job
+
+
+def rebuild_fts(dbs):
+    """FTS5-Indizes zusammenführen ('optimize') – schnellere MATCH-Abfragen."""
+    def job(ctx):
+        flush_all()
+        n = 0
+        for db in _resolve(dbs):
+            ctx.check()
+            conn = ctx.connection(db)
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%USING fts5%'"
+            )]
+            for t in tables:
+                ctx.check()
+                conn.execute(f"INSERT INTO {t}({t}) VALUES ('optimize')")
+                conn.commit()
+                n += 1
+        return f"{n} FTS-Indizes"
+    return job
@@ -1,22 +1,343 @@
 # memory_backup.py
-# MAAT-KI Backup Engine v1.0
+# MAAT-KI Backup Engine v2.0 (SQLite-Backup-API, dedupliziert + komprimiert)
 
-import shutil
+import hashlib
+import json
 import os
+import sqlite3
+import tempfile
+import time
+import zlib
 from datetime import datetime
 
+from core.db_pool import as_manager
+from core.write_buffer import flush_all
+
+CHUNK_SIZE = 64 * 1024        # Vielfaches der SQLite-Seitengröße → unveränderte Seiten deduplizieren
+BACKUP_PAGES = 256            # Seiten pro Backup-Schritt (dazwischen dürfen Schreiber ran)
+DB_NAMES = ("memory.db", "episodic_memory.db", "semantic_memory.db")
+
+
+class BackupStopped(Exception):
+    """Backup wurde über should_stop() abgebrochen (z. B. neue Nutzer-Runde)."""
+
+
 class MemoryBackup:
+    """
+    Snapshots von Datenbanken + JSON-Zustand in backup_dir:
+
+        chunks/ab/abcdef…        zlib-komprimierte 64-KiB-Blöcke, Name = sha256
+        snapshots/<id>.json      Manifest: Datei → Liste von Chunk-Hashes
+
+    Datenbanken werden über sqlite3.Connection.backup in Schritten zu
+    BACKUP_PAGES Seiten kopiert → konsistenter Stand ohne Schreiber zu
+    blockieren. Gleiche Blöcke liegen nur einmal auf Platte; ein Snapshot
+    kostet also nur die geänderten Seiten.
+    """
+
+    def __init__(self, data_dir, backup_dir=None, dbs=None, files=None,
+                 keep_last=3, keep_daily=7, keep_weekly=4, keep_monthly=6):
+        self.data_dir = data_dir
+        self.backup_dir = backup_dir or os.path.join(data_dir, "backups")
+        self.chunk_dir = os.path.join(self.backup_dir, "chunks")
+        self.snapshot_dir = os.path.join(self.backup_dir, "snapshots")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+        if dbs is None:
+            dbs = [os.path.join(data_dir, name) for name in DB_NAMES]
+        # Liste oder callable → wird bei jedem Snapshot neu ausgewertet
+        # (z. B. Session-Datenbanken unter data/sessions/)
+        self._dbs = dbs
+        self.files = {self._name(path): path for path in (files or [])}
+
+        self.keep = dict(last=keep_last, daily=keep_daily, weekly=keep_weekly, monthly=keep_monthly)
+
+    def databases(self):
+        """name → ConnectionManager oder Pfad (Pfade ohne eigenen Manager)."""
+        dbs = self._dbs() if callable(self._dbs) else self._dbs
+        return {
+            self._name(db if isinstance(db, str) else as_manager(db).path): db
+            for db in dbs
+        }
+
+    @staticmethod
+    def _path(db):
+        return os.path.abspath(db) if isinstance(db, str) else as_manager(db).path
+
+    def _name(self, path):
+        path = os.path.abspath(path)
+        rel = os.path.relpath(path, os.path.abspath(self.data_dir))
+        return os.path.basename(path) if rel.startswith("..") else rel
+
+    # --------------------------------------------------------------
+    # Chunk-Speicher
+    # --------------------------------------------------------------
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def _put_chunk(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, 6)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+        return digest, len(packed)
+
+    def _get_chunk(self, digest):
+        with open(self._chunk_path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk beschädigt: {digest[:12]}")
+        return data
+
+    def _store_file(self, path, should_stop=None):
+        entry = {"path": os.path.abspath(path), "size": 0, "chunks": []}
+        written = 0
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(CHUNK_SIZE)
+                if not block:
+                    break
+                if should_stop and should_stop():
+                    raise BackupStopped()
+                digest.update(block)
+                key, n = self._put_chunk(block)
+                entry["chunks"].append(key)
+                entry["size"] += len(block)
+                written += n
+        entry["sha256"] = digest.hexdigest()
+        return entry, written
 
-    def __init__(self, db_path, backup_dir):
-        self.db_path = db_path
-        self.backup_dir = backup_dir
-        os.makedirs(backup_dir, exist_ok=True)
+    # --------------------------------------------------------------
+    # Snapshot
+    # --------------------------------------------------------------
+    def _copy_db(self, db, target, should_stop=None):
+        """Online-Backup in Schritten; Schreiber laufen zwischen den Schritten weiter."""
+        def progress(status, remaining, total):
+            if should_stop and should_stop():
+                raise BackupStopped()
 
-    def daily_backup(self):
+        src = sqlite3.connect(self._path(db), timeout=30)
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst, pages=BACKUP_PAGES, progress=progress, sleep=0.05)
+        finally:
+            dst.close()
+            src.close()
+
+    def snapshot(self, should_stop=None, label=None):
+        """Neuer Snapshot aller Datenbanken + Dateien. Gibt die Snapshot-ID zurück."""
+        flush_all()
+        t0 = time.time()
+        snap_id = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        if os.path.exists(os.path.join(self.snapshot_dir, snap_id + ".json")):
+            snap_id += f"_{int(t0 * 1000) % 1000:03d}"
+        manifest = {"id": snap_id, "created": t0, "label": label, "files": {}}
+        written = 0
+
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp:
+            for name, db in self.databases().items():
+                path = self._path(db)
+                if not os.path.exists(path):
+                    continue
+                target = os.path.join(tmp, name.replace(os.sep, "_"))
+                self._copy_db(db, target, should_stop)
+                entry, n = self._store_file(target, should_stop)
+                entry.update(path=path, kind="sqlite")
+                manifest["files"][name] = entry
+                written += n
+
+        for name, path in self.files.items():
+            if not os.path.exists(path):
+                continue
+            entry, n = self._store_file(path, should_stop)
+            entry["kind"] = "file"
+            manifest["files"][name] = entry
+            written += n
+
+        manifest["stored_bytes"] = written
+        manifest["seconds"] = round(time.time() - t0, 2)
+        path = os.path.join(self.snapshot_dir, snap_id + ".json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        return snap_id
+
+    def daily_backup(self, should_stop=None):
         today = datetime.now().strftime("%Y-%m-%d")
-        backup_path = os.path.join(self.backup_dir, f"ltm_{today}.sqlite")
+        if any(s["id"].startswith(today) for s in self.snapshots()):
+            return "Backup already exists today."
+        return self.backup(should_stop)
+
+    def backup(self, should_stop=None):
+        """Snapshot + Retention + Aufräumen, Ergebnis als Textzeile."""
+        snap_id = self.snapshot(should_stop)
+        removed = self.prune()
+        info = self.snapshot_info(snap_id)
+        total = sum(e["size"] for e in info["files"].values())
+        return (f"Backup created: {snap_id} ({len(info['files'])} Dateien, "
+                f"{total / 1e6:.1f} MB → {info['stored_bytes'] / 1e6:.2f} MB neu"
+                + (f", {removed} alte Snapshots entfernt" if removed else "") + ")")
+
+    # --------------------------------------------------------------
+    # Snapshots auflisten
+    # --------------------------------------------------------------
+    def snapshots(self):
+        """Alle Manifeste, neueste zuerst."""
+        out = []
+        for fname in sorted(os.listdir(self.snapshot_dir), reverse=True):
+            if not fname.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.snapshot_dir, fname), "r", encoding="utf-8") as f:
+                    out.append(json.load(f))
+            except Exception as e:
+                print("[BACKUP MANIFEST ERROR]", fname, e)
+        return out
+
+    def snapshot_info(self, snap_id=None):
+        snaps = self.snapshots()
+        if not snaps:
+            return None
+        if snap_id is None:
+            return snaps[0]
+        for s in snaps:
+            if s["id"] == snap_id:
+                return s
+        return None
+
+    def pretty_list(self):
+        snaps = self.snapshots()
+        if not snaps:
+            return "Noch keine Backups."
+        lines = [f"💾 Backups in {self.backup_dir}"]
+        for s in snaps:
+            total = sum(e["size"] for e in s["files"].values())
+            lines.append(f"- {s['id']}: {len(s['files'])} Dateien, {total / 1e6:.1f} MB "
+                         f"(neu gespeichert {s.get('stored_bytes', 0) / 1e6:.2f} MB)")
+        return "\n".join(lines)
+
+    # --------------------------------------------------------------
+    # Retention: letzte N + je einer pro Tag / Woche / Monat
+    # --------------------------------------------------------------
+    def _retained(self, snaps):
+        keep = {s["id"] for s in snaps[: self.keep["last"]]}
+        buckets = {
+            "daily": lambda d: d.strftime("%Y-%m-%d"),
+            "weekly": lambda d: d.strftime("%G-W%V"),
+            "monthly": lambda d: d.strftime("%Y-%m"),
+        }
+        for rule, bucket in buckets.items():
+            seen = []
+            for s in snaps:     # neueste zuerst → jüngster Snapshot pro Periode
+                b = bucket(datetime.fromtimestamp(s["created"]))
+                if b in seen:
+                    continue
+                if len(seen) >= self.keep[rule]:
+                    break
+                seen.append(b)
+                keep.add(s["id"])
+        return keep
+
+    def prune(self):
+        """Snapshots außerhalb der Retention löschen, dann verwaiste Chunks."""
+        snaps = self.snapshots()
+        keep = self._retained(snaps)
+        removed = 0
+        for s in snaps:
+            if s["id"] not in keep:
+                os.remove(os.path.join(self.snapshot_dir, s["id"] + ".json"))
+                removed += 1
+        if removed:
+            self._collect_garbage([s for s in snaps if s["id"] in keep])
+        return removed
+
+    def _collect_garbage(self, snaps):
+        live = {c for s in snaps for e in s["files"].values() for c in e["chunks"]}
+        for sub in os.listdir(self.chunk_dir):
+            folder = os.path.join(self.chunk_dir, sub)
+            for digest in os.listdir(folder):
+                if digest not in live:
+                    os.remove(os.path.join(folder, digest))
+
+    # --------------------------------------------------------------
+    # Prüfen + Wiederherstellen
+    # --------------------------------------------------------------
+    def verify(self, snap_id=None):
+        info = self.snapshot_info(snap_id)
+        if info is None:
+            return "Kein Backup gefunden."
+        bad = []
+        for name, entry in info["files"].items():
+            try:
+                digest = hashlib.sha256()
+                for key in entry["chunks"]:
+                    digest.update(self._get_chunk(key))
+                if digest.hexdigest() != entry["sha256"]:
+                    bad.append(name)
+            except Exception as e:
+                bad.append(f"{name} ({e})")
+        if bad:
+            return f"❌ Backup {info['id']} beschädigt: " + ", ".join(bad)
+        return f"✅ Backup {info['id']} vollständig ({len(info['files'])} Dateien)."
+
+    def _assemble(self, entry, target):
+        with open(target, "wb") as f:
+            for key in entry["chunks"]:
+                f.write(self._get_chunk(key))
+
+    def restore(self, snap_id=None, target_dir=None):
+        """
+        Snapshot zurückspielen (Standard: neuester). Ohne target_dir werden
+        die Live-Dateien ersetzt – Datenbanken über die Backup-API in die
+        offenen Verbindungen (kein Löschen unter laufenden Connections),
+        JSON-Dateien atomar per os.replace. Engines mit Zustand im RAM
+        (Persona, Self-Evolution, Vektorindex) lesen ihn erst nach einem
+        Neustart neu.
+        """
+        info = self.snapshot_info(snap_id)
+        if info is None:
+            return "Kein Backup gefunden."
+        if target_dir is None:
+            flush_all()
+
+        restored = []
+        live = self.databases() if target_dir is None else {}
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp:
+            for name, entry in info["files"].items():
+                if target_dir is not None:
+                    dest = os.path.join(target_dir, name)
+                elif entry.get("kind") == "sqlite":
+                    db = live.get(name, entry["path"])
+                    staged = os.path.join(tmp, name.replace(os.sep, "_"))
+                    self._assemble(entry, staged)
+                    src = sqlite3.connect(staged)
+                    # ohne Manager (Session-Datenbanken): eigene Verbindung
+                    own = isinstance(db, str)
+                    conn = sqlite3.connect(db, timeout=30) if own else db.connection()
+                    try:
+                        conn.commit()
+                        src.backup(conn)
+                    finally:
+                        src.close()
+                        if own:
+                            conn.close()
+                    restored.append(name)
+                    continue
+                else:
+                    dest = self.files.get(name, entry["path"])
+
+                # Datei neben dem Ziel zusammensetzen → os.replace bleibt atomar
+                os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+                self._assemble(entry, dest + ".restore")
+                os.replace(dest + ".restore", dest)
+                restored.append(name)
 
-        if not os.path.exists(backup_path):
-            shutil.copy2(self.db_path, backup_path)
-            return f"Backup created: {backup_path}"
-        return "Backup already exists today."
\ No newline at end of file
+        return f"Backup {info['id']} wiederhergestellt: " + ", ".join(restored)
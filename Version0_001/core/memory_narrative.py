@@ -1,18 +1,19 @@
 # memory_narrative.py
 # MAAT-KI - Memory Narrative Mode v1.0
 
-import sqlite3
 import time
 from datetime import datetime
 
+from core.db_pool import as_manager
+
 class MemoryNarrative:
 
-    def __init__(self, db_path):
-        self.db_path = db_path
+    def __init__(self, db):
+        # db = ConnectionManager der memory.db (oder Pfad)
+        self.db = as_manager(db)
 
     def fetch_recent(self, limit=20):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
+        cur = self.db.cursor()
 
         cur.execute("""
             SELECT ts, role, compressed
@@ -21,9 +22,7 @@ class MemoryNarrative:
             LIMIT ?
         """, (limit,))
 
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        return cur.fetchall()
 
     def build_narrative(self, limit=20):
         rows = self.fetch_recent(limit)
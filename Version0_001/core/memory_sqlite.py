@@ -1,7 +1,10 @@
-import sqlite3
-import threading
 import time
 
+from core.db_pool import as_manager
+from core.fts_index import ensure_fts, build_match_query
+from core.migrations import MEMORY_DB, run_migrations
+from core.write_buffer import get_buffer
+
 
 class SQLiteMemory:
     """
@@ -9,82 +12,66 @@ class SQLiteMemory:
     Speichert Chat-Historie in einer SQLite Datenbank.
     """
 
-    def __init__(self, db_path):
-        self.db_path = db_path
-
-        # VERBESSERUNG: connection + cursor persistent anlegen
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cur = self.conn.cursor()
+    def __init__(self, db):
+        # db = ConnectionManager (oder Pfad, abwärtskompatibel)
+        # → jeder Thread arbeitet auf seiner eigenen WAL-Verbindung
+        self.db = as_manager(db)
+        self.db_path = self.db.path
 
-        # Lock für Multi-Threading
-        self.lock = threading.Lock()
+        # Schreibzugriffe laufen gebündelt über den Write-Behind-Puffer
+        self.writer = get_buffer(self.db)
 
-        self._create_tables()
-        self._run_migrations() 
+        self._run_migrations()
+        with self.db.transaction() as cur:
+            self.fts = ensure_fts(cur, "memory", "content")
     # --------------------------------------------------------------
     # DB SETUP
     # --------------------------------------------------------------
-    def _create_tables(self):
-        with self.lock:
-            self.cur.execute("""
-                CREATE TABLE IF NOT EXISTS memory (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    role TEXT,
-                    content TEXT,
-                    ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            self.conn.commit()
-
-    # Update DB
-
     def _run_migrations(self):
         """
-        Upgrade bestehende memory.db automatisch,
-        ohne Datenverlust.
+        Legt memory.db an bzw. upgradet sie automatisch, ohne Datenverlust
+        (versioniert über PRAGMA user_version, siehe core/migrations.py).
         """
-        try:
-            # Prüfe, ob Spalte ts existiert
-            self.cur.execute("PRAGMA table_info(memory);")
-            cols = [row[1] for row in self.cur.fetchall()]
-
-            # Falls keine ts-Spalte → hinzufügen
-            if "ts" not in cols:
-                print("[LTM] ✨ Migrating: Adding 'ts' column to memory table...")
-                self.cur.execute("ALTER TABLE memory ADD COLUMN ts TEXT;")
-                self.conn.commit()
+        run_migrations(self.db, MEMORY_DB)
 
-                # Nachträglich alle alten Einträge mit Zeitstempel versehen
-                self.cur.execute("UPDATE memory SET ts = datetime('now') WHERE ts IS NULL;")
-                self.conn.commit()
-
-                print("[LTM] ✅ Migration abgeschlossen: 'ts' Spalte hinzugefügt.")
-
-        except Exception as e:
-            print(f"[LTM MIGRATION ERROR] {e}")
     # --------------------------------------------------------------
     # SPEICHERN
     # --------------------------------------------------------------
     def add(self, role, content):
         """Speichert eine Chat-Nachricht (User oder Assistant)."""
-        with self.lock:
-            self.cur.execute(
-                "INSERT INTO memory (role, content) VALUES (?, ?)",
-                (role, content)
-            )
-            self.conn.commit()
+        # ts explizit (Format wie CURRENT_TIMESTAMP) → Puffer- und DB-Zeile gleich
+        ts = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        self.writer.add(
+            "memory",
+            "INSERT INTO memory (role, content, ts) VALUES (?, ?, ?)",
+            (role, content, ts),
+            row={
+                "id": None,
+                "role": role,
+                "content": content,
+                "ts": ts,
+            },
+        )
+
+    def _pending_newest_first(self):
+        """Noch ungeschriebene Nachrichten (neueste zuerst)."""
+        return self.writer.pending("memory")[::-1]
+
+    @staticmethod
+    def _merge(pending, rows, limit):
+        """
+        Puffer + DB-Zeilen (neueste zuerst); Zeilen, die zwischen pending()
+        und SELECT geflusht wurden, nicht doppelt. Schlüssel (role, content, ts).
+        """
+        seen = {(p["role"], p["content"], p["ts"]) for p in pending}
+        return (pending + [r for r in rows if (r["role"], r["content"], r["ts"]) not in seen])[:limit]
 
     # --------------------------------------------------------------
     # LETZTER KONTEXT (für MAAT-KI Start)
     # --------------------------------------------------------------
     def last_context(self, limit=20):
         """Gibt die letzten N Nachrichten zurück als Textblock."""
-        with self.lock:
-            self.cur.execute(
-                "SELECT role, content FROM memory ORDER BY id DESC LIMIT ?",
-                (limit,)
-            )
-            rows = self.cur.fetchall()
+        rows = self.get_last_n(limit)
 
         if not rows:
             return ""
@@ -92,8 +79,8 @@ class SQLiteMemory:
         rows = rows[::-1]  # Chronologische Sortierung
 
         formatted = []
-        for role, content in rows:
-            formatted.append(f"{role}: {content}")
+        for r in rows:
+            formatted.append(f"{r['role']}: {r['content']}")
 
         return "\n".join(formatted)
 
@@ -101,15 +88,15 @@ class SQLiteMemory:
     # LONG TERM SUPPORT: Direktzugriff für LTM
     # --------------------------------------------------------------
     def get_last_n(self, n=50):
-        with self.lock:
-            self.cur.execute(
-                "SELECT id, role, content, ts FROM memory ORDER BY id DESC LIMIT ?",
-                (n,)
-            )
-            rows = self.cur.fetchall()
+        pending = self._pending_newest_first()
+        cur = self.db.cursor()
+        cur.execute(
+            "SELECT id, role, content, ts FROM memory ORDER BY id DESC LIMIT ?",
+            (n + len(pending),)
+        )
 
         results = []
-        for row in rows:
+        for row in cur.fetchall():
             results.append({
                 "id": row[0],
                 "role": row[1],
@@ -117,25 +104,40 @@ class SQLiteMemory:
                 "ts": row[3]
             })
 
-        return results
+        return self._merge(pending, results, n)
 
     # --------------------------------------------------------------
     # SUCHEN (optional)
     # --------------------------------------------------------------
     def search(self, keyword, limit=5):
-        with self.lock:
-            self.cur.execute(
-                "SELECT role, content, ts FROM memory WHERE content LIKE ? ORDER BY id DESC LIMIT ?",
+        self.writer.flush()
+        cur = self.db.cursor()
+        if self.fts:
+            match = build_match_query(keyword)
+            if not match:
+                return []
+            cur.execute("""
+                SELECT m.id, m.role, m.content, m.ts
+                FROM memory_fts
+                JOIN memory m ON m.id = memory_fts.rowid
+                WHERE memory_fts MATCH ?
+                ORDER BY bm25(memory_fts), m.id DESC
+                LIMIT ?
+            """, (match, limit))
+        else:
+            cur.execute(
+                "SELECT id, role, content, ts FROM memory WHERE content LIKE ? ORDER BY id DESC LIMIT ?",
                 (f"%{keyword}%", limit)
             )
-            rows = self.cur.fetchall()
+        rows = cur.fetchall()
 
         results = []
         for r in rows:
             results.append({
-                "role": r[0],
-                "content": r[1],
-                "ts": r[2]
+                "id": r[0],
+                "role": r[1],
+                "content": r[2],
+                "ts": r[3]
             })
 
         return results
@@ -144,16 +146,17 @@ class SQLiteMemory:
     # RESET
     # --------------------------------------------------------------
     def clear(self):
-        with self.lock:
-            self.cur.execute("DELETE FROM memory")
-            self.conn.commit()
+        self.writer.discard("memory")
+        with self.db.transaction() as cur:
+            cur.execute("DELETE FROM memory")
 
     # --------------------------------------------------------------
     # CLEANUP
     # --------------------------------------------------------------
     def close(self):
         try:
-            self.conn.close()
+            self.writer.flush()
+            self.db.close_all()
         except:
             pass
 
@@ -161,9 +164,10 @@ class SQLiteMemory:
     # ALLE EINTRÄGE LADEN  (/memory show)
     # --------------------------------------------------------------
     def get_all(self):
-        with self.lock:
-            self.cur.execute("SELECT id, role, content, ts FROM memory ORDER BY id ASC")
-            rows = self.cur.fetchall()
+        self.writer.flush()
+        cur = self.db.cursor()
+        cur.execute("SELECT id, role, content, ts FROM memory ORDER BY id ASC")
+        rows = cur.fetchall()
 
         results = []
         for r in rows:
@@ -179,17 +183,18 @@ class SQLiteMemory:
     # EINEN EINTRAG LÖSCHEN  (/memory delete <id>)
     # --------------------------------------------------------------
     def delete(self, entry_id):
-        with self.lock:
-            self.cur.execute("DELETE FROM memory WHERE id = ?", (entry_id,))
-            self.conn.commit()
+        self.writer.flush()
+        with self.db.transaction() as cur:
+            cur.execute("DELETE FROM memory WHERE id = ?", (entry_id,))
 
     # --------------------------------------------------------------
     # MEMORY ALS LISTE FÜR DEBUG AUSGEBEN
     # --------------------------------------------------------------
     def count(self):
-        with self.lock:
-            self.cur.execute("SELECT COUNT(*) FROM memory")
-            return self.cur.fetchone()[0]
+        self.writer.flush()
+        cur = self.db.cursor()
+        cur.execute("SELECT COUNT(*) FROM memory")
+        return cur.fetchone()[0]
 
     # ------------------------------------------------------------
     # 🔍 Suche nach Stichworten in den letzten X Einträgen
@@ -202,16 +207,30 @@ class SQLiteMemory:
         """
 
         try:
-            kw = f"%{keyword.lower()}%"
-            self.cur.execute("""
-                SELECT ts, role, content
-                FROM memory
-                WHERE LOWER(content) LIKE ?
-                ORDER BY id DESC
-                LIMIT ?
-            """, (kw, limit))
-
-            rows = self.cur.fetchall()
+            self.writer.flush()
+            cur = self.db.cursor()
+            if self.fts:
+                match = build_match_query(keyword)
+                if not match:
+                    return []
+                cur.execute("""
+                    SELECT m.ts, m.role, m.content
+                    FROM memory_fts
+                    JOIN memory m ON m.id = memory_fts.rowid
+                    WHERE memory_fts MATCH ?
+                    ORDER BY bm25(memory_fts), m.id DESC
+                    LIMIT ?
+                """, (match, limit))
+            else:
+                kw = f"%{keyword.lower()}%"
+                cur.execute("""
+                    SELECT ts, role, content
+                    FROM memory
+                    WHERE LOWER(content) LIKE ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                """, (kw, limit))
+            rows = cur.fetchall()
 
             return [
                 {
@@ -0,0 +1,203 @@
+# core/migrations.py
+# MAAT-KI — Schema-Migrationen v1.0 (PRAGMA user_version pro Datenbank)
+
+import os
+import threading
+
+from core.db_pool import as_manager
+
+_LOCK = threading.Lock()
+
+
+def _columns(cur, table):
+    cur.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def _add_columns(cur, table, columns):
+    have = _columns(cur, table)
+    for name, decl in columns:
+        if name not in have:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+# =========================================================
+# memory.db  (memory = Chatverlauf, ltm = Langzeitgedächtnis)
+# =========================================================
+def _memory_base(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role TEXT,
+            content TEXT,
+            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # sehr alte memory.db ohne ts-Spalte (früher SQLiteMemory._run_migrations)
+    if "ts" not in _columns(cur, "memory"):
+        cur.execute("ALTER TABLE memory ADD COLUMN ts TEXT")
+        cur.execute("UPDATE memory SET ts = datetime('now') WHERE ts IS NULL")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ltm (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL,
+            role TEXT,
+            content TEXT,
+            compressed TEXT,
+            keywords TEXT,
+            category TEXT
+        )
+    """)
+
+
+def _ltm_priority(cur):
+    # MaatDreaming + ContextAnchor lesen/schreiben ltm.priority (Lazy Decay)
+    _add_columns(cur, "ltm", [
+        ("priority", "REAL DEFAULT 1.0"),
+        ("touched", "REAL"),
+        ("decay_key", "REAL"),
+    ])
+
+
+def _memory_indexes(cur):
+    # Narrative + Dreaming: ORDER BY ts DESC (Narrative komplett aus dem Index)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ltm_ts ON ltm(ts, role, compressed)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ltm_category ON ltm(category, ts)")
+    # Ranking + Garbage-Collection (core/decay.py)
+    cur.execute("DROP INDEX IF EXISTS idx_ltm_decay")
+    cur.execute("CREATE INDEX idx_ltm_decay ON ltm(decay_key, ts)")
+    # memory wird per id DESC gelesen → INTEGER PRIMARY KEY (rowid) reicht
+
+
+def _dream_state(cur):
+    # Maat-Dreaming: Wasserstand (zuletzt konsolidierte ltm-id) + eine
+    # laufende Zusammenfassung pro Kategorie
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dream_state (
+            key TEXT PRIMARY KEY,
+            value REAL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dream_summary (
+            category TEXT PRIMARY KEY,
+            summary TEXT,
+            episodes INTEGER DEFAULT 0,
+            last_id INTEGER DEFAULT 0,
+            synced_id INTEGER DEFAULT 0
+        )
+    """)
+
+
+MEMORY_DB = [
+    (1, "Basis-Schema memory + ltm", _memory_base),
+    (2, "ltm.priority / touched / decay_key", _ltm_priority),
+    (3, "Indizes ltm(ts), ltm(category), ltm(decay_key)", _memory_indexes),
+    (4, "dream_state + dream_summary (inkrementelles Dreaming)", _dream_state),
+]
+
+
+# =========================================================
+# episodic_memory.db
+# =========================================================
+def _episodic_base(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS episodic (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL,
+            role TEXT,
+            text TEXT,
+            priority REAL DEFAULT 1.0
+        )
+    """)
+
+
+def _episodic_decay(cur):
+    _add_columns(cur, "episodic", [
+        ("priority", "REAL DEFAULT 1.0"),
+        ("touched", "REAL"),
+        ("decay_key", "REAL"),
+    ])
+
+
+def _episodic_indexes(cur):
+    # Recall: ORDER BY decay_key DESC, ts DESC (früher priority DESC, ts DESC)
+    cur.execute("DROP INDEX IF EXISTS idx_episodic_decay")
+    cur.execute("CREATE INDEX idx_episodic_decay ON episodic(decay_key, ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_episodic_ts ON episodic(ts)")
+
+
+EPISODIC_DB = [
+    (1, "Basis-Schema episodic", _episodic_base),
+    (2, "episodic.touched / decay_key", _episodic_decay),
+    (3, "Indizes episodic(decay_key, ts), episodic(ts)", _episodic_indexes),
+]
+
+
+# =========================================================
+# semantic_memory.db
+# =========================================================
+def _semantic_base(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS semantic_memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT,
+            text TEXT UNIQUE,
+            vector REAL,
+            embedding BLOB
+        )
+    """)
+    # alte Datenbanken (nur Skalar-'vector') → Vektoren rechnet SemanticMemory nach
+    _add_columns(cur, "semantic_memory", [("embedding", "BLOB")])
+
+
+SEMANTIC_DB = [
+    # text UNIQUE (Autoindex) deckt _exists ab, id DESC ist der rowid
+    (1, "Basis-Schema semantic_memory + embedding", _semantic_base),
+]
+
+
+# =========================================================
+# Runner
+# =========================================================
+def user_version(db):
+    cur = as_manager(db).cursor()
+    cur.execute("PRAGMA user_version")
+    return cur.fetchone()[0]
+
+
+def run_migrations(db, steps):
+    """
+    steps = [(version, beschreibung, fn(cursor)), ...] aufsteigend.
+    Jede Stufe läuft in einer eigenen Transaktion zusammen mit dem
+    Hochsetzen von PRAGMA user_version → abgebrochene Upgrades werden beim
+    nächsten Start an derselben Stelle fortgesetzt. Danach ANALYZE, damit
+    der Planer die neuen Indizes kennt.
+    """
+    db = as_manager(db)
+    name = os.path.basename(db.path)
+
+    with _LOCK:
+        current = user_version(db)
+        pending = [s for s in steps if s[0] > current]
+        if not pending:
+            return current
+
+        start = current
+        try:
+            for version, description, fn in pending:
+                with db.transaction() as cur:
+                    # DDL startet in sqlite3 keine implizite Transaktion
+                    if not cur.connection.in_transaction:
+                        cur.execute("BEGIN")
+                    fn(cur)
+                    cur.execute(f"PRAGMA user_version = {int(version)}")
+                current = version
+
+            with db.transaction() as cur:
+                cur.execute("ANALYZE")
+            print(f"[MIGRATION] ✅ {name}: v{start} → v{current} ({pending[-1][1]})")
+        except Exception as e:
+            print(f"[MIGRATION ERROR] {name} v{current + 1}: {e}")
+        return current
@@ -0,0 +1,238 @@
+# core/model_manager.py
+# MAAT-KI — Model Manager v1.0 (Hot-Swap im Hintergrund + Warm-Standby)
+
+import os
+import threading
+
+from core.llm_loader import load_llm_async, logits_buffer_bytes
+
+GB = 1024 ** 3
+
+
+def physical_ram_bytes():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 16 * GB
+
+
+def default_ram_budget():
+    """MAAT_RAM_BUDGET_GB, sonst 70 % des physischen RAMs."""
+    env = os.environ.get("MAAT_RAM_BUDGET_GB")
+    if env:
+        try:
+            return int(float(env) * GB)
+        except ValueError:
+            pass
+    return int(physical_ram_bytes() * 0.7)
+
+
+def estimate_footprint(llm, model_path):
+    """
+    Gewichte (GGUF-Dateigröße, per mmap, inkl. Draft-Modell) + KV-Cache
+    (2 × n_layer × n_ctx × n_embd × f16, obere Schranke ohne GQA)
+    + scores-Puffer n_ctx × n_vocab × f32, falls logits_all (Draft-Modell).
+    """
+    size = os.path.getsize(model_path)
+    draft_path = getattr(getattr(llm, "draft_model", None), "model_path", None)
+    if draft_path and os.path.exists(draft_path):
+        size += os.path.getsize(draft_path)
+    try:
+        n_layer = next(
+            int(v) for k, v in llm.metadata.items() if k.endswith(".block_count")
+        )
+        size += 2 * n_layer * llm.n_ctx() * llm.n_embd() * 2
+    except Exception:
+        pass
+    return size + logits_buffer_bytes(llm)
+
+
+class ResidentModel:
+    __slots__ = ("path", "perf", "llm", "bytes")
+
+    def __init__(self, path, perf, llm):
+        self.path = path
+        self.perf = perf
+        self.llm = llm
+        self.bytes = estimate_footprint(llm, path)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+
+class ModelManager:
+    """
+    Hält das aktive Modell und optional EIN Standby-Modell (kleines/großes Paar).
+
+    - switch_async(): lädt das neue Modell im Hintergrund, das alte antwortet
+      weiter; nach dem Laden wird es mit dem aktuellen Prefix angewärmt und
+      dann atomar getauscht. Schlägt das Laden fehl, bleibt alles beim Alten.
+    - Das abgelöste Modell bleibt als Standby geladen, solange aktiv + Standby
+      ins RAM-Budget passen → Zurückwechseln ist sofort möglich.
+    """
+
+    def __init__(self, prefix_cache=None, ram_budget=None, keep_standby=True):
+        self.prefix_cache = prefix_cache
+        self.ram_budget = ram_budget or default_ram_budget()
+        self.keep_standby = keep_standby
+
+        self.active = None
+        self.standby = None
+        self.loading = None          # Dateiname des Modells, das gerade lädt
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._first = None           # Future des ersten Ladevorgangs
+        self._first_args = None
+
+    # --------------------------------------------------------------
+    # Start: erstes Modell (Readiness-Future)
+    # --------------------------------------------------------------
+    def load_async(self, model_path, perf):
+        self._first = load_llm_async(model_path, perf)
+        self._first_args = (model_path, perf)
+
+        def done(f):
+            if f.exception() is None:
+                self._adopt_first(f.result())
+
+        self._first.add_done_callback(done)
+        return self._first
+
+    def _adopt_first(self, llm):
+        # set_result() weckt result()-Wartende VOR den Callbacks → wer zuerst
+        # kommt (Callback oder current()), setzt active; nie überschreiben
+        with self._lock:
+            if self.active is None:
+                self.active = ResidentModel(*self._first_args, llm)
+            return self.active
+
+    def current(self):
+        """Aktives Modell; wartet nur, solange noch gar keins geladen ist."""
+        if self.active is None and self._first is not None:
+            return self._adopt_first(self._first.result())
+        with self._lock:
+            return self.active
+
+    # --------------------------------------------------------------
+    # Hot-Swap
+    # --------------------------------------------------------------
+    def switch_async(self, model_path, perf, assembler=None, on_done=None):
+        """
+        on_done(ok, message) wird im Lade-Thread aufgerufen.
+        """
+        # Prüfen und Belegen von self.loading in EINEM Lock-Abschnitt →
+        # zwei gleichzeitige Wechsel können nie beide laden
+        with self._lock:
+            busy = self.loading
+            standby = self.standby
+            use_standby = (
+                not busy
+                and standby is not None
+                and standby.path == model_path
+                and standby.perf.get("n_ctx") == perf.get("n_ctx")
+                and standby.perf.get("draft") == perf.get("draft")
+            )
+            if not busy and not use_standby:
+                self.loading = os.path.basename(model_path)
+
+        if busy:
+            if on_done:
+                on_done(False, f"Es lädt bereits: {busy}")
+            return
+
+        if use_standby:
+            self._swap(standby)
+            if on_done:
+                on_done(True, f"Standby aktiviert → {standby.name}")
+            return
+
+        try:
+            # Platz schaffen: das Standby-Modell antwortet nicht, darf zuerst gehen
+            self._fit_budget(os.path.getsize(model_path))
+            future = load_llm_async(model_path, perf)
+        except Exception:
+            with self._lock:
+                self.loading = None
+            raise
+
+        def done(f):
+            try:
+                llm = f.result()
+                if self.prefix_cache is not None and assembler is not None:
+                    # anwärmen, bevor getauscht wird → erste Antwort ohne Prefix-Auswertung
+                    self.prefix_cache.ensure(llm, assembler)
+                entry = ResidentModel(model_path, perf, llm)
+                self._swap(entry)
+                self.last_error = None
+                ok, msg = True, f"Modell gewechselt → {entry.name}"
+            except Exception as e:
+                # altes Modell bleibt unangetastet aktiv
+                self.last_error = str(e)
+                ok, msg = False, f"Laden fehlgeschlagen ({e}) – bleibe bei {self.active.name if self.active else '—'}"
+            finally:
+                with self._lock:
+                    self.loading = None
+            if on_done:
+                on_done(ok, msg)
+
+        future.add_done_callback(done)
+
+    def _swap(self, entry):
+        with self._lock:
+            old = self.active
+            self.active = entry
+            if self.standby is entry:
+                self.standby = None
+
+            dropped = []
+            if old is not None and old is not entry:
+                if self.keep_standby:
+                    if self.standby is not None:
+                        dropped.append(self.standby)
+                    self.standby = old
+                else:
+                    dropped.append(old)
+
+            if self.standby is not None and entry.bytes + self.standby.bytes > self.ram_budget:
+                dropped.append(self.standby)
+                self.standby = None
+
+        for d in dropped:
+            self._release(d)
+
+    def _fit_budget(self, incoming_bytes):
+        with self._lock:
+            standby = self.standby
+            active_bytes = self.active.bytes if self.active else 0
+            if standby is None or active_bytes + standby.bytes + incoming_bytes <= self.ram_budget:
+                return
+            self.standby = None
+        self._release(standby)
+
+    def _release(self, entry):
+        if self.prefix_cache is not None:
+            self.prefix_cache.forget(entry.llm)
+        # letzte Referenz im Manager; eine laufende Generation hält ihre eigene
+        entry.llm = None
+
+    # --------------------------------------------------------------
+    def status_text(self):
+        def line(label, e):
+            if e is None:
+                return f"{label:<9}: —"
+            return f"{label:<9}: {e.name} (n_ctx={e.perf.get('n_ctx')}, ~{e.bytes / GB:.1f} GB)"
+
+        with self._lock:
+            lines = [
+                "🧠 Modelle",
+                line("Aktiv", self.active),
+                line("Standby", self.standby),
+            ]
+        if self.loading:
+            lines.append(f"Lädt     : {self.loading}")
+        if self.last_error:
+            lines.append(f"Fehler   : {self.last_error}")
+        lines.append(f"RAM-Budget: {self.ram_budget / GB:.1f} GB")
+        return "\n".join(lines)
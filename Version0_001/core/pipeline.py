@@ -0,0 +1,167 @@
+# core/pipeline.py
+# MAAT-KI — Chat-Pipeline v1.0 (eine Runde ohne Terminal)
+
+from core.modes import (
+    detect_mode,
+    mode_instructions,
+    build_time_context,
+    build_runtime_context,
+)
+from core.stream_engine import StreamEngine
+
+MEMORY_BLOCK_HEADER = (
+    "Die folgenden Einträge stammen aus deinem Gehirn-Speicher "
+    "(episodisch + semantisch). Nutze sie als Erinnerungs-Kontext.\n"
+    "[LONG_TERM_MEMORY]\n"
+)
+
+
+class ChatPipeline:
+    """
+    Die Stufen einer Runde – geteilt von Terminal-Chat (MAAT-KI.py) und
+    Server (core/server.py):
+
+        prepare()  → Gehirn-Speicher, Zeit/Laufzeit, Identität, [MIE],
+                     Auto-Recall, Modus (alles als Pro-Runde-Blöcke)
+        generate() → Prefix-State, Token-Budget, Denkmodus, Streaming
+        finish()   → Identity-Korrektur, History, Post-Turn-Analytics
+
+    Ausgaben passieren nur über Rückgabewerte und Stream-Events.
+    """
+
+    def __init__(
+        self,
+        brain,
+        identity_kernel,
+        alignment_kernel,
+        analytics,
+        prefix_cache,
+        thinkloop,
+        speed_trainer=None,
+    ):
+        self.brain = brain
+        self.identity_kernel = identity_kernel
+        self.alignment_kernel = alignment_kernel
+        self.analytics = analytics
+        self.prefix_cache = prefix_cache
+        self.thinkloop = thinkloop
+        self.speed_trainer = speed_trainer
+
+    # --------------------------------------------------------------
+    # 1. Runde vorbereiten
+    # --------------------------------------------------------------
+    def recall(self, user_input, limit=5):
+        """Auto-Recall → Liste (ts, role, category, text) ohne Duplikate."""
+        try:
+            hits = self.brain.recall(user_input, limit=limit)
+        except Exception as e:
+            print("[BRAIN RECALL ERROR]", e)
+            return []
+
+        lines = []
+        seen = set()
+        for r in hits or []:
+            full_text = (r.get("text") or "").replace("\n", " ")
+            if not full_text or full_text in seen:
+                continue
+            seen.add(full_text)
+            lines.append((
+                str(r.get("ts") or "?"),
+                r.get("role", "memory"),
+                r.get("category", "allgemein"),
+                full_text,
+            ))
+        return lines
+
+    def prepare(self, conversation, user_input, last_reply_time, store=True):
+        """
+        Gibt {"memories": [...], "mode": ...} zurück (für die Anzeige).
+        Slash-Befehle werden nicht im Gehirn gespeichert.
+        """
+        if store and not user_input.startswith("/"):
+            try:
+                self.brain.store("user", user_input)
+            except Exception as e:
+                print("[BRAIN STORE USER ERROR]", e)
+
+        conversation.begin_turn(user_input)
+        conversation.add_volatile(
+            build_time_context() + "\n" + build_runtime_context(last_reply_time)
+        )
+        self.identity_kernel.inject_identity(conversation.volatile, user_input)
+
+        # Ergebnisse der Analytics aus der letzten Runde ([MIE])
+        for block in self.analytics.take_blocks():
+            conversation.add_volatile(block)
+
+        memories = self.recall(user_input)
+        if memories:
+            conversation.add_volatile(
+                MEMORY_BLOCK_HEADER
+                + "\n".join(f"[{ts}] ({role}) <{cat}> {text}" for ts, role, cat, text in memories)
+            )
+
+        mode = detect_mode(user_input)
+        conversation.add_volatile(f"[MODE: {mode}] {mode_instructions(mode)}")
+
+        return {"memories": memories, "mode": mode}
+
+    # --------------------------------------------------------------
+    # 2. Antwort erzeugen
+    # --------------------------------------------------------------
+    def ready(self, llm, conversation, context_window):
+        """Prefix-State sicherstellen (Profil-/Modellwechsel), Prompt ins Budget."""
+        self.prefix_cache.ensure(llm, conversation)
+        context_window.fit(conversation)
+
+    def think(self, llm, conversation, user_input, stream_fn=None, context_window=None):
+        """
+        Denkmodus, falls verlangt → [THOUGHTS]-Block; gibt die Gedanken zurück.
+        Mit context_window wird danach erneut ins Budget eingepasst.
+        """
+        if not self.thinkloop.needs_think(user_input):
+            return None
+        if hasattr(llm, "with_priority"):
+            # BatchScheduler: Denken läuft hinter interaktiven Streams
+            llm = llm.with_priority("think")
+        thoughts = self.thinkloop.run_thinkloop(
+            llm,
+            conversation.messages(),
+            scorer=self.alignment_kernel,
+            stream_fn=stream_fn,
+        )
+        conversation.add_volatile(f"[THOUGHTS]\n{thoughts}")
+        if context_window is not None:
+            context_window.fit(conversation)
+        return thoughts
+
+    def telemetry(self, model, conversation, context_window):
+        """Latenz-Messung dieser Antwort (Modell + n_ctx) als Stream-Consumer."""
+        if self.speed_trainer is None or not model:
+            return []
+        prompt_tokens = context_window.count(conversation.messages())
+        return [self.speed_trainer.consumer(model, context_window.n_ctx, prompt_tokens)]
+
+    def generate(self, llm, conversation, context_window, user_input,
+                 consumers=None, cancel=None, max_tokens=None, model=None):
+        """Komplette Generierung ohne Terminal (Server, Tests)."""
+        self.ready(llm, conversation, context_window)
+        self.think(llm, conversation, user_input, context_window=context_window)
+        consumers = list(consumers or []) + self.telemetry(model, conversation, context_window)
+        engine = StreamEngine(llm, consumers=consumers)
+        return engine.run(conversation.messages(), cancel=cancel, max_tokens=max_tokens)
+
+    # --------------------------------------------------------------
+    # 3. Runde abschließen
+    # --------------------------------------------------------------
+    def finish(self, conversation, user_input, reply_text):
+        """
+        Identity-Korrektur + Alignment (synchron, < 1 ms), Runde in die
+        History, Analytics im Hintergrund. Die History enthält so ab sofort
+        den ausgerichteten Text – die nächste Runde sieht nie die Rohfassung.
+        """
+        reply_text = self.identity_kernel.sanitize(reply_text)
+        aligned_text, align_meta = self.alignment_kernel.align(reply_text)
+        reply_msg = conversation.commit_turn(aligned_text)
+        self.analytics.submit(user_input, aligned_text, align_meta, conversation.messages())
+        return reply_msg
@@ -0,0 +1,239 @@
+# core/post_turn.py
+# MAAT-KI — Post-Turn Analytics v1.0 (Worker-Thread + Events)
+
+import queue
+import threading
+
+# fester Maat-Vektor für die Intuition (wie bisher im Chat-Loop)
+MIE_MAAT_VEC = {"H": 0.8, "B": 0.85, "S": 0.9, "V": 0.88, "R": 0.92}
+
+
+class PostTurnAnalytics:
+    """
+    Alles, was nach einer Antwort berechnet wird, läuft hier auf EINEM
+    Worker-Thread (Reihenfolge bleibt erhalten, Persona-/Evo-Dateien werden
+    nie parallel geschrieben). Der Chat-Loop kehrt direkt nach dem Streaming
+    zum Eingabeprompt zurück.
+
+    Ergebnisse werden als Events veröffentlicht:
+        {"type": "maat_score" | "reflexion" | "emotion" | "b_ki" | "drift"
+                 | "mie" | "self_evo" | "error",
+         "lines": [...anzeigefertige Zeilen...],
+         "data":  {...Rohwerte...}}
+    Terminal und GUI abonnieren per subscribe(callback).
+    """
+
+    def __init__(
+        self,
+        alignment_kernel,
+        identity_kernel,
+        emotion_engine,
+        emm,
+        persona,
+        reflex,
+        mie,
+        self_evo,
+        memory,
+        lock=None,
+    ):
+        self.alignment_kernel = alignment_kernel
+        self.identity_kernel = identity_kernel
+        self.emotion_engine = emotion_engine
+        self.emm = emm
+        self.persona = persona
+        self.reflex = reflex
+        self.mie = mie
+        self.self_evo = self_evo
+        self.memory = memory
+        # mehrere Sessions → geteilter Lock, damit Persona-/Evo-Dateien
+        # weiterhin nie parallel geschrieben werden
+        self._run_lock = lock or threading.Lock()
+
+        self.last = {}                  # letzte Werte (für /emotion, /bki …)
+        self._subscribers = []
+        self._next_blocks = []          # Systemblöcke für die nächste Runde ([MIE])
+        self._blocks_lock = threading.Lock()
+        self._jobs = queue.Queue()
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------------------
+    # API für den Chat-Loop
+    # --------------------------------------------------------------
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def submit(self, user_input, aligned_text, align_meta, context):
+        """
+        aligned_text/align_meta = Ergebnis von alignment_kernel.align()
+                    (läuft synchron in ChatPipeline.finish)
+        context   = Nachrichten-Snapshot für B_KI
+        """
+        self._jobs.put((user_input, aligned_text, dict(align_meta or {}), list(context)))
+
+    def take_blocks(self):
+        with self._blocks_lock:
+            blocks, self._next_blocks = self._next_blocks, []
+        return blocks
+
+    def join(self):
+        """Wartet, bis alle offenen Runden ausgewertet sind (z. B. vor dem Beenden)."""
+        self._jobs.join()
+
+    def close(self):
+        """Offene Runden auswerten, dann den Worker-Thread beenden."""
+        self._jobs.put(None)
+        self._thread.join(timeout=30)
+
+    # --------------------------------------------------------------
+    # Worker
+    # --------------------------------------------------------------
+    def _publish(self, kind, lines, **data):
+        event = {"type": kind, "lines": lines, "data": data}
+        for cb in list(self._subscribers):
+            try:
+                cb(event)
+            except Exception as e:
+                print("[ANALYTICS SUBSCRIBER ERROR]", e)
+
+    def _error(self, label, exc):
+        self._publish("error", [f"[{label} ERROR] {exc}"], label=label)
+
+    def _loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            try:
+                with self._run_lock:
+                    self._run(*job)
+            except Exception as e:
+                self._error("ANALYTICS", e)
+            finally:
+                self._jobs.task_done()
+
+    def _run(self, user_input, aligned_text, align_meta, context):
+        # ---------------------------------------------
+        # Alignment-Ergebnis (schon in der History) anzeigen
+        # ---------------------------------------------
+        maat_score = align_meta.get("maat_score", 0.0)
+        self.last["maat_score"] = maat_score
+        self._publish(
+            "maat_score",
+            [f"🌿 Maat-Score: {maat_score:.2f}"],
+            maat_score=maat_score,
+            safety=align_meta.get("safety"),
+        )
+
+        try:
+            aligned_reply = self.alignment_kernel.evaluate(aligned_text)
+        except Exception:
+            aligned_reply = aligned_text
+
+        # ---------------------------------------------
+        # Reflexion
+        # ---------------------------------------------
+        try:
+            thought = self.reflex.generate_reflexion_question(user_input, aligned_reply)
+            self._publish("reflexion", [f"💭 Gedanke: {thought}"], thought=thought)
+        except Exception as e:
+            self._error("REFLEXION", e)
+
+        # ---------------------------------------------
+        # Emotion + EMM + Persona (gemeinsame Signale, nur EIN Durchlauf)
+        # ---------------------------------------------
+        E_KI = 0.0
+        try:
+            e_raw = self.emotion_engine.detect_raw(user_input)
+            E_KI = self.emotion_engine.compute_emotion(
+                e_raw, H=0.8, V=0.85, deltaD=0.1, R=1.0
+            )
+            emo_txt = self.emotion_engine.transform(e_raw)
+            safe_info = self.emotion_engine.safe(e_raw, E_KI)
+            mie_weights = self.emm.map(emo_txt, intensity=abs(E_KI))
+
+            self.last["emotion"] = (emo_txt, E_KI, safe_info)
+            self._publish(
+                "emotion",
+                [
+                    f"🌀 EMM-Maat-Vektor: {mie_weights}",
+                    f"💙 Emotion: {emo_txt} ({E_KI:.2f})",
+                    f"💬 Sicherheit: {safe_info}",
+                ],
+                emotion=emo_txt,
+                E_KI=E_KI,
+                safety=safe_info,
+                emm=mie_weights,
+            )
+
+            # Persona lernt aus Emotion
+            self.persona.update_from_emotion(e_raw, abs(E_KI))
+        except Exception as e:
+            self._error("EMOTION/EMM", e)
+
+        # ---------------------------------------------
+        # B_KI + Emotion
+        # ---------------------------------------------
+        try:
+            base_bki = self.reflex.compute_b_ki(aligned_reply, user_input, context)
+            mod_bki = base_bki * (1 + 0.25 * E_KI)
+            self.last["b_ki"] = mod_bki
+            self._publish("b_ki", [f"🜂 B_KI: {mod_bki:.2f}"], b_ki=mod_bki)
+        except Exception as e:
+            self._error("B_KI", e)
+
+        # ---------------------------------------------
+        # Identity-Drift
+        # ---------------------------------------------
+        try:
+            id_drift = self.identity_kernel.measure_drift(aligned_reply)
+            self._publish("drift", [f"🔶 Identity-Drift: {id_drift:.2f}"], drift=id_drift)
+        except Exception as e:
+            id_drift = 0.0
+            self._error("IDENTITY DRIFT", e)
+
+        # ---------------------------------------------
+        # Maat-Intuition Engine → Block für die nächste Runde
+        # ---------------------------------------------
+        try:
+            mie_info = self.mie.evaluate(
+                user_input, maat_vec=MIE_MAAT_VEC, emotion=E_KI, drift=id_drift
+            )
+            self._publish(
+                "mie",
+                [
+                    f"🔮 Intuition: {mie_info['intuition']:.2f}",
+                    f"✨ Intent: {mie_info['intent']}",
+                    f"🌿 Resonanz: {mie_info['resonance']:.2f}",
+                ],
+                **mie_info,
+            )
+            with self._blocks_lock:
+                self._next_blocks.append(
+                    f"[MIE] intuition={mie_info['intuition']:.2f} intent={mie_info['intent']}"
+                )
+        except Exception as e:
+            self._error("MIE", e)
+
+        # ---------------------------------------------
+        # Self-Evolution Engine
+        # ---------------------------------------------
+        try:
+            patch = self.self_evo.evaluate_and_evolve(
+                aligned_reply,
+                {"maat_score": maat_score, "emotion": E_KI, "identity_drift": id_drift},
+            )
+            if patch:
+                self._publish("self_evo", [], patch=patch)
+        except Exception as e:
+            self._error("SELF-EVO", e)
+
+        # ---------------------------------------------
+        # Antwort speichern (Kurzzeitgedächtnis)
+        # ---------------------------------------------
+        try:
+            self.memory.add("assistant", aligned_text)
+        except Exception as e:
+            self._error("SPEICHERN", e)
@@ -0,0 +1,223 @@
+# core/prompt_assembly.py
+# MAAT-KI — Prompt-Assembly mit stabilem Prefix + KV-Cache-Wiederverwendung
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PromptAssembler:
+    """
+    Baut die Nachrichtenliste für llama.cpp in fester Reihenfolge:
+
+        [PREFIX]    Systemprompt + Profil + Persona + letzter Kontext  (stabil)
+        [SUMMARY]   Kurzfassung ausgelagerter Runden (ContextWindow)
+        [HISTORY]   nur user/assistant-Paare                           (wächst hinten)
+        [VOLATILE]  [MODE], [MIE], [LONG_TERM_MEMORY], [THOUGHTS] …    (nur diese Runde)
+        [USER]      aktuelle Nutzernachricht
+
+    Weil Pro-Runde-Blöcke nie zwischen den Turns stehen bleiben, bleibt
+    PREFIX + HISTORY von Runde zu Runde ein echtes Token-Prefix
+    → llama.cpp muss nur die neuen Tokens auswerten.
+    """
+
+    def __init__(self, prefix=None):
+        self.prefix = []
+        self.summary = None
+        self.history = []
+        self.volatile = []
+        self.pending_user = None
+        if prefix:
+            self.set_prefix(prefix)
+
+    # --------------------------------------------------------------
+    # Stabiler Prefix
+    # --------------------------------------------------------------
+    def set_prefix(self, messages):
+        self.prefix = [dict(m) for m in messages if m.get("content")]
+
+    def prefix_key(self):
+        raw = json.dumps(self.prefix, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------------------
+    # Pro Runde
+    # --------------------------------------------------------------
+    def add_volatile(self, content, role="system"):
+        self.volatile.append({"role": role, "content": content})
+
+    def begin_turn(self, user_input):
+        self.pending_user = {"role": "user", "content": user_input}
+
+    def commit_turn(self, reply):
+        """
+        Runde abschließen: User + Antwort in die History, Pro-Runde-Blöcke verwerfen.
+        Gibt den Antwort-Eintrag zurück (kann später in place korrigiert werden).
+        """
+        reply_msg = {"role": "assistant", "content": reply or ""}
+        if self.pending_user is not None:
+            self.history.append(self.pending_user)
+        if reply:
+            self.history.append(reply_msg)
+        self.pending_user = None
+        self.volatile = []
+        return reply_msg
+
+    # --------------------------------------------------------------
+    # Ausgabe
+    # --------------------------------------------------------------
+    def messages(self):
+        msgs = list(self.prefix)
+        if self.summary:
+            msgs.append({"role": "system", "content": self.summary})
+        msgs += self.history + self.volatile
+        if self.pending_user is not None:
+            msgs = msgs + [self.pending_user]
+        return msgs
+
+    def continuation(self, reply, instruction):
+        """
+        Nachrichten, um die laufende Antwort fortzusetzen: Prompt + bisherige
+        Antwort + Anweisung. Der KV-Cache hält Prompt und Antwort-Tokens schon
+        (llama.cpp gleicht den Token-Prefix ab) → ausgewertet werden nur das
+        Turn-Ende und die Anweisung, nicht der ganze Prompt ein zweites Mal.
+        """
+        return self.messages() + [
+            {"role": "assistant", "content": reply},
+            {"role": "system", "content": instruction},
+        ]
+
+    def __len__(self):
+        return len(self.messages())
+
+
+def compact_state(state):
+    """
+    LlamaState enthält die Logits ALLER Prefix-Tokens (n_tokens × n_vocab,
+    bei 2k Tokens und 128k Vokabular ≈ 1 GB). Weitergerechnet wird nur mit
+    der letzten Zeile; load_state verteilt eine (1 × n_vocab)-Zeile per
+    Broadcasting → ein paar hundert KB statt GB im RAM und auf Platte.
+    """
+    if state.n_tokens > 0 and len(state.scores) > 1:
+        state.scores = state.scores[-1:, :].copy()
+    return state
+
+
+class PrefixStateCache:
+    """
+    Hält den ausgewerteten KV-State (llama.cpp save_state/load_state)
+    für den stabilen Prefix im RAM (und optional auf Platte, sitzungsübergreifend).
+
+    - warm_async(): wertet den Prefix im Hintergrund aus (z. B. während
+      der Nutzer die erste Nachricht tippt)
+    - ensure(): vor jeder Antwort; stellt den Prefix-State wieder her,
+      falls der KV-Cache gerade etwas anderes enthält (Profil-/Modellwechsel)
+    """
+
+    def __init__(self, max_states=4, disk=None):
+        self.max_states = max_states
+        self.disk = disk                 # optional: PromptStateDiskCache
+        self._states = OrderedDict()     # (id(llm), prefix_key) → LlamaState
+        self._active = {}                # id(llm) → Key, den dessen KV-Cache gerade hält
+        self._locks = {}                 # id(llm) → Lock (ein Modell = eine Generation)
+        self._guard = threading.Lock()
+        self._warming = None
+
+    def _lock_for(self, llm):
+        with self._guard:
+            return self._locks.setdefault(id(llm), threading.Lock())
+
+    # --------------------------------------------------------------
+    def _evaluate(self, llm, prefix):
+        """
+        Prefix in den KV-Cache bringen – von Platte, wenn möglich.
+        Der Kern (Systemprompt + Profil) wird separat gespeichert, weil
+        Persona und letzter Kontext sich zwischen Sitzungen ändern;
+        llama.cpp wertet dann nur den Rest hinter dem Kern neu aus.
+        """
+        if self.disk is not None:
+            state = self.disk.load(llm, prefix)
+            if state is not None:
+                llm.load_state(state)
+                return state
+
+            core = prefix[:1]
+            if len(prefix) > 1:
+                core_state = self.disk.load(llm, core)
+                if core_state is not None:
+                    llm.load_state(core_state)
+                else:
+                    llm.create_chat_completion(messages=core, max_tokens=1)
+                    self.disk.save_async(llm, core, compact_state(llm.save_state()))
+
+        # Prefix einmal auswerten (1 Token reicht), State sichern
+        llm.create_chat_completion(messages=prefix, max_tokens=1)
+        state = compact_state(llm.save_state())
+        if self.disk is not None:
+            self.disk.save_async(llm, prefix, state)
+        return state
+
+    def _warm(self, llm, prefix, key):
+        state = self._evaluate(llm, prefix)
+        with self._guard:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+        self._active[id(llm)] = key
+
+    def ensure(self, llm, assembler):
+        if not hasattr(llm, "save_state"):
+            # z. B. ScheduledLLM: Prefix-Reuse passiert im BatchScheduler
+            return
+        self.wait()
+        key = (id(llm), assembler.prefix_key())
+        with self._lock_for(llm):
+            if self._active.get(id(llm)) == key:
+                return
+            try:
+                with self._guard:
+                    state = self._states.get(key)
+                if state is not None:
+                    llm.load_state(state)
+                    self._active[id(llm)] = key
+                else:
+                    self._warm(llm, assembler.prefix, key)
+            except Exception as e:
+                print(f"[PREFIX CACHE ERROR] {e}")
+                self._active.pop(id(llm), None)
+
+    def warm_async(self, llm, assembler):
+        prefix = list(assembler.prefix)
+        key = (id(llm), assembler.prefix_key())
+
+        def run():
+            with self._lock_for(llm):
+                if key in self._states:
+                    return
+                try:
+                    self._warm(llm, prefix, key)
+                except Exception as e:
+                    print(f"[PREFIX CACHE ERROR] {e}")
+
+        self._warming = threading.Thread(target=run, daemon=True)
+        self._warming.start()
+
+    def wait(self):
+        if self._warming is not None:
+            self._warming.join()
+            self._warming = None
+
+    def invalidate(self, llm):
+        """KV-Cache von llm wurde von einer fremden Generation überschrieben."""
+        with self._lock_for(llm):
+            self._active.pop(id(llm), None)
+
+    def forget(self, llm):
+        """Modell wird entladen → seine States freigeben (id() kann neu vergeben werden)."""
+        with self._guard:
+            for key in [k for k in self._states if k[0] == id(llm)]:
+                del self._states[key]
+            self._active.pop(id(llm), None)
+            self._locks.pop(id(llm), None)
@@ -0,0 +1,108 @@
+# core/prompt_cache.py
+# MAAT-KI — Persistenter Prompt-State-Cache v1.0 (llama.cpp KV-State auf Platte)
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+# Fingerprint großer GGUF-Dateien: Größe + mtime + Anfang/Ende
+# (mehrere GB komplett zu hashen würde den Start länger machen als der Cache spart)
+FINGERPRINT_CHUNK = 1024 * 1024
+
+
+def model_fingerprint(model_path):
+    st = os.stat(model_path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{st.st_size}:{int(st.st_mtime)}".encode("utf-8"))
+    with open(model_path, "rb") as f:
+        h.update(f.read(FINGERPRINT_CHUNK))
+        if st.st_size > FINGERPRINT_CHUNK:
+            f.seek(max(0, st.st_size - FINGERPRINT_CHUNK))
+            h.update(f.read(FINGERPRINT_CHUNK))
+    return h.hexdigest()
+
+
+class PromptStateDiskCache:
+    """
+    Speichert ausgewertete Prompt-Prefixe (Llama.save_state) in data/prompt_cache/.
+
+    Schlüssel = (Modell-Fingerprint, n_ctx, Hash der Prefix-Nachrichten)
+    Größenlimit max_bytes, Verdrängung nach LRU (Datei-mtime = letzter Zugriff).
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # --------------------------------------------------------------
+    def key(self, llm, messages):
+        path = llm.model_path
+        if path not in self._fingerprints:
+            self._fingerprints[path] = model_fingerprint(path)
+        raw = json.dumps(
+            [self._fingerprints[path], llm.n_ctx(), messages],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.cache_dir, key + ".state")
+
+    # --------------------------------------------------------------
+    # Laden
+    # --------------------------------------------------------------
+    def load(self, llm, messages):
+        try:
+            path = self._file(self.key(llm, messages))
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            os.utime(path)          # LRU: zuletzt benutzt
+            return state
+        except Exception as e:
+            print("[PROMPT CACHE ERROR]", e)
+            return None
+
+    # --------------------------------------------------------------
+    # Speichern (im Hintergrund, blockiert die Antwort nicht)
+    # --------------------------------------------------------------
+    def save(self, llm, messages, state):
+        try:
+            path = self._file(self.key(llm, messages))
+            tmp = path + ".tmp"
+            with self._lock:
+                with open(tmp, "wb") as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+                self._evict()
+        except Exception as e:
+            print("[PROMPT CACHE ERROR]", e)
+
+    def save_async(self, llm, messages, state):
+        threading.Thread(
+            target=self.save, args=(llm, list(messages), state), daemon=True
+        ).start()
+
+    # --------------------------------------------------------------
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".state"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
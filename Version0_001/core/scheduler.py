@@ -0,0 +1,508 @@
+# core/scheduler.py
+# MAAT-KI — Scheduler v1.0 (faire Warteschlange über Sessions + Continuous Batching)
+
+import codecs
+import itertools
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class FairScheduler:
+    """
+    Verteilt Runden mehrerer Sessions auf ein oder mehrere geladene Modelle.
+
+    - je Modellquelle EIN Worker-Thread (llama.cpp ist nicht thread-sicher)
+    - Round-Robin über Sessions: wer gerade dran war, kommt hinten an,
+      ein Vielschreiber blockiert die anderen nicht
+    - eine Session läuft nie auf zwei Workern gleichzeitig (Reihenfolge bleibt)
+
+    model_sources = Liste von Callables → ResidentModel (z. B. models.current)
+    job(resident) läuft im Worker und bekommt das Modell, das er nutzen soll.
+    """
+
+    def __init__(self, model_sources):
+        self.model_sources = list(model_sources)
+        self._queues = OrderedDict()      # session_id → deque[(job, future)]
+        self._running = set()
+        self._cond = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._loop, args=(source,), daemon=True)
+            for source in self.model_sources
+        ]
+        for w in self._workers:
+            w.start()
+
+    def submit(self, session_id, job):
+        future = Future()
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append((job, future))
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    # --------------------------------------------------------------
+    def _next(self):
+        """Erste Session mit Arbeit, die gerade nicht läuft → ans Ende rotieren."""
+        for sid, q in self._queues.items():
+            if q and sid not in self._running:
+                item = q.popleft()
+                self._queues.move_to_end(sid)
+                if not q:
+                    del self._queues[sid]
+                self._running.add(sid)
+                return sid, item
+        return None
+
+    def _loop(self, source):
+        while True:
+            with self._cond:
+                picked = self._next()
+                while picked is None:
+                    self._cond.wait()
+                    picked = self._next()
+            sid, (job, future) = picked
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(job(source()))
+            except Exception as e:
+                print("[SCHEDULER ERROR]", e)
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running.discard(sid)
+                    self._cond.notify_all()
+
+
+# =====================================================================
+# Continuous Batching: mehrere Generierungen in EINEM llama_decode
+# =====================================================================
+PRIORITIES = {"interactive": 0, "think": 1, "background": 2}
+PREFILL_CHUNK_LOW = 32     # Prompt-Tokens/Schritt für think/background, solange interaktiv läuft
+TOP_K = 40
+
+
+def sample_token(logits, temperature, top_p, rng):
+    if temperature <= 0:
+        return int(np.argmax(logits))
+    k = min(TOP_K, len(logits))
+    top = np.argpartition(-logits, k - 1)[:k]
+    top = top[np.argsort(-logits[top])]
+    scaled = logits[top] / temperature
+    p = np.exp(scaled - scaled.max())
+    p /= p.sum()
+    keep = int(np.searchsorted(np.cumsum(p), top_p) + 1)
+    p = p[:keep] / p[:keep].sum()
+    return int(top[rng.choice(keep, p=p)])
+
+
+# ---------------------------------------------------------
+# Chat-Template → Prompt-Tokens (ohne llama.cpp zu ändern)
+# ---------------------------------------------------------
+class _Captured(Exception):
+    def __init__(self, prompt, stop):
+        self.prompt = prompt
+        self.stop = stop
+
+
+class _PromptCapture:
+    """Gibt sich als Llama aus; der Chat-Handler formatiert + tokenisiert, dann Abbruch."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    def create_completion(self, prompt, stop=None, **kwargs):
+        raise _Captured(prompt, stop)
+
+
+def format_chat_prompt(llm, messages):
+    """→ (Prompt-Tokens, Stop-Strings) genau wie create_chat_completion sie nutzen würde."""
+    from llama_cpp import llama_chat_format
+
+    handler = (
+        llm.chat_handler
+        or llm._chat_handlers.get(llm.chat_format)
+        or llama_chat_format.get_chat_completion_handler(llm.chat_format)
+    )
+    try:
+        handler(llama=_PromptCapture(llm), messages=messages)
+    except _Captured as c:
+        stop = c.stop or []
+        return list(c.prompt), [stop] if isinstance(stop, str) else list(stop)
+    raise RuntimeError("Chat-Handler ohne create_completion – Batching nicht möglich")
+
+
+# ---------------------------------------------------------
+# Eine Generierung im Batch
+# ---------------------------------------------------------
+class GenRequest:
+    def __init__(self, prompt, stop, priority, max_tokens, temperature, top_p, order):
+        self.prompt = prompt
+        self.stop = [s for s in stop if s]
+        self.priority = PRIORITIES.get(priority, 0)
+        self.max_tokens = max_tokens or 1 << 30
+        self.temperature = temperature
+        self.top_p = top_p
+        self.order = order
+
+        self.seq = None
+        self.n_past = 0              # Prompt-Tokens bereits im KV
+        self.next_token = None       # gesampelt, noch nicht ausgewertet
+        self.n_generated = 0
+        self.text = ""
+        self.sent = 0                # Zeichen bereits als Chunk ausgegeben
+        self.cancelled = False
+        self.chunks = queue.Queue()  # str …, None = Ende
+        self.future = Future()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+    @property
+    def key(self):
+        return (self.priority, self.order)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class BatchScheduler:
+    """
+    Besitzt EIN Llama und dekodiert alle laufenden Anfragen gemeinsam:
+    pro Schritt ein llama_decode mit je einem Token pro generierender
+    Sequenz plus Prompt-Stücken neuer Anfragen (Continuous Batching).
+
+    - Prioritäten: interactive > think > background. Wartende interaktive
+      Anfragen bekommen freie Slots zuerst; solange eine interaktive Anfrage
+      läuft, bekommen think/background nur kleine Prompt-Stücke pro Schritt
+      → der interaktive Stream wird nie von Hintergrundarbeit blockiert.
+    - Jede Anfrage läuft auf einer eigenen KV-Sequenz (1..n_slots). Der
+      gemeinsame Prefix (Systemprompt, Persona) wird per kv_cache_seq_cp
+      von der ähnlichsten Sequenz übernommen statt neu gerechnet.
+    - n_slots = Anzahl paralleler Sessions; jede bekommt n_ctx // n_slots
+      Tokens Kontext (ScheduledLLM.n_ctx → ContextWindow der Session).
+    """
+
+    def __init__(self, llm, n_slots=4, seed=None):
+        import llama_cpp
+
+        self._lc = llama_cpp
+        self.llm = llm
+        self.n_slots = n_slots
+        self.ctx = llm._ctx.ctx
+        self.n_vocab = llm.n_vocab()
+        self.n_batch = llm.n_batch
+        self.rng = np.random.default_rng(seed)
+
+        self._slot_tokens = {seq: [] for seq in range(1, n_slots + 1)}
+        self._active = {}                    # seq → GenRequest
+        self._waiting = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Scheduler besitzt den KV-Cache exklusiv
+        llama_cpp.llama_kv_cache_clear(self.ctx)
+        llm.n_tokens = 0
+
+        self._batch = llama_cpp.llama_batch_init(self.n_batch, 0, 1)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------------------
+    # API
+    # --------------------------------------------------------------
+    def submit(self, messages, priority="interactive", max_tokens=None,
+               temperature=0.2, top_p=0.95):
+        prompt, stop = format_chat_prompt(self.llm, messages)
+        room = self.llm.n_ctx() // self.n_slots
+        if len(prompt) >= room:
+            raise ValueError(f"Prompt ({len(prompt)} Tokens) größer als Slot ({room})")
+        req = GenRequest(prompt, stop, priority, max_tokens, temperature, top_p, next(self._order))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchScheduler ist beendet")
+            self._waiting.append(req)
+            self._cond.notify()
+        return req
+
+    def stats(self):
+        with self._cond:
+            return {"active": len(self._active), "waiting": len(self._waiting)}
+
+    def close(self, timeout=10):
+        """Offene Anfragen abbrechen, Decode-Thread beenden, Batch freigeben."""
+        with self._cond:
+            self._closed = True
+            stopped = RuntimeError("BatchScheduler beendet")
+            for r in self._waiting + list(self._active.values()):
+                self._fail(r, stopped)
+            self._waiting = []
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        # nur freigeben, wenn kein llama_decode mehr auf den Batch zugreift
+        if not self._thread.is_alive() and self._batch is not None:
+            self._lc.llama_batch_free(self._batch)
+            self._batch = None
+
+    # --------------------------------------------------------------
+    # Slots
+    # --------------------------------------------------------------
+    @staticmethod
+    def _common(a, b):
+        n = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            n += 1
+        return n
+
+    def _admit(self):
+        """Wartende nach Priorität auf freie Slots verteilen."""
+        self._waiting.sort(key=lambda r: r.key)
+        admitted = []
+        for req in list(self._waiting):
+            free = [s for s in self._slot_tokens if s not in self._active]
+            if not free:
+                break
+            self._waiting.remove(req)
+            if req.cancelled:
+                self._finish(req)
+                continue
+            self._place(req, free)
+            admitted.append(req)
+        return admitted
+
+    def _place(self, req, free):
+        lc = self._lc
+        limit = len(req.prompt) - 1          # letzter Prompt-Token liefert die Logits
+        seq = max(free, key=lambda s: self._common(self._slot_tokens[s], req.prompt))
+        own = min(self._common(self._slot_tokens[seq], req.prompt), limit)
+
+        # längsten Prefix irgendeiner Sequenz suchen (auch laufender)
+        src, best = seq, own
+        for s, toks in self._slot_tokens.items():
+            c = min(self._common(toks, req.prompt), limit)
+            if c > best:
+                src, best = s, c
+
+        if src != seq:
+            lc.llama_kv_cache_seq_rm(self.ctx, seq, -1, -1)
+            lc.llama_kv_cache_seq_cp(self.ctx, src, seq, 0, best)
+        else:
+            lc.llama_kv_cache_seq_rm(self.ctx, seq, best, -1)
+        self._slot_tokens[seq] = req.prompt[:best]
+
+        req.seq = seq
+        req.n_past = best
+        self._active[seq] = req
+
+    def _release_idle_kv(self):
+        """KV voll → gecachte Tokens freier Slots verwerfen."""
+        for s in self._slot_tokens:
+            if s not in self._active and self._slot_tokens[s]:
+                self._lc.llama_kv_cache_seq_rm(self.ctx, s, -1, -1)
+                self._slot_tokens[s] = []
+
+    # --------------------------------------------------------------
+    # Ein Decode-Schritt
+    # --------------------------------------------------------------
+    def _plan(self):
+        """→ [(req, [tokens], logits_needed)], höchste Priorität zuerst."""
+        plan = []
+        budget = self.n_batch
+        reqs = sorted(self._active.values(), key=lambda r: r.key)
+        interactive = any(r.priority == 0 for r in reqs)
+
+        for r in reqs:                       # zuerst: ein Token je Generierung
+            if r.next_token is not None and budget > 0:
+                plan.append((r, [r.next_token], True))
+                budget -= 1
+        for r in reqs:                       # dann: Prompt-Stücke
+            if r.next_token is not None or budget <= 0:
+                continue
+            chunk = budget if (r.priority == 0 or not interactive) else min(budget, PREFILL_CHUNK_LOW)
+            toks = r.prompt[r.n_past:r.n_past + chunk]
+            done = r.n_past + len(toks) == len(r.prompt)
+            plan.append((r, toks, done))
+            budget -= len(toks)
+        return plan
+
+    def _step(self):
+        lc = self._lc
+        plan = self._plan()
+        if not plan:
+            return
+
+        b = self._batch
+        j = 0
+        rows = []
+        for r, toks, want in plan:
+            pos0 = len(self._slot_tokens[r.seq])
+            for k, tok in enumerate(toks):
+                b.token[j] = tok
+                b.pos[j] = pos0 + k
+                b.n_seq_id[j] = 1
+                b.seq_id[j][0] = r.seq
+                b.logits[j] = want and k == len(toks) - 1
+                j += 1
+            rows.append(j - 1 if want else None)
+        b.n_tokens = j
+
+        if lc.llama_decode(self.ctx, b) != 0:
+            # kein KV-Platz: Cache freier Slots opfern, sonst niedrigste Priorität abbrechen
+            if any(self._slot_tokens[s] for s in self._slot_tokens if s not in self._active):
+                self._release_idle_kv()
+            else:
+                victim = max(self._active.values(), key=lambda r: r.key)
+                self._fail(victim, RuntimeError("KV-Cache voll"))
+            for r, toks, _ in plan:
+                lc.llama_kv_cache_seq_rm(self.ctx, r.seq, len(self._slot_tokens[r.seq]), -1)
+            return
+
+        for (r, toks, want), row in zip(plan, rows):
+            self._slot_tokens[r.seq].extend(toks)
+            if r.next_token is None:
+                r.n_past += len(toks)
+            if row is None:
+                continue
+            logits = np.ctypeslib.as_array(lc.llama_get_logits_ith(self.ctx, row), shape=(self.n_vocab,))
+            self._accept(r, sample_token(logits, r.temperature, r.top_p, self.rng))
+
+    def _accept(self, r, tok):
+        if lc_is_eog(self._lc, self.llm, tok) or r.n_generated >= r.max_tokens:
+            self._finish(r)
+            return
+
+        r.n_generated += 1
+        r.next_token = tok
+        r.text += r._decoder.decode(self.llm.detokenize([tok]))
+
+        for s in r.stop:
+            cut = r.text.find(s)
+            if cut != -1:
+                r.text = r.text[:cut]
+                self._finish(r)
+                return
+
+        # Stop-Strings können über mehrere Tokens gehen → Rest zurückhalten
+        hold = max((len(s) - 1 for s in r.stop), default=0)
+        upto = len(r.text) - hold
+        if upto > r.sent:
+            r.chunks.put(r.text[r.sent:upto])
+            r.sent = upto
+        if r.n_generated >= r.max_tokens:
+            self._finish(r)
+
+    def _finish(self, r):
+        if r.sent < len(r.text):
+            r.chunks.put(r.text[r.sent:])
+            r.sent = len(r.text)
+        r.chunks.put(None)
+        self._active.pop(r.seq, None)
+        if not r.future.done():
+            r.future.set_result(r.text)
+
+    def _fail(self, r, exc):
+        self._active.pop(r.seq, None)
+        r.chunks.put(None)
+        if not r.future.done():
+            r.future.set_exception(exc)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._waiting and not self._active and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._admit()
+                for r in [r for r in self._active.values() if r.cancelled]:
+                    self._finish(r)
+            try:
+                self._step()
+            except Exception as e:
+                print("[BATCH SCHEDULER ERROR]", e)
+                with self._cond:
+                    for r in list(self._active.values()):
+                        self._fail(r, e)
+
+
+def lc_is_eog(lc, llm, tok):
+    try:
+        return bool(lc.llama_token_is_eog(llm._model.model, tok))
+    except Exception:
+        return tok == llm.token_eos()
+
+
+# ---------------------------------------------------------
+# Llama-Ersatz für StreamEngine / ThinkLoop / ContextWindow
+# ---------------------------------------------------------
+class ScheduledLLM:
+    """
+    Sieht für die Pipeline aus wie ein Llama (create_chat_completion,
+    tokenize, n_ctx), generiert aber über den BatchScheduler mit fester
+    Priorität. with_priority("think") / ("background") für Nebenaufgaben.
+    """
+
+    def __init__(self, scheduler, priority="interactive"):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def with_priority(self, priority):
+        return ScheduledLLM(self.scheduler, priority)
+
+    def tokenize(self, *args, **kwargs):
+        return self.scheduler.llm.tokenize(*args, **kwargs)
+
+    def n_ctx(self):
+        return self.scheduler.llm.n_ctx() // self.scheduler.n_slots
+
+    def create_chat_completion(self, messages, stream=False, max_tokens=None,
+                               temperature=0.2, top_p=0.95, **kwargs):
+        req = self.scheduler.submit(
+            messages,
+            priority=self.priority,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+        )
+        if stream:
+            return self._stream(req)
+        text = req.future.result()
+        return {"choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }]}
+
+    def _stream(self, req):
+        try:
+            yield {"choices": [{"index": 0, "delta": {"role": "assistant"}}]}
+            while True:
+                piece = req.chunks.get()
+                if piece is None:
+                    break
+                yield {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            req.future.result()
+        finally:
+            # Abbruch durch den Consumer (close()) → Slot wird frei
+            req.cancel()
+
+
+class ScheduledModel:
+    """Ersatz für ResidentModel im FairScheduler: Modell über den BatchScheduler."""
+    __slots__ = ("llm", "perf", "name")
+
+    def __init__(self, llm, perf, name):
+        self.llm = llm
+        self.perf = dict(perf, n_ctx=llm.n_ctx())
+        self.name = name
@@ -1,8 +1,19 @@
-import sqlite3
 import time
 import re
+import threading
 from datetime import datetime
 
+from core.db_pool import as_manager
+from core.migrations import SEMANTIC_DB, run_migrations
+from core.write_buffer import get_buffer
+from core.vector_index import (
+    EMBED_DIM,
+    VectorIndex,
+    embed_text,
+    vector_to_blob,
+    blob_to_vector,
+)
+
 class SemanticMemory:
     """
     Semantischer Speicher wie im menschlichen Gehirn:
@@ -10,69 +21,185 @@ class SemanticMemory:
       - Zeitlos
       - Komprimierte Wissenseinträge
       - Ranking nach Relevanz
+
+    Jeder Eintrag besitzt einen festen float32-Vektor (Hashed N-Grams),
+    der als BLOB gespeichert und beim Start in einen Matrix-Index geladen wird.
     """
 
-    def __init__(self, db_path="semantic_memory.db"):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.cur = self.conn.cursor()
-        self._create_table()
+    def __init__(self, db="semantic_memory.db"):
+        # db = ConnectionManager (oder Pfad, abwärtskompatibel)
+        self.db = as_manager(db)
+        self.db_path = self.db.path
+        self.writer = get_buffer(self.db)
+        self.index = VectorIndex(EMBED_DIM)
+
+        # Einträge, die noch im Write-Behind-Puffer liegen:
+        # vorläufige (negative) Index-ID → (ts, text)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_tmp_id = -1
+        self._run_migrations()
+        self._load_index()
 
     # -------------------------------------------------------------
-    def _create_table(self):
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS semantic_memory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ts TEXT,
-                text TEXT UNIQUE,
-                vector REAL
-            )
-        """)
-        self.conn.commit()
+    def _run_migrations(self):
+        """
+        Alte Datenbanken (nur Skalar-'vector') bekommen eine
+        embedding-Spalte (core/migrations.py); fehlende Vektoren werden
+        nachberechnet.
+        """
+        run_migrations(self.db, SEMANTIC_DB)
+        with self.db.transaction() as cur:
+            cur.execute("SELECT id, text FROM semantic_memory WHERE embedding IS NULL")
+            missing = cur.fetchall()
+            if missing:
+                cur.executemany(
+                    "UPDATE semantic_memory SET embedding = ? WHERE id = ?",
+                    [(vector_to_blob(self._sentence_vector(text)), _id) for _id, text in missing],
+                )
+        if missing:
+            print(f"[SEM] ✅ {len(missing)} Einträge neu vektorisiert.")
 
     # -------------------------------------------------------------
-    def _sentence_vector(self, text: str) -> float:
-        tokens = re.findall(r"[A-Za-zÄÖÜäöüß0-9]+", text.lower())
-        if not tokens:
-            return 0.0
-        vals = [abs(hash(tok)) % 5000 for tok in tokens]
-        return sum(vals) / len(vals)
+    def _load_index(self, batch=10000):
+        self.index.clear()
+        cur = self.db.cursor()
+        cur.execute("SELECT id, embedding FROM semantic_memory ORDER BY id")
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            vecs = [blob_to_vector(r[1], EMBED_DIM) for r in rows]
+            self.index.add_many(ids, vecs)
 
     # -------------------------------------------------------------
-    def add(self, text: str):
-        v = self._sentence_vector(text)
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def _sentence_vector(self, text: str):
+        return embed_text(text, EMBED_DIM)
 
+    # -------------------------------------------------------------
+    def _exists(self, text: str) -> bool:
+        with self._pending_lock:
+            if any(t == text for _, t in self._pending.values()):
+                return True
+        cur = self.db.cursor()
+        cur.execute("SELECT 1 FROM semantic_memory WHERE text = ?", (text,))
+        return cur.fetchone() is not None
+
+    # -------------------------------------------------------------
+    def add(self, text: str):
         try:
-            self.cur.execute(
-                "INSERT OR IGNORE INTO semantic_memory (ts, text, vector) VALUES (?, ?, ?)",
-                (ts, text, v)
+            # UNIQUE(text): Dubletten gar nicht erst in den Index aufnehmen
+            if self._exists(text):
+                return
+
+            v = self._sentence_vector(text)
+            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            with self._pending_lock:
+                tmp_id = self._next_tmp_id
+                self._next_tmp_id -= 1
+                self._pending[tmp_id] = (ts, text)
+            self.index.add(tmp_id, v)
+
+            self.writer.add(
+                "semantic_memory",
+                "INSERT OR IGNORE INTO semantic_memory (ts, text, embedding) VALUES (?, ?, ?)",
+                (ts, text, vector_to_blob(v)),
+                row={"ts": ts, "text": text},
+                on_flush=lambda rowid, rowcount: self._resolve(tmp_id, rowid, rowcount),
             )
-            self.conn.commit()
         except Exception as e:
             print("[SEM ADD ERROR]", e)
 
+    def _resolve(self, tmp_id, rowid, rowcount):
+        """Nach dem Flush: vorläufige ID → echte Zeilen-ID."""
+        if rowcount == 1:
+            self.index.reassign(tmp_id, rowid)
+        else:
+            self.index.remove(tmp_id)
+        with self._pending_lock:
+            self._pending.pop(tmp_id, None)
+
     # -------------------------------------------------------------
     def search(self, query: str, limit=5):
         qv = self._sentence_vector(query)
-        self.cur.execute("SELECT ts, text, vector FROM semantic_memory")
-        rows = self.cur.fetchall()
+        hits = self.index.search(qv, limit)
+        if not hits:
+            return []
+
+        with self._pending_lock:
+            rows = {_id: self._pending[_id] for _id, _ in hits if _id in self._pending}
+
+        ids = [h[0] for h in hits if h[0] > 0]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            cur = self.db.cursor()
+            cur.execute(
+                f"SELECT id, ts, text FROM semantic_memory WHERE id IN ({marks})", ids
+            )
+            rows.update({r[0]: (r[1], r[2]) for r in cur.fetchall()})
 
         scored = []
-        for ts, text, vec in rows:
-            dist = abs(vec - qv)
-            score = 1 / (1 + dist)
+        for _id, score in hits:
+            # Kosinus ≤ 0 → keinerlei gemeinsame Merkmale
+            if score <= 0.0 or _id not in rows:
+                continue
+            ts, text = rows[_id]
             scored.append({"ts": ts, "text": text, "score": score})
+        return scored
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored[:limit]
+    # -------------------------------------------------------------
+    def put(self, key: str, text: str):
+        """
+        Eintrag mit festem Präfix (z. B. "[Maat-Dream:technik]") anlegen
+        oder in place ersetzen – statt jedes Mal einen neuen hinzuzufügen.
+        """
+        try:
+            self.writer.flush()
+            v = self._sentence_vector(text)
+            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            with self.db.transaction() as cur:
+                # Präfix als Bereich → UNIQUE(text)-Index statt Full-Scan
+                cur.execute(
+                    "SELECT id FROM semantic_memory WHERE text >= ? AND text < ? ORDER BY id DESC LIMIT 1",
+                    (key, key + "\U0010ffff"),
+                )
+                row = cur.fetchone()
+                if row:
+                    cur.execute(
+                        "UPDATE OR IGNORE semantic_memory SET ts = ?, text = ?, embedding = ? WHERE id = ?",
+                        (ts, text, vector_to_blob(v), row[0]),
+                    )
+                    entry_id = row[0] if cur.rowcount == 1 else None
+                else:
+                    cur.execute(
+                        "INSERT OR IGNORE INTO semantic_memory (ts, text, embedding) VALUES (?, ?, ?)",
+                        (ts, text, vector_to_blob(v)),
+                    )
+                    entry_id = cur.lastrowid if cur.rowcount == 1 else None
+
+            if entry_id:
+                self.index.replace(entry_id, v)
+        except Exception as e:
+            print("[SEM PUT ERROR]", e)
 
     # -------------------------------------------------------------
     def latest(self, limit=10):
-        self.cur.execute("SELECT ts, text FROM semantic_memory ORDER BY id DESC LIMIT ?", (limit,))
-        return [{"ts": ts, "text": text} for ts, text in self.cur.fetchall()]
+        pending = self.writer.pending("semantic_memory")[::-1]
+        cur = self.db.cursor()
+        cur.execute("SELECT ts, text FROM semantic_memory ORDER BY id DESC LIMIT ?", (limit + len(pending),))
+        # text ist UNIQUE → zwischendurch geflusste Zeilen nicht doppelt
+        seen = {p["text"] for p in pending}
+        rows = [{"ts": ts, "text": text} for ts, text in cur.fetchall() if text not in seen]
+        return (pending + rows)[:limit]
 
     # -------------------------------------------------------------
     def clear(self):
-        self.cur.execute("DELETE FROM semantic_memory")
-        self.conn.commit()
\ No newline at end of file
+        self.writer.discard("semantic_memory")
+        with self._pending_lock:
+            self._pending.clear()
+        with self.db.transaction() as cur:
+            cur.execute("DELETE FROM semantic_memory")
+        self.index.clear()
@@ -0,0 +1,332 @@
+# core/server.py
+# MAAT-KI — Headless Server v1.0 (OpenAI-kompatibel, SSE-Streaming)
+
+import json
+import queue
+import select
+import socket
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.stream_engine import CancelToken
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+
+class ServerJob:
+    """Eine Anfrage: Nachrichten rein, Stream-Events raus (über events-Queue)."""
+
+    def __init__(self, messages, max_tokens=None):
+        self.id = "chatcmpl-" + uuid.uuid4().hex[:24]
+        self.created = int(time.time())
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.cancel = CancelToken()
+        self.events = queue.Queue()
+
+
+# ---------------------------------------------------------
+# Request prüfen (vor Session + Scheduler → 400 statt halber Runde)
+# ---------------------------------------------------------
+ROLES = ("system", "user", "assistant")
+
+
+def _flatten_content(content):
+    """OpenAI-Content: String oder Liste von Teilen → nur die Text-Teile."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and part.get("type") == "text" and isinstance(part.get("text"), str):
+                parts.append(part["text"])
+            elif not isinstance(part, dict):
+                raise ValueError("Ungültiger Content-Teil")
+        return "\n".join(parts)
+    raise ValueError("content muss String oder Liste sein")
+
+
+def parse_request(req):
+    """→ (messages, max_tokens); ValueError mit Meldung für den Client."""
+    if not isinstance(req, dict):
+        raise ValueError("Request muss ein JSON-Objekt sein")
+
+    raw = req.get("messages")
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("messages muss eine nicht-leere Liste sein")
+    messages = []
+    for m in raw:
+        if not isinstance(m, dict) or not isinstance(m.get("role"), str):
+            raise ValueError("Jede Nachricht braucht eine role (String)")
+        if m["role"] not in ROLES:
+            continue            # tool/function-Nachrichten ignorieren
+        messages.append({"role": m["role"], "content": _flatten_content(m.get("content"))})
+    if not messages or messages[-1]["role"] != "user":
+        raise ValueError("Letzte Nachricht muss vom Nutzer stammen")
+
+    max_tokens = req.get("max_tokens")
+    if max_tokens is not None and (
+        isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0
+    ):
+        raise ValueError("max_tokens muss eine positive Ganzzahl sein")
+    return messages, max_tokens
+
+
+# ---------------------------------------------------------
+# Eine Runde einer Session (läuft im Scheduler-Worker)
+# ---------------------------------------------------------
+def _client_conversation(conv, messages):
+    """
+    Schickt der Client seine History mit (OpenAI-Stil), ersetzt sie die
+    Server-History; nur eine Nachricht → die Session führt die History.
+    Systemnachrichten des Clients werden Pro-Runde-Blöcke.
+    """
+    system = [m["content"] for m in messages[:-1] if m.get("role") == "system" and m.get("content")]
+    history = [
+        {"role": m["role"], "content": m.get("content") or ""}
+        for m in messages[:-1]
+        if m.get("role") in ("user", "assistant")
+    ]
+    if history:
+        conv.history = history
+    return system
+
+
+def run_turn(session, job, resident, maintenance=None):
+    """Zustand kommt komplett aus der Session → Sessions teilen sich nur das Modell."""
+    try:
+        if job.cancel.cancelled:
+            return
+        with session.lock:
+            llm = resident.llm
+            conv = session.conversation
+            user_input = job.messages[-1].get("content") or ""
+
+            system = _client_conversation(conv, job.messages)
+            session.pipeline.prepare(conv, user_input, session.last_reply_time)
+            for block in system:
+                conv.add_volatile(block)
+
+            session.use_llm(llm, resident.perf.get("n_ctx", 4096))
+            reply_text = session.pipeline.generate(
+                llm,
+                conv,
+                session.context_window,
+                user_input,
+                consumers=[job.events.put],
+                cancel=job.cancel,
+                max_tokens=job.max_tokens,
+                model=resident.name,
+            )
+            session.pipeline.finish(conv, user_input, reply_text)
+            session.last_reply_time = time.time()
+    except Exception as e:
+        print("[SERVER TURN ERROR]", e)
+        job.events.put({"type": "error", "text": str(e), "t": 0.0, "data": {}})
+    finally:
+        session.end()
+        if maintenance is not None:
+            maintenance.activity(job.id, False)
+        job.events.put(None)
+
+
+# ---------------------------------------------------------
+# HTTP: /v1/chat/completions, /v1/models, /health
+# ---------------------------------------------------------
+def _chunk(job, model, delta, finish_reason=None):
+    return {
+        "id": job.id,
+        "object": "chat.completion.chunk",
+        "created": job.created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def make_handler(sessions, scheduler, models, maintenance=None):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        # ----------------------------------------------
+        def _json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._json(status, {"error": {"message": message, "type": "invalid_request_error"}})
+
+        def _model_name(self):
+            current = models.active
+            return current.name if current else "maat-ki"
+
+        # ----------------------------------------------
+        def do_GET(self):
+            if self.path == "/health":
+                self._json(200, {"status": "ok", "model": self._model_name(), "queue": scheduler.pending(), "sessions": len(sessions)})
+            elif self.path == "/v1/models":
+                self._json(200, {
+                    "object": "list",
+                    "data": [{"id": self._model_name(), "object": "model", "owned_by": "maat-ki"}],
+                })
+            else:
+                self._error(404, "Unbekannter Pfad")
+
+        def do_POST(self):
+            if self.path != "/v1/chat/completions":
+                self._error(404, "Unbekannter Pfad")
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                req = json.loads(self.rfile.read(length) or b"{}")
+            except Exception:
+                self._error(400, "Ungültiges JSON")
+                return
+
+            try:
+                messages, max_tokens = parse_request(req)
+            except ValueError as e:
+                self._error(400, str(e))
+                return
+            user = req.get("user") if isinstance(req.get("user"), str) else None
+
+            # Session: Header X-Session-Id oder OpenAI-Feld "user"
+            sessions.expire_idle()
+            # begin=True: eingereihte Runde schützt die Session vor expire/evict
+            session = sessions.get(self.headers.get("X-Session-Id") or user, begin=True)
+            job = ServerJob(messages, max_tokens=max_tokens)
+            if maintenance is not None:
+                # schon beim Einreihen: laufende Wartung gibt DB + CPU sofort frei
+                maintenance.activity(job.id, True)
+            try:
+                scheduler.submit(session.id, lambda resident: run_turn(session, job, resident, maintenance))
+            except Exception:
+                session.end()
+                if maintenance is not None:
+                    maintenance.activity(job.id, False)
+                raise
+            if req.get("stream"):
+                self._stream(job)
+            else:
+                self._complete(job)
+
+        # ----------------------------------------------
+        def _client_gone(self):
+            """Gegenseite hat die Verbindung geschlossen (lesbar, aber EOF)?"""
+            try:
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                if not readable:
+                    return False
+                return self.connection.recv(1, socket.MSG_PEEK) == b""
+            except Exception:
+                return True
+
+        def _complete(self, job):
+            reply = ""
+            while True:
+                try:
+                    event = job.events.get(timeout=0.5)
+                except queue.Empty:
+                    if not job.cancel.cancelled and self._client_gone():
+                        # Client weg → Generation abbrechen, Worker wird frei
+                        job.cancel.cancel("disconnect")
+                    continue
+                if event is None:
+                    break
+                if event["type"] in ("done", "aborted"):
+                    reply = event["text"]
+                elif event["type"] == "error":
+                    self._json(500, {"error": {"message": event["text"], "type": "server_error"}})
+                    return
+
+            if job.cancel.cancelled:
+                return
+            self._json(200, {
+                "id": job.id,
+                "object": "chat.completion",
+                "created": job.created,
+                "model": self._model_name(),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+            })
+
+        def _send_event(self, payload):
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _stream(self, job):
+            model = self._model_name()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            try:
+                self._send_event(_chunk(job, model, {"role": "assistant"}))
+                while True:
+                    event = job.events.get()
+                    if event is None:
+                        break
+                    if event["type"] == "chunk":
+                        self._send_event(_chunk(job, model, {"content": event["text"]}))
+                    elif event["type"] in ("done", "aborted"):
+                        self._send_event(_chunk(job, model, {}, "stop"))
+                    elif event["type"] == "error":
+                        self._send_event({"error": {"message": event["text"], "type": "server_error"}})
+                self._send_event("[DONE]")
+            except (BrokenPipeError, ConnectionResetError):
+                # Client weg → Generation abbrechen, Worker wird frei
+                job.cancel.cancel("disconnect")
+
+    return Handler
+
+
+class ChatServer:
+    """
+    python MAAT-KI.py --serve [--host H] [--port P] [--profile NAME]
+
+    Kompatibel mit OpenAI-Clients (base_url = http://host:port/v1).
+    Mehrere Nutzer: je Session eigener Zustand, Modelle über den Scheduler geteilt.
+    """
+
+    def __init__(self, sessions, scheduler, models, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 maintenance=None):
+        self.sessions = sessions
+        self.scheduler = scheduler
+        self.httpd = ThreadingHTTPServer(
+            (host, port), make_handler(sessions, scheduler, models, maintenance)
+        )
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for session in self.sessions.all():
+            session.close()
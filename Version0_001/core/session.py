@@ -0,0 +1,216 @@
+# core/session.py
+# MAAT-KI — Sessions v1.0 (Zustand pro Nutzer, Gedächtnis-Namespace)
+
+import os
+import re
+import threading
+import time
+
+from core.brain_memory import BrainMemory
+from core.context_window import ContextWindow
+from core.db_pool import get_manager, release_manager
+from core.decay import release_decay
+from core.episodic_memory import EpisodicMemory
+from core.long_term_memory import LongTermMemory
+from core.memory_sqlite import SQLiteMemory
+from core.prompt_assembly import PromptAssembler
+from core.semantic_memory import SemanticMemory
+from core.write_buffer import release_buffer
+
+
+def safe_session_id(session_id):
+    """Session-ID → Verzeichnisname (keine Pfadtricks)."""
+    sid = re.sub(r"[^A-Za-z0-9_.-]", "_", str(session_id or "anonymous"))[:64]
+    return sid.strip(".") or "anonymous"
+
+
+# ---------------------------------------------------------
+# Gedächtnis-Namespace: eigene DB-Dateien je Session
+# ---------------------------------------------------------
+class MemoryNamespace:
+    """
+    memory.db / episodic_memory.db / semantic_memory.db eines Nutzers.
+    Der Terminal-Chat nutzt den Standard-Namespace (data/), Server-Sessions
+    bekommen data/sessions/<id>/ – gleiches Schema, keine Vermischung.
+    """
+
+    def __init__(self, name, data_dir, memory, brain, ltm, dbs=()):
+        self.name = name
+        self.data_dir = data_dir
+        self.memory = memory
+        self.brain = brain
+        self.ltm = ltm
+        # nur selbst geöffnete Datenbanken werden in close() freigegeben
+        # (der Standard-Namespace teilt die globalen Manager)
+        self.dbs = list(dbs)
+
+    @classmethod
+    def open(cls, name, data_dir):
+        os.makedirs(data_dir, exist_ok=True)
+        memory_db = get_manager(os.path.join(data_dir, "memory.db"))
+        episodic_db = get_manager(os.path.join(data_dir, "episodic_memory.db"))
+        semantic_db = get_manager(os.path.join(data_dir, "semantic_memory.db"))
+        return cls(
+            name,
+            data_dir,
+            SQLiteMemory(memory_db),
+            BrainMemory(EpisodicMemory(episodic_db), SemanticMemory(semantic_db)),
+            LongTermMemory(memory_db),
+            dbs=[memory_db, episodic_db, semantic_db],
+        )
+
+    def close(self):
+        """Write-Puffer leeren + Threads beenden, Verbindungen schließen, Registries räumen."""
+        for db in self.dbs:
+            try:
+                release_buffer(db)
+                release_decay(db)
+                release_manager(db)
+            except Exception as e:
+                print("[NAMESPACE CLOSE ERROR]", e)
+        self.dbs = []
+
+
+# ---------------------------------------------------------
+# Session
+# ---------------------------------------------------------
+class Session:
+    """
+    Alles, was bisher modul-global in MAAT-KI.py lag und pro Nutzer
+    verschieden ist: Konversation, Zeitgefühl, AUTOR-Flags, Identity-Drift,
+    MIE-Historie, Gedächtnis-Namespace und die Pipeline, die darauf arbeitet.
+    Geteilt werden nur die Modelle und die zustandslosen Engines.
+    """
+
+    def __init__(self, session_id, namespace, identity_kernel, mie, analytics,
+                 pipeline, prefix, n_ctx):
+        self.id = session_id
+        self.namespace = namespace
+        self.identity_kernel = identity_kernel
+        self.mie = mie
+        self.analytics = analytics
+        self.pipeline = pipeline
+
+        self.conversation = PromptAssembler(prefix)
+        self.context_window = ContextWindow(None, n_ctx, ltm=namespace.ltm)
+
+        self.last_reply_time = time.time()
+        self.touched = time.time()
+        self.autor_mode = False
+        self.autor_used_this_turn = False
+        self.autor_escape = False
+
+        # eine Runde pro Session gleichzeitig
+        self.lock = threading.Lock()
+        # eingereihte + laufende Runden → Session darf nicht geschlossen werden
+        self.inflight = 0
+        self._inflight_lock = threading.Lock()
+
+    def touch(self):
+        self.touched = time.time()
+
+    def begin(self):
+        with self._inflight_lock:
+            self.inflight += 1
+
+    def end(self):
+        with self._inflight_lock:
+            self.inflight = max(0, self.inflight - 1)
+        self.touch()
+
+    @property
+    def busy(self):
+        return self.inflight > 0 or self.lock.locked()
+
+    def use_llm(self, llm, n_ctx):
+        if self.context_window.llm is not llm:
+            self.context_window.set_llm(llm, n_ctx)
+
+    def close(self):
+        try:
+            self.analytics.close()
+        except Exception as e:
+            print("[SESSION CLOSE ERROR]", e)
+        self.namespace.close()
+
+
+# ---------------------------------------------------------
+# Session-Verwaltung
+# ---------------------------------------------------------
+class SessionManager:
+    """
+    factory(session_id) → Session. Sessions ohne Aktivität werden nach
+    max_idle Sekunden geschlossen (Analytics fertig, Namespace freigegeben –
+    die Daten bleiben auf Platte). Höchstens max_sessions sind gleichzeitig
+    offen; darüber wird die am längsten unberührte, gerade freie Session
+    geschlossen (Session-IDs kommen vom Client).
+    """
+
+    def __init__(self, factory, max_idle=3600, max_sessions=32):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def add(self, session):
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id, begin=False):
+        """
+        begin=True zählt sofort eine Runde ein (unter dem Manager-Lock) –
+        Runden-Ende mit session.end() (server.run_turn).
+        """
+        sid = safe_session_id(session_id)
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is not None and begin:
+                session.begin()
+        if session is None:
+            self._evict(self.max_sessions - 1)
+            created = self.factory(sid)
+            with self._lock:
+                # zwei Requests gleichzeitig → der erste gewinnt
+                session = self._sessions.setdefault(sid, created)
+                if begin:
+                    session.begin()
+            if session is not created:
+                created.close()
+        session.touch()
+        return session
+
+    def _evict(self, keep):
+        """Älteste freie Sessions schließen, bis höchstens keep offen sind."""
+        with self._lock:
+            idle = sorted(
+                (s for s in self._sessions.values() if not s.busy),
+                key=lambda s: s.touched,
+            )
+            old = idle[: max(0, len(self._sessions) - keep)]
+            for s in old:
+                del self._sessions[s.id]
+        for s in old:
+            s.close()
+        return len(old)
+
+    def expire_idle(self):
+        now = time.time()
+        with self._lock:
+            old = [
+                s for s in self._sessions.values()
+                if now - s.touched > self.max_idle and not s.busy
+            ]
+            for s in old:
+                del self._sessions[s.id]
+        for s in old:
+            s.close()
+        return len(old)
+
+    def all(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,87 @@
+# core/speculative.py
+# MAAT-KI — Speculative Decoding v1.0 (Draft-Modell / Prompt-Lookup)
+
+import os
+
+import numpy as np
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+# Anzahl Tokens, die pro Schritt vorgeschlagen und vom Hauptmodell
+# in EINEM Batch geprüft werden
+DRAFT_TOKENS = 8
+LOOKUP_TOKENS = 10
+
+
+class GGUFDraftModel(LlamaDraftModel):
+    """
+    Kleines GGUF-Modell (gleiches Vokabular wie das Hauptmodell, z. B.
+    Llama-3.2-1B für Llama-3-8B) schlägt greedy die nächsten Tokens vor.
+    Eigener KV-Cache mit Prefix-Abgleich → pro Schritt werden nur die
+    neuen Tokens ausgewertet.
+    """
+
+    def __init__(self, model_path, n_ctx, num_pred_tokens=DRAFT_TOKENS,
+                 n_threads=None, n_gpu_layers=0):
+        self.model_path = model_path
+        self.num_pred_tokens = num_pred_tokens
+        self.llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_threads=n_threads,
+            n_gpu_layers=n_gpu_layers,
+            use_mlock=False,
+            use_mmap=True,
+            verbose=False,
+        )
+        self._eos = self.llm.token_eos()
+
+    def __call__(self, input_ids, **kwargs):
+        llm = self.llm
+        ids = input_ids.tolist()
+        if not ids:
+            return np.array([], dtype=np.intc)
+
+        # längsten gemeinsamen Prefix im Draft-KV behalten
+        common = 0
+        for a, b in zip(llm._input_ids.tolist(), ids):
+            if a != b:
+                break
+            common += 1
+        # letzten Token immer neu auswerten → frische Logits
+        llm.n_tokens = min(common, len(ids) - 1)
+        llm.eval(ids[llm.n_tokens:])
+
+        draft = []
+        room = llm.n_ctx() - llm.n_tokens
+        for _ in range(min(self.num_pred_tokens, room - 1)):
+            tok = llm.sample(temp=0.0)
+            if tok == self._eos:
+                break
+            draft.append(tok)
+            llm.eval([tok])
+
+        return np.array(draft, dtype=np.intc)
+
+
+def build_draft_model(spec, n_ctx, n_threads=None, n_gpu_layers=0):
+    """
+    spec = None / "" / "off"  → kein Speculative Decoding
+           "lookup"           → Prompt-Lookup (n-Gramme aus dem Prompt, kein Extra-Modell)
+           Pfad zu .gguf      → kleines Draft-Modell
+    """
+    if not spec or spec == "off":
+        return None
+    if spec == "lookup":
+        return LlamaPromptLookupDecoding(num_pred_tokens=LOOKUP_TOKENS)
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"❗ Draft-Modell nicht gefunden: {spec}")
+    return GGUFDraftModel(spec, n_ctx, n_threads=n_threads, n_gpu_layers=n_gpu_layers)
+
+
+def describe_draft(spec):
+    if not spec or spec == "off":
+        return "aus"
+    if spec == "lookup":
+        return "Prompt-Lookup"
+    return os.path.basename(spec)
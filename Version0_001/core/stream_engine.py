@@ -0,0 +1,196 @@
+# core/stream_engine.py
+# MAAT-KI — Stream Engine v1.0 (Events + Abbruch-Token, ohne TTY)
+
+import select
+import sys
+import threading
+import time
+
+SENTENCE_END = (".", "!", "?", "…", "。", "\n")
+
+
+# ---------------------------------------------------------
+# Abbruch-Token (ersetzt das Tastatur-Polling pro Token)
+# ---------------------------------------------------------
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="cancel"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+# ---------------------------------------------------------
+# Stream Engine
+# ---------------------------------------------------------
+class StreamEngine:
+    """
+    Streamt eine Chat-Completion und veröffentlicht typisierte Events:
+
+        {"type": "start" | "first_token" | "chunk" | "sentence" | "done" | "aborted",
+         "text": ...,            # Chunk / Satz / ganze Antwort
+         "t":    ...,            # Sekunden seit Start
+         "data": {...}}          # Timings (done/aborted)
+
+    Terminal, GUI, TTS und Metriken hängen sich per subscribe() an und teilen
+    sich EINEN Stream. Kein stdin, kein termios → läuft headless und im Thread.
+    """
+
+    def __init__(self, llm, consumers=None):
+        self.llm = llm
+        self._subscribers = list(consumers or [])
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _publish(self, kind, text="", t=0.0, **data):
+        event = {"type": kind, "text": text, "t": t, "data": data}
+        for cb in list(self._subscribers):
+            try:
+                cb(event)
+            except Exception as e:
+                # ein Consumer (z. B. TTS) darf den Stream nie abbrechen
+                print("[STREAM CONSUMER ERROR]", e)
+        return event
+
+    def _count_tokens(self, text, fallback):
+        """Echte Token-Zahl der Antwort (Chunks ≠ Tokens); ohne Tokenizer → fallback."""
+        if not text:
+            return 0
+        try:
+            return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+        except Exception:
+            return fallback
+
+    def run(self, messages, cancel=None, max_tokens=None):
+        """Streamt bis zum Ende oder Abbruch; gibt den Antworttext zurück."""
+        cancel = cancel or CancelToken()
+        reply_text = ""
+        last_chunk = ""
+        sentence_buffer = ""
+        first_token = None
+        n_chunks = 0
+
+        start = time.time()
+        self._publish("start")
+
+        stream = self.llm.create_chat_completion(
+            messages=messages, stream=True, max_tokens=max_tokens
+        )
+        try:
+            for token in stream:
+                if cancel.cancelled:
+                    break
+
+                now = time.time() - start
+                if first_token is None:
+                    first_token = now
+                    self._publish("first_token", t=now)
+
+                if "choices" not in token:
+                    continue
+
+                chunk = token["choices"][0].get("delta", {}).get("content", "")
+                if not chunk:
+                    continue
+
+                # Doppel-Chunk vermeiden
+                if chunk.strip() == last_chunk.strip():
+                    continue
+                last_chunk = chunk
+
+                reply_text += chunk
+                n_chunks += 1
+                self._publish("chunk", chunk, t=now)
+
+                # Satzpuffer
+                sentence_buffer += chunk
+                if sentence_buffer.endswith(SENTENCE_END):
+                    if sentence_buffer.strip():
+                        self._publish("sentence", sentence_buffer.strip(), t=now)
+                    sentence_buffer = ""
+        except Exception as e:
+            cancel.cancel(f"error: {e}")
+            raise
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+
+            # letzten Rest-Satz noch ausgeben
+            if sentence_buffer.strip():
+                self._publish("sentence", sentence_buffer.strip(), t=time.time() - start)
+
+            total = time.time() - start
+            gen_time = total - (first_token or total)
+            n_tokens = self._count_tokens(reply_text, n_chunks)
+            timings = {
+                "first_token": first_token,
+                "total": total,
+                "chunks": n_chunks,
+                "chunks_per_s": n_chunks / gen_time if gen_time > 0 else 0.0,
+                "tokens": n_tokens,
+                "tokens_per_s": n_tokens / gen_time if gen_time > 0 else 0.0,
+            }
+            if cancel.cancelled:
+                self._publish("aborted", reply_text, t=total, reason=cancel.reason, **timings)
+            else:
+                self._publish("done", reply_text, t=total, **timings)
+
+        return reply_text
+
+
+# ---------------------------------------------------------
+# Tastatur-Wächter: ESC → cancel() (eigener Thread, nur im Terminal)
+# ---------------------------------------------------------
+class EscWatcher:
+    """
+    Liest stdin im cbreak-Modus in einem eigenen Thread und bricht bei ESC
+    den Token ab. Der Stream selbst macht keinen Syscall pro Token mehr.
+    """
+
+    def __init__(self, cancel, poll=0.1):
+        self.cancel = cancel
+        self.poll = poll
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._old = None
+
+    def start(self):
+        if not sys.stdin.isatty():
+            return self
+        try:
+            import termios
+            import tty
+        except ImportError:
+            return self
+
+        self._fd = sys.stdin.fileno()
+        self._old = termios.tcgetattr(self._fd)
+        tty.setcbreak(self._fd)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.is_set() and not self.cancel.cancelled:
+            ready, _, _ = select.select([sys.stdin], [], [], self.poll)
+            if ready and sys.stdin.read(1) == "\x1b":
+                self.cancel.cancel("esc")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._old is not None:
+            import termios
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._old)
+            self._old = None
@@ -6,9 +6,10 @@ import threading
 import sys
 import json
 import os
-import tty
-import termios
-import select
+
+from core.db_pool import get_manager
+from core.stream_engine import CancelToken, EscWatcher, StreamEngine
+from core.telemetry import LatencyTelemetry
 
 RAINBOW = [
     "\033[38;5;196m",
@@ -21,23 +22,13 @@ RAINBOW = [
 ]
 RESET = "\033[0m"
 
-PROFILE_PATH = "data/load_profile.json"
-
-
-# ---------------------------------------------------------
-# Tastatur prüfen (Non-Blocking)
-# ---------------------------------------------------------
-def key_pressed():
-    dr, _, _ = select.select([sys.stdin], [], [], 0)
-    return bool(dr)
-
-
-def read_key():
-    return sys.stdin.read(1)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_PATH = os.path.join(ROOT, "data", "load_profile.json")
+TELEMETRY_PATH = os.path.join(ROOT, "data", "telemetry.db")
 
 
 # ---------------------------------------------------------
-# Profil-Load/Save (für Fortschrittsbalken)
+# Altes Einzelwert-Profil (nur noch gelesen, Startwert für den Balken)
 # ---------------------------------------------------------
 def load_previous_profile():
     if os.path.exists(PROFILE_PATH):
@@ -49,50 +40,42 @@ def load_previous_profile():
     return {}
 
 
-def save_profile(seconds):
-    profile = load_previous_profile()
-    profile["avg_first_token"] = seconds
+_telemetry = None
 
-    with open(PROFILE_PATH, "w") as f:
-        json.dump(profile, f, indent=2)
 
+def default_telemetry():
+    """Gemeinsame Latenz-Telemetrie (data/telemetry.db) für Aufrufer ohne eigene."""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = LatencyTelemetry(get_manager(TELEMETRY_PATH))
+    return _telemetry
 
-# =========================================================
-#   STREAMING ENGINE mit ESC-NOTAUS + Satz-TTS
-# =========================================================
-def stream_completion_gui(llm, conversation, gui_queue=None, speak_fn=None, show_progress=True):
-    reply_text = ""
-    last_chunk = ""
-    first_chunk_time = None
-    sentence_buffer = ""
-    SENTENCE_END = (".", "!", "?", "…", "。", "\n")
-
-    # ----------------------------
-    # Terminal in cbreak-Modus
-    # ----------------------------
-    fd = sys.stdin.fileno()
-    old_settings = termios.tcgetattr(fd)
-    tty.setcbreak(fd)
-
-    # ----------------------------
-    # Profil laden (für Fortschrittsbalken)
-    # ----------------------------
-    profile = load_previous_profile()
-    expected_time = profile.get("avg_first_token", 5.0)
-
-    # ----------------------------
-    # Fortschrittsbalken-Thread
-    # ----------------------------
-    stop_progress = threading.Event()
-
-    def adaptive_bar():
+
+def _llm_key(llm):
+    try:
+        n_ctx = llm.n_ctx()
+    except Exception:
+        n_ctx = 0
+    return os.path.basename(getattr(llm, "model_path", None) or "unknown"), n_ctx
+
+
+# ---------------------------------------------------------
+# Consumer: Fortschrittsbalken bis zum ersten Token
+# ---------------------------------------------------------
+class ProgressBar:
+    def __init__(self, expected_time):
+        self.expected_time = expected_time or 5.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
         idx = 0
         bar_len = 20
         start = time.time()
 
-        while not stop_progress.is_set():
+        while not self._stop.is_set():
             elapsed = time.time() - start
-            percent = min(int((elapsed / expected_time) * 100), 99)
+            percent = min(int((elapsed / self.expected_time) * 100), 99)
 
             bar = ""
             for i in range(bar_len):
@@ -108,82 +91,84 @@ def stream_completion_gui(llm, conversation, gui_queue=None, speak_fn=None, show
         sys.stdout.write("\r" + " " * 120 + "\r")
         sys.stdout.flush()
 
-    if show_progress:
-        threading.Thread(target=adaptive_bar, daemon=True).start()
-
-    # ----------------------------
-    # Hilfsfunktion: Satz sprechen
-    # ----------------------------
-    def speak_sentence(text: str):
-        if not speak_fn:
-            return
-        if not text.strip():
-            return
-        try:
-            # SayTTS / EspeakTTS haben beide eine nicht-blockierende speak_chunk()
-            speak_fn(text)
-        except Exception:
-            # TTS-Fehler sollen nie den Stream crashen
-            pass
-
-    # ----------------------------
-    # TOKEN STREAM
-    # ----------------------------
-    start_time = time.time()
-
-    try:
-        for token in llm.create_chat_completion(messages=conversation, stream=True):
-
-            # ESC → Notaus
-            if key_pressed():
-                ch = read_key()
-                if ch == "\x1b":  # ESC
-                    print("\n⛔ Streaming abgebrochen (ESC)\n")
-                    break
+    def __call__(self, event):
+        kind = event["type"]
+        if kind == "start":
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        elif kind in ("first_token", "done", "aborted") and self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
 
-            # Erster Token → Progress stoppen + Profil speichern
-            if first_chunk_time is None:
-                first_chunk_time = time.time() - start_time
-                save_profile(first_chunk_time)
-                # (Speed-Trainer kann später hier andocken, wenn du willst)
-                stop_progress.set()
-                print("")
 
-            if "choices" not in token:
-                continue
-
-            delta = token["choices"][0].get("delta", {})
-            chunk = delta.get("content", "")
+# ---------------------------------------------------------
+# Consumer: Chunks an Terminal/GUI-Queue, Sätze an TTS, Timing ins Profil
+# ---------------------------------------------------------
+def queue_consumer(gui_queue):
+    def consume(event):
+        if event["type"] == "chunk":
+            gui_queue.put(event["text"])
+        elif event["type"] in ("done", "aborted"):
+            gui_queue.put("\n")
+    return consume
 
-            if not chunk:
-                continue
 
-            # Doppel-Chunk vermeiden
-            if chunk.strip() == last_chunk.strip():
-                continue
-            last_chunk = chunk
+def tts_consumer(speak_fn):
+    # SayTTS / EspeakTTS haben beide eine nicht-blockierende speak_chunk()
+    def consume(event):
+        if event["type"] == "sentence":
+            try:
+                speak_fn(event["text"])
+            except Exception:
+                # TTS-Fehler sollen nie den Stream crashen
+                pass
+    return consume
 
-            reply_text += chunk
 
-            if gui_queue:
-                gui_queue.put(chunk)
+def terminal_consumer(event):
+    if event["type"] == "first_token":
+        print("")
+    elif event["type"] == "aborted" and event["data"].get("reason") == "esc":
+        print("\n⛔ Streaming abgebrochen (ESC)\n")
 
-            # Satzpuffer
-            sentence_buffer += chunk
-            if any(sentence_buffer.endswith(end) for end in SENTENCE_END):
-                speak_sentence(sentence_buffer.strip())
-                sentence_buffer = ""
 
+# =========================================================
+#   STREAMING ENGINE mit ESC-NOTAUS + Satz-TTS
+#   (Terminal-Wrapper um core.stream_engine)
+# =========================================================
+def stream_completion_gui(llm, conversation, gui_queue=None, speak_fn=None, show_progress=True,
+                          max_tokens=None, cancel=None, consumers=None, expected_first_token=None):
+    """
+    cancel    = CancelToken (sonst eigener; ESC im Terminal bricht ab)
+    consumers = weitere Event-Callbacks (z. B. Metriken)
+    expected_first_token = Schätzung aus der Latenz-Telemetrie; ohne sie
+                misst die Antwort selbst in data/telemetry.db (Write-Buffer,
+                kein Schreiben im Stream-Thread)
+    """
+    engine = StreamEngine(llm, consumers=[terminal_consumer])
+    if expected_first_token is None:
+        try:
+            telemetry = default_telemetry()
+            model, n_ctx = _llm_key(llm)
+            engine.subscribe(telemetry.consumer(model, n_ctx))
+            expected_first_token = telemetry.expected_first_token(model, n_ctx)
+        except Exception as e:
+            print("[TELEMETRY ERROR]", e)
+        if expected_first_token is None:
+            expected_first_token = load_previous_profile().get("avg_first_token", 5.0)
+    if show_progress:
+        engine.subscribe(ProgressBar(expected_first_token))
+    if gui_queue:
+        engine.subscribe(queue_consumer(gui_queue))
+    if speak_fn:
+        engine.subscribe(tts_consumer(speak_fn))
+    for consumer in consumers or []:
+        engine.subscribe(consumer)
+
+    cancel = cancel or CancelToken()
+    watcher = EscWatcher(cancel).start()
+    try:
+        return engine.run(conversation, cancel=cancel, max_tokens=max_tokens)
     finally:
-        # Letzten Rest-Satz noch sprechen
-        if sentence_buffer.strip():
-            speak_sentence(sentence_buffer.strip())
-
-        if gui_queue:
-            gui_queue.put("\n")
-
-        stop_progress.set()
-        # Terminal-Einstellungen zurücksetzen
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-
-    return reply_text
\ No newline at end of file
+        watcher.stop()
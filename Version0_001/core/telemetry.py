@@ -0,0 +1,172 @@
+# core/telemetry.py
+# MAAT-KI — Latenz-Telemetrie v1.0 (pro Modell + n_ctx, asynchron gespeichert)
+
+import os
+import time
+
+from core.db_pool import as_manager
+from core.write_buffer import get_buffer
+
+METRICS = ("first_token", "prompt_tps", "gen_tps", "total")
+WINDOW = 200          # Perzentile über die letzten N Runden
+
+
+def percentile(values, q):
+    """Lineare Interpolation wie numpy.percentile (ohne numpy)."""
+    if not values:
+        return None
+    s = sorted(values)
+    k = (len(s) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+class LatencyTelemetry:
+    """
+    Eine Zeile pro Antwort: Modell, n_ctx, Zeit bis zum ersten Token,
+    Prompt-Tokens, Prompt-Eval tok/s (effektiv, inkl. KV-Reuse),
+    Generierung tok/s, Gesamtdauer.
+
+    Geschrieben wird über den Write-Behind-Puffer (kein fsync im Stream),
+    gelesen wird inkl. noch ungeschriebener Zeilen.
+    """
+
+    def __init__(self, db):
+        self.db = as_manager(db)
+        self.writer = get_buffer(self.db)
+        with self.db.transaction() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS latency (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL,
+                    model TEXT,
+                    n_ctx INTEGER,
+                    first_token REAL,
+                    prompt_tokens INTEGER,
+                    prompt_tps REAL,
+                    gen_tokens INTEGER,
+                    gen_tps REAL,
+                    total REAL
+                )
+            """)
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_latency_model ON latency(model, n_ctx, id)"
+            )
+
+    # --------------------------------------------------------------
+    # Schreiben
+    # --------------------------------------------------------------
+    def record(self, model, n_ctx, first_token, prompt_tokens, gen_tokens, total):
+        if first_token is None:
+            return
+        gen_time = max(total - first_token, 1e-6)
+        row = {
+            "ts": time.time(),
+            "model": model,
+            "n_ctx": int(n_ctx),
+            "first_token": first_token,
+            "prompt_tokens": int(prompt_tokens or 0),
+            # ohne bekannte Prompt-Länge keine Prompt-Rate (statt 0 tok/s)
+            "prompt_tps": prompt_tokens / max(first_token, 1e-6) if prompt_tokens else None,
+            "gen_tokens": int(gen_tokens or 0),
+            "gen_tps": (gen_tokens or 0) / gen_time,
+            "total": total,
+        }
+        cols = ", ".join(row)
+        self.writer.add(
+            "latency",
+            f"INSERT INTO latency ({cols}) VALUES ({', '.join('?' * len(row))})",
+            tuple(row.values()),
+            row=row,
+        )
+
+    def consumer(self, model, n_ctx, prompt_tokens=0):
+        """Stream-Consumer (core.stream_engine): misst eine Antwort."""
+        model = os.path.basename(model)
+
+        def consume(event):
+            if event["type"] in ("done", "aborted"):
+                d = event["data"]
+                self.record(
+                    model, n_ctx, d.get("first_token"), prompt_tokens,
+                    d.get("tokens", 0), d.get("total", 0.0),
+                )
+        return consume
+
+    # --------------------------------------------------------------
+    # Lesen
+    # --------------------------------------------------------------
+    def rows(self, model=None, n_ctx=None, limit=WINDOW):
+        model = os.path.basename(model) if model else None
+
+        def match(r):
+            return (model is None or r["model"] == model) and (n_ctx is None or r["n_ctx"] == int(n_ctx))
+
+        pending = [r for r in self.writer.pending("latency") if match(r)][::-1]
+
+        sql = "SELECT ts, model, n_ctx, first_token, prompt_tokens, prompt_tps, gen_tps, total FROM latency"
+        where, params = [], []
+        if model is not None:
+            where.append("model = ?")
+            params.append(model)
+        if n_ctx is not None:
+            where.append("n_ctx = ?")
+            params.append(int(n_ctx))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + len(pending))
+
+        cur = self.db.cursor()
+        cur.execute(sql, params)
+        keys = ("ts", "model", "n_ctx", "first_token", "prompt_tokens", "prompt_tps", "gen_tps", "total")
+        # zwischen pending() und SELECT geflusste Messungen nicht doppelt zählen
+        seen = {(r["ts"], r["model"]) for r in pending}
+        rows = [dict(zip(keys, r)) for r in cur.fetchall()]
+        return (pending + [r for r in rows if (r["ts"], r["model"]) not in seen])[:limit]
+
+    def percentiles(self, model=None, n_ctx=None, qs=(50, 90, 99)):
+        rows = self.rows(model, n_ctx)
+        out = {"n": len(rows)}
+        for m in METRICS:
+            values = [r[m] for r in rows if r.get(m) is not None]
+            out[m] = {q: percentile(values, q) for q in qs}
+        return out
+
+    def expected_first_token(self, model, n_ctx, default=None):
+        """Median der Zeit bis zum ersten Token (für den Fortschrittsbalken)."""
+        p = self.percentiles(model, n_ctx, qs=(50,))
+        return p["first_token"][50] if p["n"] else default
+
+    def groups(self):
+        cur = self.db.cursor()
+        cur.execute("SELECT DISTINCT model, n_ctx FROM latency ORDER BY model, n_ctx")
+        seen = [tuple(r) for r in cur.fetchall()]
+        for r in self.writer.pending("latency"):
+            if (r["model"], r["n_ctx"]) not in seen:
+                seen.append((r["model"], r["n_ctx"]))
+        return seen
+
+    def pretty_info(self):
+        groups = self.groups()
+        if not groups:
+            return "⏱ Noch keine Latenz-Messungen."
+
+        lines = ["⏱ Latenz (p50 / p90 / p99, letzte %d Antworten)" % WINDOW]
+        for model, n_ctx in groups:
+            p = self.percentiles(model, n_ctx)
+
+            def fmt(metric, unit, digits):
+                vals = p[metric]
+                return " / ".join(
+                    "?" if vals[q] is None else f"{vals[q]:.{digits}f}" for q in (50, 90, 99)
+                ) + unit
+
+            lines += [
+                f"- {model} (n_ctx={n_ctx}, n={p['n']})",
+                f"    erster Token : {fmt('first_token', ' s', 2)}",
+                f"    Prompt-Eval  : {fmt('prompt_tps', ' tok/s', 0)}",
+                f"    Generierung  : {fmt('gen_tps', ' tok/s', 1)}",
+            ]
+        return "\n".join(lines)
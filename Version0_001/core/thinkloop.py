@@ -1,9 +1,38 @@
 # core/thinkloop.py
 
+import codecs
+
+import numpy as np
+
+THINK_INSTRUCTION = (
+    "Interner Denkmodus: "
+    "Formuliere deine internen Gedanken klar, logisch und strukturiert. "
+    "Gib KEINE Nutzerantwort aus."
+)
+
+# Temperatur je Gedankenkette: Kette 0 wie bisher (0.3), die anderen streuen mehr
+CANDIDATE_TEMPS = (0.3, 0.7, 0.9, 1.1)
+TOP_K = 40
+
+
+def _sample(logits, temp, rng):
+    if temp <= 0:
+        return int(np.argmax(logits))
+    top = np.argpartition(-logits, TOP_K)[:TOP_K]
+    scaled = logits[top] / temp
+    p = np.exp(scaled - scaled.max())
+    p /= p.sum()
+    return int(top[rng.choice(len(top), p=p)])
+
+
 class ThinkLoop:
 
-    def __init__(self):
+    def __init__(self, candidates=1, max_tokens=256):
         self.triggers = ["denke", "überlege", "prüfe", "analyse"]
+        self.candidates = candidates
+        self.max_tokens = max_tokens
+        self.last_scores = []
+        self.last_choice = 0
 
     def needs_think(self, text):
         t = text.lower()
@@ -22,7 +51,7 @@ class ThinkLoop:
         if hasattr(llm, "create_chat_completion"):
             resp = llm.create_chat_completion(
                 messages=messages,
-                max_tokens=256,
+                max_tokens=self.max_tokens,
                 temperature=0.3
             )
             return resp["choices"][0]["message"]["content"]
@@ -32,7 +61,7 @@ class ThinkLoop:
             resp = llm.chat.completions.create(
                 model=llm.model,
                 messages=messages,
-                max_tokens=256,
+                max_tokens=self.max_tokens,
                 temperature=0.3
             )
             return resp.choices[0].message.content
@@ -41,7 +70,7 @@ class ThinkLoop:
         if hasattr(llm, "generate"):
             text = llm.generate(
                 prompt=str(messages),
-                max_tokens=256,
+                max_tokens=self.max_tokens,
                 temperature=0.3
             )
             return text
@@ -52,18 +81,131 @@ class ThinkLoop:
         except:
             return "Denken war nicht möglich (unbekannte API)."
 
+    # ----------------------------------------------------------
+    # EINE KETTE, GESTREAMT (Gedanken erscheinen sofort)
+    # ----------------------------------------------------------
+    def _stream_single(self, llm, messages, stream_fn):
+        parts = []
+        for chunk in llm.create_chat_completion(
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=0.3,
+            stream=True,
+        ):
+            piece = chunk["choices"][0].get("delta", {}).get("content")
+            if piece:
+                parts.append(piece)
+                stream_fn(piece)
+        return "".join(parts)
+
+    # ----------------------------------------------------------
+    # N KETTEN IM BATCH (llama.cpp-Sequenzen teilen den Prompt-KV)
+    # ----------------------------------------------------------
+    def _batched_candidates(self, llm, messages, n, stream_fn=None):
+        """
+        1. Denk-Prompt einmal auf Sequenz 0 auswerten – Prefix/History sind
+           schon im KV-Cache, und die Antwort nutzt denselben KV danach wieder.
+        2. KV von Sequenz 0 auf 1..n kopieren (nur Zell-Referenzen, kein Rechnen).
+        3. Pro Schritt EIN llama_decode mit einem Token je Kette.
+        Sequenz 0 bleibt unangetastet; die Ketten werden danach entfernt.
+        stream_fn bekommt die führende Kette (Temperatur 0.3) live mit.
+        """
+        import llama_cpp
+
+        llm.create_chat_completion(messages=messages, max_tokens=1, temperature=0.3)
+        n_prompt = llm.n_tokens
+        n = min(n, (llm.n_ctx() - n_prompt) // max(1, self.max_tokens))
+        if n < 2:
+            return None
+
+        ctx = llm._ctx.ctx
+        n_vocab = llm.n_vocab()
+        eos = llm.token_eos()
+        rng = np.random.default_rng()
+        temps = [CANDIDATE_TEMPS[i % len(CANDIDATE_TEMPS)] for i in range(n)]
+
+        last_logits = np.array(llm.scores[n_prompt - 1], copy=True)
+        tokens = [_sample(last_logits, temps[i], rng) for i in range(n)]
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        chains = [[] for _ in range(n)]
+        active = list(range(n))
+
+        for i in range(n):
+            llama_cpp.llama_kv_cache_seq_cp(ctx, 0, i + 1, 0, n_prompt)
+
+        batch = llama_cpp.llama_batch_init(n, 0, 1)
+        try:
+            for step in range(self.max_tokens):
+                active = [i for i in active if tokens[i] != eos]
+                for i in active:
+                    chains[i].append(tokens[i])
+                if stream_fn is not None and 0 in active:
+                    piece = decoder.decode(llm.detokenize([tokens[0]]))
+                    if piece:
+                        stream_fn(piece)
+                if not active or step == self.max_tokens - 1:
+                    break
+
+                batch.n_tokens = len(active)
+                for j, i in enumerate(active):
+                    batch.token[j] = tokens[i]
+                    batch.pos[j] = n_prompt + step
+                    batch.n_seq_id[j] = 1
+                    batch.seq_id[j][0] = i + 1
+                    batch.logits[j] = True
+
+                if llama_cpp.llama_decode(ctx, batch) != 0:
+                    break
+
+                for j, i in enumerate(active):
+                    logits = np.ctypeslib.as_array(
+                        llama_cpp.llama_get_logits_ith(ctx, j), shape=(n_vocab,)
+                    )
+                    tokens[i] = _sample(logits, temps[i], rng)
+        finally:
+            llama_cpp.llama_batch_free(batch)
+            for i in range(n):
+                llama_cpp.llama_kv_cache_seq_rm(ctx, i + 1, -1, -1)
+
+        return [
+            llm.detokenize(c).decode("utf-8", errors="ignore").strip()
+            for c in chains
+        ]
+
     # ----------------------------------------------------------
     # THINK LOOP
     # ----------------------------------------------------------
-    def run_thinkloop(self, llm, conversation):
+    def run_thinkloop(self, llm, conversation, scorer=None, stream_fn=None):
+        """
+        scorer    = MaatAlignmentKernelV2 → bewertet Kandidaten per estimate_fields
+        stream_fn = callback(text) für gestreamte Gedanken (eine Kette)
+        """
         messages = conversation + [{
             "role": "system",
-            "content": (
-                "Interner Denkmodus: "
-                "Formuliere deine internen Gedanken klar, logisch und strukturiert. "
-                "Gib KEINE Nutzerantwort aus."
-            )
+            "content": THINK_INSTRUCTION,
         }]
+        self.last_scores = []
+        self.last_choice = 0
+
+        if self.candidates > 1 and scorer is not None and hasattr(llm, "_ctx"):
+            try:
+                texts = self._batched_candidates(llm, messages, self.candidates, stream_fn)
+            except Exception as e:
+                print("[THINKLOOP BATCH ERROR]", e)
+                texts = None
+
+            scored = [
+                (scorer.estimate_fields(t).maat_score(), i, t)
+                for i, t in enumerate(texts or []) if t
+            ]
+            if scored:
+                self.last_scores = [s for s, _, _ in scored]
+                # gestreamt wurde Kette 0; last_choice sagt, welche gewonnen hat
+                _, self.last_choice, best = max(scored, key=lambda x: x[0])
+                return best
+
+        if stream_fn is not None and hasattr(llm, "create_chat_completion"):
+            return self._stream_single(llm, messages, stream_fn).strip()
 
         thoughts = self._universal_completion(llm, messages)
 
@@ -0,0 +1,166 @@
+# core/vector_index.py
+# MAAT-KI — Vector Index v1.0 (Hashed N-Gram Embeddings + Matrix-Suche)
+
+import re
+import hashlib
+import threading
+
+import numpy as np
+
+# Dimension der Satz-Vektoren (float32).
+# 256 Dimensionen = 1 KB pro Eintrag → 300k Einträge ≈ 300 MB Matrix.
+EMBED_DIM = 256
+
+TOKEN_RE = re.compile(r"[A-Za-zÄÖÜäöüß0-9]+")
+
+
+# ------------------------------------------------
+# Stabiler Hash (unabhängig von PYTHONHASHSEED)
+# ------------------------------------------------
+def _stable_hash(feature: str) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _features(text: str):
+    """
+    Merkmale eines Satzes:
+      - ganze Wörter (Gewicht 1.0)
+      - Zeichen-Trigramme pro Wort (Gewicht 0.5)
+        → robust gegen Flexion & deutsche Komposita
+    """
+    tokens = TOKEN_RE.findall((text or "").lower())
+    for tok in tokens:
+        yield "w:" + tok, 1.0
+        padded = f"<{tok}>"
+        for i in range(len(padded) - 2):
+            yield "g:" + padded[i:i + 3], 0.5
+
+
+# ------------------------------------------------
+# Text → normierter float32-Vektor
+# ------------------------------------------------
+def embed_text(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat, weight in _features(text):
+        h = _stable_hash(feat)
+        sign = 1.0 if (h >> 63) & 1 else -1.0
+        vec[h % dim] += sign * weight
+
+    # sublineare TF-Dämpfung, damit lange Texte nicht dominieren
+    vec = np.sign(vec) * np.log1p(np.abs(vec))
+
+    norm = float(np.linalg.norm(vec))
+    if norm > 0.0:
+        vec /= norm
+    return vec
+
+
+def vector_to_blob(vec: np.ndarray) -> bytes:
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def blob_to_vector(blob: bytes, dim: int = EMBED_DIM) -> np.ndarray:
+    vec = np.frombuffer(blob, dtype=np.float32)
+    if vec.shape[0] != dim:
+        raise ValueError(f"Vektor hat Dimension {vec.shape[0]}, erwartet {dim}")
+    return vec
+
+
+# ------------------------------------------------
+# In-Memory Matrix-Index (Top-k Kosinus per matmul)
+# ------------------------------------------------
+class VectorIndex:
+    """
+    Hält alle Vektoren als zusammenhängende (N × dim)-Matrix.
+    Da alle Vektoren L2-normiert sind, ist Kosinus = Skalarprodukt.
+    Suche = ein einziges matmul + argpartition, kein Python-Loop über Zeilen.
+    """
+
+    def __init__(self, dim: int = EMBED_DIM, capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    # --------------------------------------------
+    def _grow(self, needed: int):
+        capacity = self.matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[: self.size] = self.matrix[: self.size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[: self.size] = self.ids[: self.size]
+        self.matrix = matrix
+        self.ids = ids
+
+    # --------------------------------------------
+    def add(self, entry_id: int, vec: np.ndarray):
+        with self.lock:
+            self._grow(self.size + 1)
+            self.matrix[self.size] = vec
+            self.ids[self.size] = entry_id
+            self.size += 1
+
+    def add_many(self, entry_ids, vectors: np.ndarray):
+        n = len(entry_ids)
+        if n == 0:
+            return
+        with self.lock:
+            self._grow(self.size + n)
+            self.matrix[self.size: self.size + n] = vectors
+            self.ids[self.size: self.size + n] = entry_ids
+            self.size += n
+
+    def reassign(self, old_id: int, new_id: int):
+        """Ersetzt eine vorläufige ID (z. B. vor dem DB-Flush) durch die echte."""
+        with self.lock:
+            pos = np.flatnonzero(self.ids[: self.size] == old_id)
+            self.ids[pos] = new_id
+
+    def replace(self, entry_id: int, vec: np.ndarray):
+        """Vektor eines Eintrags in place ersetzen (sonst neu anlegen)."""
+        with self.lock:
+            pos = np.flatnonzero(self.ids[: self.size] == entry_id)
+            if len(pos):
+                self.matrix[pos] = vec
+                return
+        self.add(entry_id, vec)
+
+    def remove(self, entry_id: int):
+        """Nullvektor → Eintrag kann nie mehr positiv scoren."""
+        with self.lock:
+            pos = np.flatnonzero(self.ids[: self.size] == entry_id)
+            self.matrix[pos] = 0.0
+            self.ids[pos] = 0
+
+    def clear(self):
+        with self.lock:
+            self.size = 0
+
+    # --------------------------------------------
+    def search(self, query_vec: np.ndarray, k: int = 5):
+        """
+        Gibt [(id, score), …] absteigend nach Kosinus-Ähnlichkeit zurück.
+        """
+        with self.lock:
+            n = self.size
+            if n == 0 or k <= 0:
+                return []
+            scores = self.matrix[:n] @ query_vec
+            ids = self.ids[:n]
+
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
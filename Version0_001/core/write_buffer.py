@@ -0,0 +1,195 @@
+# core/write_buffer.py
+# MAAT-KI — Write-Behind Puffer v1.0
+
+import atexit
+import sqlite3
+import threading
+
+from core.db_pool import as_manager
+
+
+class PendingWrite:
+    __slots__ = ("table", "sql", "params", "row", "on_flush")
+
+    def __init__(self, table, sql, params, row=None, on_flush=None):
+        self.table = table
+        self.sql = sql
+        self.params = params
+        self.row = row or {}
+        self.on_flush = on_flush
+
+
+def _transient(e):
+    """Sperre/Busy → später erneut versuchen; alles andere ist dauerhaft."""
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+
+class WriteBehindBuffer:
+    """
+    Sammelt INSERTs einer Datenbank und schreibt sie gebündelt
+    in EINER Transaktion (ein fsync statt einem pro Nachricht).
+
+    - Flush per Timer (flush_interval) oder sobald max_rows erreicht sind
+    - pending(table) liefert noch nicht geschriebene Zeilen für Lesezugriffe
+    - flush_all() läuft beim Beenden (atexit) und bei KeyboardInterrupt
+    """
+
+    def __init__(self, db, flush_interval=0.5, max_rows=32):
+        self.db = as_manager(db)
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+
+        self._pending = []
+        self._lock = threading.Lock()          # schützt _pending
+        self._flush_lock = threading.Lock()    # serialisiert Flushes
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------------------
+    # Schreiben (nicht-blockierend)
+    # --------------------------------------------------------------
+    def add(self, table, sql, params, row=None, on_flush=None):
+        """
+        row      = Dict der Zeile, wie Leser sie vor dem Flush sehen sollen
+        on_flush = callback(lastrowid, rowcount) nach dem Commit
+        """
+        with self._lock:
+            self._pending.append(PendingWrite(table, sql, params, row, on_flush))
+            full = len(self._pending) >= self.max_rows
+        if full:
+            self._wake.set()
+
+    # --------------------------------------------------------------
+    # Lesen: noch nicht geschriebene Zeilen (älteste zuerst)
+    # --------------------------------------------------------------
+    def pending(self, table):
+        with self._lock:
+            return [dict(p.row) for p in self._pending if p.table == table]
+
+    def discard(self, table):
+        """Verwirft ungeschriebene Zeilen einer Tabelle (z. B. vor clear())."""
+        with self._lock:
+            self._pending = [p for p in self._pending if p.table != table]
+
+    # --------------------------------------------------------------
+    # Flush
+    # --------------------------------------------------------------
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+
+            try:
+                results = self._write(batch)
+            except Exception as e:
+                if _transient(e):
+                    # Zeilen bleiben im Puffer → nächster Versuch beim nächsten Flush
+                    print(f"[WRITE BUFFER BUSY] {e}")
+                    return 0
+                # dauerhafter Fehler → Zeile für Zeile, fehlerhafte Zeilen verwerfen
+                try:
+                    results = self._write_rows(batch)
+                except Exception as e:
+                    print(f"[WRITE BUFFER ERROR] {e}")
+                    return 0
+
+            # erst nach dem Commit aus dem Puffer nehmen → Leser sehen
+            # jede Zeile durchgehend (Puffer oder Datenbank)
+            with self._lock:
+                done = set(map(id, batch))
+                self._pending = [p for p in self._pending if id(p) not in done]
+
+            for p, result in zip(batch, results):
+                if result is None:
+                    continue
+                rowid, rowcount = result
+                if p.on_flush:
+                    try:
+                        p.on_flush(rowid, rowcount)
+                    except Exception as e:
+                        print(f"[WRITE BUFFER CALLBACK ERROR] {e}")
+
+            return len(batch)
+
+    def _write(self, batch):
+        results = []
+        with self.db.transaction() as cur:
+            for p in batch:
+                cur.execute(p.sql, p.params)
+                results.append((cur.lastrowid, cur.rowcount))
+        return results
+
+    def _write_rows(self, batch):
+        """
+        Eine Transaktion, ein SAVEPOINT pro Zeile: eine kaputte Zeile
+        (IntegrityError, falsches Schema, falsche Parameter) wird verworfen,
+        der Rest committet. Sperren brechen weiterhin den ganzen Batch ab.
+        """
+        results = []
+        with self.db.transaction() as cur:
+            for p in batch:
+                cur.execute("SAVEPOINT write_row")
+                try:
+                    cur.execute(p.sql, p.params)
+                    results.append((cur.lastrowid, cur.rowcount))
+                except Exception as e:
+                    cur.execute("ROLLBACK TO write_row")
+                    if _transient(e):
+                        raise
+                    print(f"[WRITE BUFFER DROP] {p.table}: {e} – Zeile verworfen")
+                    results.append(None)
+                cur.execute("RELEASE write_row")
+        return results
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+# ------------------------------------------------
+# Registry: ein Puffer pro Datenbank
+# ------------------------------------------------
+_BUFFERS = {}
+_BUFFERS_LOCK = threading.Lock()
+
+
+def get_buffer(db):
+    manager = as_manager(db)
+    with _BUFFERS_LOCK:
+        if manager.path not in _BUFFERS:
+            _BUFFERS[manager.path] = WriteBehindBuffer(manager)
+        return _BUFFERS[manager.path]
+
+
+def release_buffer(db):
+    """Puffer leeren, Thread beenden und aus der Registry nehmen."""
+    path = as_manager(db).path
+    with _BUFFERS_LOCK:
+        buf = _BUFFERS.pop(path, None)
+    if buf is not None:
+        buf.close()
+
+
+def flush_all():
+    with _BUFFERS_LOCK:
+        buffers = list(_BUFFERS.values())
+    for buf in buffers:
+        buf.flush()
+
+
+atexit.register(flush_all)
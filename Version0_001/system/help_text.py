@@ -14,7 +14,8 @@ Allgemein:
   
 Profile:
   /profile <name>       — Profil wechseln (harmonic, analytical, deep usw.)
-  /model                — Neues Lokales LLM auswählen
+  /model                — Neues Lokales LLM auswählen (lädt im Hintergrund)
+  /model status         — Aktives & Standby-Modell, RAM-Budget
   /tts                  — Sprachausgabe konfigurieren
 
 ============================================================
@@ -40,6 +41,11 @@ Quests:
 ============================================================
   /dream                — Nachtkonsolidierung (episodisch → semantisch)
   /sleep                — Alias zu /dream
+  /wartung              — Leerlauf-Wartung (Dreaming, VACUUM, Backups) – Status
+  /backup               — Sofort-Backup (Datenbanken + Evo/Persona, dedupliziert)
+  /backup list          — Vorhandene Backups anzeigen
+  /backup verify [ID]   — Backup auf Vollständigkeit prüfen
+  /backup restore [ID]  — Backup zurückspielen (danach neu starten)
 
 ============================================================
 🧠 Memory-Systeme (Kurzzeit + Langzeit + Semantik + Gehirn)